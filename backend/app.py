@@ -1,109 +1,262 @@
-from flask import Flask, request, jsonify, send_from_directory
+import time
+# Inicio del arranque: al final del módulo se registra cuánto tardó (metrics.record_startup)
+_startup_started = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 import os
-import asyncio
-import edge_tts
 import uuid
-import time
-from datetime import datetime, timedelta
-from ocr_pdf_to_text import ocr_pdf_to_text, extract_text_from_pdf
-from text_to_speech import text_to_speech, list_windows_voices, get_tts_capabilities
+import json
+import shutil
+import tempfile
+from artifact_store import ArtifactStore, get_artifact_max_bytes, get_artifact_ttl, start_background_eviction
+from ocr_pdf_to_text import extract_text_from_pdf, iter_text_from_pdf, get_cache_stats
+from pipeline import pdf_to_audio
+from text_to_speech import synthesize_text_to_file, iter_text_to_speech_mp3, get_audio_cache_stats, parse_speed
+from tts_providers import get_provider_status
+from tts_coalesce import LEADER, get_coalescer, synthesis_key
+from tts_sessions import get_session_store, synthesize_session_to_file
+from voice_catalog import edge_voices, local_voices, tts_capabilities, start_background_refresh
+from jobs import JobManager, JobStore, get_job_workers, DONE, ERROR, QUEUED, RUNNING
+from metrics import BYTES, REGISTRY, REQUEST_SECONDS, record_startup, render_metrics
+from uploads import UploadRequest, finish_upload, get_max_upload_bytes
 
 app = Flask(__name__, static_folder=None)
 CORS(app) # Habilitar CORS para toda la aplicación
+# Los archivos subidos se escriben por bloques en un directorio único por petición
+app.request_class = UploadRequest
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 INPUT_DIR = os.path.join(basedir, 'input')
 OUTPUT_DIR = os.path.join(basedir, 'output')
 for d in [INPUT_DIR, OUTPUT_DIR]:
     os.makedirs(d, exist_ok=True)
+app.config['UPLOAD_DIR'] = INPUT_DIR
+# Margen para los campos de texto del formulario además del archivo
+app.config['MAX_CONTENT_LENGTH'] = get_max_upload_bytes() + 1024 * 1024
 
-def cleanup_old_files():
-    """Elimina archivos PDF y MP3 más viejos de 24 horas."""
-    print("--- Ejecutando limpieza de archivos antiguos ---")
-    now = time.time()
-    twelve_hours_in_seconds = 12 * 60 * 60
-    
-    # Limpiar directorio de entrada (PDFs)
-    for filename in os.listdir(INPUT_DIR):
-        if filename.lower().endswith('.pdf'):
-            file_path = os.path.join(INPUT_DIR, filename)
-            try:
-                if os.path.getmtime(file_path) < now - twelve_hours_in_seconds:
-                    os.remove(file_path)
-                    print(f"Eliminado PDF antiguo: {filename}")
-            except Exception as e:
-                print(f"Error eliminando archivo {file_path}: {e}")
+# Archivos generados: índice con tamaño y último acceso, expulsión por TTL y cuota en segundo plano
+artifacts = ArtifactStore(OUTPUT_DIR, get_artifact_max_bytes(), get_artifact_ttl())
 
-    # Limpiar directorio de salida (MP3s)
-    for filename in os.listdir(OUTPUT_DIR):
-        if filename.lower().endswith('.mp3'):
-            file_path = os.path.join(OUTPUT_DIR, filename)
-            try:
-                if os.path.getmtime(file_path) < now - twelve_hours_in_seconds:
-                    os.remove(file_path)
-                    print(f"Eliminado MP3 antiguo: {filename}")
-            except Exception as e:
-                print(f"Error eliminando archivo {file_path}: {e}")
-    print("--- Limpieza finalizada ---")
+# Última línea de /api/pdf-to-text en modo stream cuando el procesamiento falla a mitad de
+# camino (el status 200 ya se envió): '\n[[ERROR]] <detalle>'
+STREAM_ERROR_MARKER = '\n[[ERROR]] '
+
+# Cola de trabajos persistente (SQLite) para procesar sin bloquear la petición HTTP
+JOBS_DB_PATH = os.getenv('JOBS_DB_PATH') or os.path.join(basedir, 'jobs.sqlite3')
+job_manager = JobManager(JobStore(JOBS_DB_PATH), max_workers=get_job_workers())
+
+# --- Métricas ---
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'no-encontrada'
+    labels = {'route': route, 'method': request.method, 'status': str(response.status_code)}
+    # call_on_close corre al terminar de enviar el cuerpo, así las respuestas en streaming
+    # registran la duración completa y no solo el tiempo hasta el primer byte
+    response.call_on_close(lambda: REQUEST_SECONDS.observe(time.perf_counter() - started, **labels))
+    return response
+
+def collect_cache_metrics():
+    """Publica los contadores de las cachés en disco (texto de PDF, fragmentos de audio) y de output/."""
+    caches = dict(get_cache_stats())
+    caches['audioFragments'] = get_audio_cache_stats()
+    caches['artifacts'] = artifacts.stats()
+    names = {'pdfText': 'pdf_text', 'pdfPages': 'pdf_pages', 'audioFragments': 'audio_fragments'}
+    families = [
+        ('cache_hits_total', 'counter', 'Aciertos de caché.', 'hits'),
+        ('cache_misses_total', 'counter', 'Fallos de caché.', 'misses'),
+        ('cache_evictions_total', 'counter', 'Entradas expulsadas por LRU.', 'evictions'),
+        ('cache_bytes', 'gauge', 'Bytes ocupados por la caché.', 'bytes'),
+    ]
+    for name, kind, help_text, field in families:
+        yield name, kind, help_text, [
+            ({'cache': names.get(cache, cache)}, stats[field]) for cache, stats in caches.items()
+        ]
+
+REGISTRY.register_collector(collect_cache_metrics)
+
+@app.teardown_request
+def remove_request_work_dir(exc):
+    cleanup = getattr(request, 'cleanup_work_dir', None)
+    if cleanup is not None:
+        cleanup()
 
+@app.errorhandler(413)
+def upload_too_large(e):
+    limit_mb = get_max_upload_bytes() // (1024 * 1024)
+    return jsonify({'error': f'El archivo supera el tamaño máximo permitido ({limit_mb} MB)'}), 413
+
+def record_audio_output(path, immutable=False):
+    """Cuenta el MP3 escrito y lo registra en el almacén de artefactos (immutable: nombre único)."""
+    if os.path.exists(path):
+        BYTES.inc(os.path.getsize(path), kind='mp3_output')
+        artifacts.register(path, immutable=immutable)
+
+def unique_output_name(requested, default):
+    """
+    Nombre de archivo de salida dentro de OUTPUT_DIR a partir del que envía el cliente:
+    sin directorios y con un sufijo único, para que dos peticiones simultáneas con el mismo
+    PDF (o el mismo 'out'/'audio') no escriban el mismo archivo.
+    """
+    stem, ext = os.path.splitext(os.path.basename(requested or '').lstrip('.'))
+    default_stem, default_ext = os.path.splitext(default)
+    return f"{stem or default_stem}-{uuid.uuid4().hex[:8]}{ext or default_ext}"
+
+def output_exists(result):
+    """El MP3 de un resultado compartido sigue en OUTPUT_DIR (ver tts_coalesce)."""
+    return os.path.exists(os.path.join(OUTPUT_DIR, result['audio']))
+
+def remove_output(path):
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def cleanup_stale_inputs():
+    """
+    Elimina de INPUT_DIR lo que quedó de peticiones interrumpidas hace más de 12 horas:
+    directorios de subida, directorios de trabajos que ya terminaron (o cuyo trabajo no
+    existe), PDFs y textos de audio progresivo que nunca se reprodujeron.
+    Corre en el hilo de artefactos (ver artifact_store), no en las peticiones.
+    """
+    limit = time.time() - 12 * 60 * 60
+    # Los trabajos en cola o en ejecución (también los de otros workers) conservan su directorio
+    pending_dirs = set()
+    for job_id in job_manager.store.ids_with_status(QUEUED, RUNNING):
+        job = job_manager.get(job_id)
+        if job and job['params'].get('work_dir'):
+            pending_dirs.add(os.path.basename(job['params']['work_dir']))
+    for entry in os.scandir(INPUT_DIR):
+        try:
+            if entry.stat().st_mtime >= limit:
+                continue
+            if entry.is_dir() and (entry.name.startswith('req_') or (entry.name.startswith('job_') and entry.name not in pending_dirs)):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            elif entry.name.lower().endswith('.pdf'):
+                os.remove(entry.path)
+            elif entry.name.endswith('.json'):
+                # Parámetros de un stream (los .txt de trabajos encolados no tienen .json y se conservan)
+                text_path, params_path = stream_request_paths(entry.name[:-len('.json')])
+                for path in (text_path, params_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            else:
+                continue
+            print(f"Eliminado resto de una petición antigua: {entry.name}")
+        except OSError as e:
+            print(f"Error eliminando {entry.path}: {e}")
+
+
+# --- Catálogo de voces ---
+
+def catalog_response(source):
+    """Responde un valor del catálogo con ETag; devuelve 304 si el cliente ya lo tiene."""
+    value, etag, stale = source.get()
+    response = jsonify(value)
+    response.set_etag(etag)
+    # El navegador guarda la respuesta pero revalida siempre (barato gracias al 304)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Catalog-Status'] = 'stale' if stale else 'fresh'
+    return response.make_conditional(request)
+
+if os.getenv('VOICES_BACKGROUND_REFRESH', '1') != '0':
+    start_background_refresh()
+
+def send_artifact(filename, mimetype=None):
+    """Sirve un archivo de OUTPUT_DIR por su nombre, consultando solo el índice de artefactos."""
+    artifact = artifacts.lookup(filename)
+    if artifact is None:
+        return jsonify({'error': 'Archivo no encontrado'}), 404
+    response = send_from_directory(OUTPUT_DIR, filename, mimetype=mimetype)
+    # Los nombres únicos (uuid) no cambian de contenido; el resto se revalida con ETag
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable' if artifact['immutable'] else 'no-cache'
+    return response
 
 @app.route('/api/output/<path:filename>')
 def serve_output(filename):
-    return send_from_directory(OUTPUT_DIR, filename)
+    return send_artifact(filename)
 
 
 @app.route('/api/voices', methods=['GET'])
 def get_voices():
-    async def list_voices():
-        return await edge_tts.list_voices()
-    
     try:
-        voices = asyncio.run(list_voices())
-        return jsonify(voices)
+        return catalog_response(edge_voices)
     except Exception as e:
         return jsonify({'error': f'Error obteniendo voces: {str(e)}'}), 500
 
 @app.route('/api/local-voices', methods=['GET'])
 def get_local_voices():
     try:
-        voices = list_windows_voices()
-        return jsonify(voices)
+        return catalog_response(local_voices)
     except Exception as e:
         return jsonify({'error': f'Error obteniendo voces locales: {str(e)}'}), 500
 
 @app.route('/api/tts-capabilities', methods=['GET'])
 def get_tts_capabilities_route():
     try:
-        return jsonify(get_tts_capabilities())
+        return catalog_response(tts_capabilities)
     except Exception as e:
         return jsonify({'error': f'Error obteniendo capacidades TTS: {str(e)}'}), 500
 
+@app.route('/api/tts-providers', methods=['GET'])
+def get_tts_providers():
+    """Salud de cada proveedor TTS (latencia, tasa de error, circuito) en el orden en que se elegirían."""
+    return jsonify(get_provider_status())
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Métricas en formato de texto de Prometheus."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    try:
+        stats = get_cache_stats()
+        stats['audioFragments'] = get_audio_cache_stats()
+        stats['artifacts'] = artifacts.stats()
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': f'Error obteniendo estadísticas de caché: {str(e)}'}), 500
+
 @app.route('/api/pdf-to-text', methods=['POST'])
 def pdf_to_text():
-    # Ejecutar limpieza antes de procesar el nuevo archivo
-    cleanup_old_files()
-    
     if 'pdf' not in request.files:
         return jsonify({'error': 'No se envió ningún archivo PDF'}), 400
     
-    pdf_file = request.files['pdf']
     lang = request.form.get('lang', 'spa')
-    
-    # Guardar temporalmente el archivo para procesarlo
-    temp_filename = str(uuid.uuid4()) + ".pdf"
-    pdf_path = os.path.join(INPUT_DIR, temp_filename)
-    pdf_file.save(pdf_path)
+
+    # El archivo ya quedó en el directorio de la petición (se elimina al terminar la respuesta)
+    pdf_path, pdf_hash = finish_upload(request.files['pdf'])
+
+    if request.form.get('stream', '').lower() in ('1', 'true', 'yes'):
+        # Modo incremental: se envía el texto de cada página apenas está listo
+        def generate():
+            try:
+                for idx, page_text in enumerate(iter_text_from_pdf(pdf_path, language=lang, pdf_hash=pdf_hash)):
+                    yield page_text if idx == 0 else " " + page_text
+            except Exception as e:
+                print(f"Error procesando PDF en modo streaming: {e}")
+                yield f"{STREAM_ERROR_MARKER}Error procesando PDF: {e}"
+
+        response = Response(stream_with_context(generate()), mimetype='text/plain; charset=utf-8')
+        response.headers['X-Stream-Error-Marker'] = STREAM_ERROR_MARKER.strip()
+        return response
 
     try:
-        extracted_text = extract_text_from_pdf(pdf_path, language=lang)
-        return jsonify({'text': extracted_text})
+        page_stats = []
+        extracted_text = extract_text_from_pdf(pdf_path, language=lang, pdf_hash=pdf_hash, page_stats=page_stats)
+        return jsonify({'text': extracted_text, 'pages': page_stats})
     except Exception as e:
         return jsonify({'error': f'Error procesando PDF: {str(e)}'}), 500
-    finally:
-        # Limpiar el archivo temporal
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
 
 @app.route('/api/text-to-audio', methods=['POST'])
 def text_to_audio():
@@ -113,69 +266,223 @@ def text_to_audio():
 
     text = data['text']
     voice = data['voice']
-    speed = data.get('speed', 1.0)
-    
-    # Generar un nombre de archivo único para el audio
-    audio_filename = str(uuid.uuid4()) + ".mp3"
+    try:
+        speed = parse_speed(data.get('speed'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not text.strip():
+        return jsonify({'error': 'El texto está vacío'}), 400
+
+    if data.get('session'):
+        return text_to_audio_session(data, text, voice, speed)
+
+    def produce():
+        # Generar un nombre de archivo único para el audio
+        audio_filename = str(uuid.uuid4()) + ".mp3"
+        output_path = os.path.join(OUTPUT_DIR, audio_filename)
+        try:
+            # Síntesis directa en el hilo de la petición (sin archivo temporal ni un event loop nuevo
+            # por petición); el servidor async (async_app.py) atiende el mismo endpoint sin hilos
+            synthesis_result = synthesize_text_to_file(text, output_path, voice, speed=speed)
+            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+                raise RuntimeError('La conversión finalizó sin generar un archivo MP3 válido')
+        except Exception:
+            remove_output(output_path)
+            raise
+        record_audio_output(output_path, immutable=True)
+        return dict(synthesis_result, audio=audio_filename)
+
+    try:
+        # Peticiones idénticas simultáneas comparten una sola síntesis y su MP3 (ver tts_coalesce)
+        synthesis_result, outcome = get_coalescer().run(synthesis_key(text, voice, speed), produce, is_valid=output_exists)
+    except Exception as e:
+        return jsonify({'error': f'Error generando audio: {str(e)}'}), 500
+    return jsonify({
+        'audio': synthesis_result['audio'],
+        'provider': synthesis_result['provider'],
+        'voiceRequested': synthesis_result['voice_requested'],
+        'voiceUsed': synthesis_result['voice_used'],
+        'speedUsed': speed,
+        'audioCache': synthesis_result['cache'],
+        'coalesced': None if outcome == LEADER else outcome,
+    })
+
+def text_to_audio_session(data, text, voice, speed):
+    """
+    Modo sesión de /api/text-to-audio ("session": true para empezar, o el id devuelto antes):
+    tras una edición solo se sintetizan los fragmentos que cambiaron (ver tts_sessions).
+    Las sesiones nuevas con el mismo texto se sintetizan una sola vez: quien se une recibe
+    el mismo MP3 y una copia de la sesión, que después edita por su cuenta.
+    """
+    store = get_session_store()
+    session_id = data['session'] if isinstance(data['session'], str) else None
+
+    def produce(session_id=None):
+        audio_filename = str(uuid.uuid4()) + ".mp3"
+        output_path = os.path.join(OUTPUT_DIR, audio_filename)
+        try:
+            synthesis_result = synthesize_session_to_file(session_id, text, output_path, voice, speed=speed)
+        except Exception:
+            remove_output(output_path)
+            raise
+        record_audio_output(output_path, immutable=True)
+        return dict(synthesis_result, audio=audio_filename)
+
+    def shared_session_exists(result):
+        return output_exists(result) and store.load(result['session']) is not None
+
+    try:
+        if session_id and store.load(session_id) is not None:
+            # La edición depende del estado de esta sesión: no se comparte
+            synthesis_result, outcome = produce(session_id), LEADER
+        else:
+            synthesis_result, outcome = get_coalescer().run(
+                synthesis_key(text, voice, speed, 'session'), produce, is_valid=shared_session_exists,
+            )
+            if outcome != LEADER:
+                forked = store.fork(synthesis_result['session'])
+                if forked is None:
+                    # La sesión compartida expiró entre medio: se sintetiza aparte
+                    synthesis_result, outcome = produce(), LEADER
+                else:
+                    synthesis_result = dict(synthesis_result, session=forked)
+    except Exception as e:
+        return jsonify({'error': f'Error generando audio: {str(e)}'}), 500
+    return jsonify({
+        'audio': synthesis_result['audio'],
+        'provider': synthesis_result['provider'],
+        'voiceRequested': synthesis_result['voice_requested'],
+        'voiceUsed': synthesis_result['voice_used'],
+        'speedUsed': speed,
+        'audioCache': synthesis_result['cache'],
+        'session': synthesis_result['session'],
+        'fragments': synthesis_result['fragments'],
+        'fragmentsReused': synthesis_result['reused'],
+        'fragmentsSynthesized': synthesis_result['synthesized'],
+        'coalesced': None if outcome == LEADER else outcome,
+    })
+
+# --- Audio progresivo ---
+
+def stream_request_paths(stream_id):
+    """Rutas del texto pendiente y sus parámetros para una sesión de streaming."""
+    return (
+        os.path.join(INPUT_DIR, f"{stream_id}.txt"),
+        os.path.join(INPUT_DIR, f"{stream_id}.json"),
+    )
+
+@app.route('/api/text-to-audio/stream', methods=['POST'])
+def create_audio_stream():
+    """
+    Registra un texto para síntesis progresiva y devuelve la URL que lo reproduce.
+    El audio empieza a enviarse apenas está listo el primer fragmento.
+    """
+    data = request.get_json()
+    if not data or 'text' not in data or 'voice' not in data:
+        return jsonify({'error': 'Faltan los parámetros "text" o "voice"'}), 400
+    try:
+        speed = parse_speed(data.get('speed'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stream_id = str(uuid.uuid4())
+    text_path, params_path = stream_request_paths(stream_id)
+    with open(text_path, 'w', encoding='utf-8') as f:
+        f.write(data['text'])
+    with open(params_path, 'w', encoding='utf-8') as f:
+        json.dump({'voice': data['voice'], 'speed': speed}, f)
+
+    return jsonify({
+        'stream': f"/api/text-to-audio/stream/{stream_id}",
+        'audio': f"{stream_id}.mp3",
+    }), 201
+
+@app.route('/api/text-to-audio/stream/<stream_id>', methods=['GET'])
+def play_audio_stream(stream_id):
+    try:
+        stream_id = str(uuid.UUID(stream_id))
+    except ValueError:
+        return jsonify({'error': 'Identificador de stream inválido'}), 400
+
+    audio_filename = f"{stream_id}.mp3"
     output_path = os.path.join(OUTPUT_DIR, audio_filename)
+    if artifacts.lookup(audio_filename) is not None:
+        # Stream ya completado: se reproduce el archivo persistido
+        return send_artifact(audio_filename, mimetype='audio/mpeg')
 
-    # Crear un archivo de texto temporal para usar con text_to_speech
-    temp_text_filename = str(uuid.uuid4()) + ".txt"
-    temp_text_path = os.path.join(INPUT_DIR, temp_text_filename)
-    
-    with open(temp_text_path, 'w', encoding='utf-8') as f:
-        f.write(text)
+    text_path, params_path = stream_request_paths(stream_id)
+    try:
+        with open(params_path, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+        with open(text_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return jsonify({'error': 'Stream no encontrado o expirado'}), 404
+
+    if not text.strip():
+        return jsonify({'error': 'El texto está vacío'}), 400
 
     try:
-        # Llamar a la función principal de texto a voz con el archivo temporal
-        synthesis_result = asyncio.run(text_to_speech(temp_text_path, output_path, voice, speed=float(speed)))
-        if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
-            raise RuntimeError('La conversión finalizó sin generar un archivo MP3 válido')
-        return jsonify({
-            'audio': audio_filename,
-            'provider': synthesis_result.get('provider') if synthesis_result else None,
-            'voiceRequested': synthesis_result.get('voice_requested') if synthesis_result else voice,
-            'voiceUsed': synthesis_result.get('voice_used') if synthesis_result else voice,
-            'speedUsed': float(speed),
-        })
+        info, chunks = iter_text_to_speech_mp3(text, params['voice'], speed=params['speed'])
     except Exception as e:
-        if os.path.exists(output_path):
-            try:
-                os.remove(output_path)
-            except OSError:
-                pass
         return jsonify({'error': f'Error generando audio: {str(e)}'}), 500
-    finally:
-        # Limpiar el archivo de texto temporal
-        if os.path.exists(temp_text_path):
-            os.remove(temp_text_path)
+
+    def generate():
+        # El texto pendiente se conserva hasta que el MP3 queda completo (o expira, ver
+        # cleanup_stale_inputs): un reintento o una petición con Range mientras tanto vuelve
+        # a sintetizar (los fragmentos ya hechos salen de la caché de audio) en vez de dar 404.
+        # Cada petición escribe su propio .part; la primera que termina deja el MP3.
+        partial_path = f"{output_path}.{uuid.uuid4().hex[:8]}.part"
+        completed = False
+        try:
+            with open(partial_path, 'wb') as partial:
+                for chunk in chunks:
+                    partial.write(chunk)
+                    yield chunk
+            os.replace(partial_path, output_path)
+            completed = True
+            record_audio_output(output_path, immutable=True)
+            for path in (params_path, text_path):
+                remove_output(path)
+            print(f"Audio progresivo guardado en: {output_path}")
+        except Exception as e:
+            print(f"Error durante el audio progresivo {stream_id}: {e}")
+        finally:
+            if not completed and os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    response = Response(stream_with_context(generate()), mimetype='audio/mpeg')
+    response.headers['X-Audio-File'] = audio_filename
+    response.headers['X-TTS-Provider'] = info['provider'] or ''
+    response.headers['X-TTS-Voice'] = info['voice_used'] or ''
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 @app.route('/api/procesar', methods=['POST'])
 def procesar():
     if 'pdf' not in request.files:
         return jsonify({'error': 'No se envió ningún archivo PDF'}), 400
     pdf_file = request.files['pdf']
-    pdf_filename = pdf_file.filename
-    pdf_path = os.path.join(INPUT_DIR, pdf_filename)
-    pdf_file.save(pdf_path)
+    pdf_filename = os.path.basename(pdf_file.filename or 'documento.pdf')
+    # Directorio único por petición: subidas simultáneas con el mismo nombre no chocan
+    pdf_path, pdf_hash = finish_upload(pdf_file)
 
     lang = request.form.get('lang', 'spa')
     voice = request.form.get('voice', 'es-ES-ElviraNeural')
-    base_name = os.path.splitext(pdf_filename)[0]
-    out_txt_name = request.form.get('out', f"{base_name}.txt")
-    out_audio_name = request.form.get('audio', f"{base_name}.mp3")
+    base_name = os.path.splitext(pdf_filename)[0] or 'documento'
+    out_txt_name = unique_output_name(request.form.get('out'), f"{base_name}.txt")
+    out_audio_name = unique_output_name(request.form.get('audio'), f"{base_name}.mp3")
     out_txt = os.path.join(OUTPUT_DIR, out_txt_name)
     out_audio = os.path.join(OUTPUT_DIR, out_audio_name)
 
     try:
-        ocr_pdf_to_text(pdf_path, out_txt, language=lang)
+        # OCR y síntesis superpuestos: el audio empieza mientras quedan páginas por procesar
+        synthesis_result = pdf_to_audio(pdf_path, out_txt, out_audio, language=lang, voice=voice, pdf_hash=pdf_hash)
     except Exception as e:
         return jsonify({'error': f'Error procesando PDF: {str(e)}'}), 500
-
-    try:
-        asyncio.run(text_to_speech(out_txt, out_audio, voice=voice))
-    except Exception as e:
-        return jsonify({'error': f'Error generando audio: {str(e)}'}), 500
+    artifacts.register(out_txt)
+    if synthesis_result['provider']:
+        record_audio_output(out_audio, immutable=True)
 
     return jsonify({
         'pdf': pdf_filename,
@@ -185,5 +492,152 @@ def procesar():
         'voz': voice
     })
 
+# --- Trabajos asíncronos ---
+
+def run_procesar_job(params, report):
+    """Trabajo equivalente a /api/procesar: OCR del PDF y síntesis superpuestos (ver pipeline)."""
+    report(stage='pipeline', page=0, pages=None, fragment=0, fragments=None)
+    try:
+        synthesis_result = pdf_to_audio(
+            params['pdf_path'], params['out_txt'], params['out_audio'], language=params['lang'], voice=params['voice'],
+            pdf_hash=params.get('pdf_hash'),
+            on_page=lambda page, total: report(page=page, pages=total),
+            on_fragment=lambda done, total: report(fragment=done),
+        )
+    finally:
+        # El trabajo termina aquí (bien o con error): el PDF subido ya no se necesita
+        if params.get('work_dir'):
+            shutil.rmtree(params['work_dir'], ignore_errors=True)
+        elif os.path.exists(params['pdf_path']):
+            os.remove(params['pdf_path'])
+    artifacts.register(params['out_txt'])
+    if synthesis_result['provider']:
+        record_audio_output(params['out_audio'], immutable=True)
+    report(stage='done')
+    return {
+        'pdf': params['pdf'],
+        'texto': os.path.basename(params['out_txt']),
+        'audio': os.path.basename(params['out_audio']),
+        'idioma': params['lang'],
+        'voz': params['voice'],
+        'provider': synthesis_result.get('provider') if synthesis_result else None,
+    }
+
+def run_text_to_audio_job(params, report):
+    """Trabajo equivalente a /api/text-to-audio."""
+    report(stage='tts', fragment=0, fragments=None)
+    speed = float(params['speed'])
+    output_path = os.path.join(OUTPUT_DIR, params['audio'])
+    try:
+        with open(params['text_path'], 'r', encoding='utf-8') as f:
+            text = f.read()
+        if not text.strip():
+            raise RuntimeError('El texto está vacío')
+        synthesis_result = synthesize_text_to_file(
+            text, output_path, params['voice'], speed=speed,
+            on_fragment=lambda done, total: report(fragment=done, fragments=total),
+        )
+        if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            raise RuntimeError('La conversión finalizó sin generar un archivo MP3 válido')
+        record_audio_output(output_path, immutable=True)
+    finally:
+        if os.path.exists(params['text_path']):
+            os.remove(params['text_path'])
+    report(stage='done')
+    return {
+        'audio': params['audio'],
+        'provider': synthesis_result.get('provider') if synthesis_result else None,
+        'voiceRequested': synthesis_result.get('voice_requested') if synthesis_result else params['voice'],
+        'voiceUsed': synthesis_result.get('voice_used') if synthesis_result else params['voice'],
+        'speedUsed': speed,
+        'audioCache': synthesis_result.get('cache') if synthesis_result else None,
+    }
+
+job_manager.register('procesar', run_procesar_job)
+job_manager.register('text-to-audio', run_text_to_audio_job)
+job_manager.recover()
+
+@app.route('/api/jobs/procesar', methods=['POST'])
+def submit_procesar_job():
+    if 'pdf' not in request.files:
+        return jsonify({'error': 'No se envió ningún archivo PDF'}), 400
+    pdf_file = request.files['pdf']
+    pdf_filename = os.path.basename(pdf_file.filename or 'documento.pdf')
+    upload_path, pdf_hash = finish_upload(pdf_file)
+    # El PDF sobrevive a la petición: se mueve (sin copiar) a un directorio propio del trabajo
+    work_dir = tempfile.mkdtemp(prefix='job_', dir=INPUT_DIR)
+    pdf_path = os.path.join(work_dir, 'documento.pdf')
+    os.replace(upload_path, pdf_path)
+
+    base_name = os.path.splitext(pdf_filename)[0] or 'documento'
+    params = {
+        'pdf': pdf_filename,
+        'pdf_path': pdf_path,
+        'pdf_hash': pdf_hash,
+        'work_dir': work_dir,
+        'lang': request.form.get('lang', 'spa'),
+        'voice': request.form.get('voice', 'es-ES-ElviraNeural'),
+        'out_txt': os.path.join(OUTPUT_DIR, unique_output_name(request.form.get('out'), f"{base_name}.txt")),
+        'out_audio': os.path.join(OUTPUT_DIR, unique_output_name(request.form.get('audio'), f"{base_name}.mp3")),
+    }
+    job_id = job_manager.submit('procesar', params)
+    return jsonify({'job': job_id, 'status': 'queued'}), 202
+
+@app.route('/api/jobs/text-to-audio', methods=['POST'])
+def submit_text_to_audio_job():
+    data = request.get_json()
+    if not data or 'text' not in data or 'voice' not in data:
+        return jsonify({'error': 'Faltan los parámetros "text" o "voice"'}), 400
+
+    try:
+        speed = parse_speed(data.get('speed'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # El texto se guarda en disco para que el trabajo sobreviva a un reinicio
+    text_path = os.path.join(INPUT_DIR, str(uuid.uuid4()) + ".txt")
+    with open(text_path, 'w', encoding='utf-8') as f:
+        f.write(data['text'])
+
+    params = {
+        'text_path': text_path,
+        'voice': data['voice'],
+        'speed': speed,
+        'audio': str(uuid.uuid4()) + ".mp3",
+    }
+    job_id = job_manager.submit('text-to-audio', params)
+    return jsonify({'job': job_id, 'status': 'queued'}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify({
+        'job': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'error': job['error'],
+        'createdAt': job['createdAt'],
+        'updatedAt': job['updatedAt'],
+    })
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    if job['status'] == DONE:
+        return jsonify(job['result'])
+    if job['status'] == ERROR:
+        return jsonify({'error': job['error']}), 500
+    return jsonify({'job': job['id'], 'status': job['status'], 'progress': job['progress']}), 202
+
+if os.getenv('ARTIFACT_BACKGROUND_EVICTION', '1') != '0':
+    start_background_eviction(artifacts, on_tick=cleanup_stale_inputs)
+
+record_startup('app', time.perf_counter() - _startup_started)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000, host='0.0.0.0')
@@ -0,0 +1,254 @@
+"""
+Almacén de archivos generados (MP3 y .txt en output/) con índice y expulsión en segundo plano.
+
+Cada archivo se registra al terminar de escribirse con su tamaño, fecha de creación y último
+acceso en un índice SQLite dentro del mismo directorio (.artifacts.sqlite3), compartido por
+los workers y por async_app. Un hilo expulsa periódicamente lo que no se usó en
+ARTIFACT_TTL segundos y, si se supera ARTIFACT_MAX_BYTES, lo usado hace más tiempo. Así
+ninguna petición recorre el directorio: servir o registrar un archivo es una consulta
+al índice, sin importar cuántos archivos haya.
+
+Solo se expulsa lo que está en el índice: lo que registró el servidor y, al reconciliar,
+los MP3 con nombre uuid que generaba antes del índice. El resto del directorio (los .txt
+y los *.part.mp3 del procesamiento por lotes, por ejemplo) no se toca.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+INDEX_FILE = '.artifacts.sqlite3'
+
+# Archivos que el almacén adopta al reconciliar el directorio: los MP3 <uuid4>.mp3 de
+# /api/text-to-audio, el stream y los trabajos, escritos antes de que existiera el índice
+ADOPTABLE_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.mp3')
+
+# El último acceso se guarda con esta resolución: servir un archivo popular no escribe en
+# el índice en cada petición
+ACCESS_RESOLUTION = 60
+
+# Los archivos modificados hace menos de esto pueden estar escribiéndose todavía
+SETTLE_SECONDS = 60
+
+
+def get_artifact_ttl():
+    """Segundos sin accesos tras los que se elimina un archivo (ARTIFACT_TTL, por defecto 12 h)."""
+    try:
+        return max(60, int(os.getenv('ARTIFACT_TTL', str(12 * 60 * 60))))
+    except ValueError:
+        return 12 * 60 * 60
+
+def get_artifact_max_bytes():
+    """Espacio máximo de output/ (ARTIFACT_MAX_BYTES, por defecto 5 GB)."""
+    try:
+        return max(1, int(os.getenv('ARTIFACT_MAX_BYTES', str(5 * 1024 ** 3))))
+    except ValueError:
+        return 5 * 1024 ** 3
+
+def get_artifact_evict_interval():
+    try:
+        return max(1.0, float(os.getenv('ARTIFACT_EVICT_INTERVAL', '300')))
+    except ValueError:
+        return 300.0
+
+
+class ArtifactStore:
+    """
+    Archivos de un directorio identificados por su nombre. register() los agrega al índice,
+    lookup() los busca para servirlos (y actualiza el último acceso) y evict() aplica el
+    TTL y la cuota a los archivos del índice.
+    """
+
+    def __init__(self, directory, max_bytes, ttl, access_resolution=ACCESS_RESOLUTION):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.access_resolution = access_resolution
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    name TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    immutable INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                '''
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS artifacts_accessed ON artifacts (accessed_at)')
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _valid_name(self, name):
+        return bool(name) and os.path.basename(name) == name and not name.startswith('.')
+
+    def register(self, path, immutable=False):
+        """
+        Agrega (o actualiza) un archivo ya escrito en el directorio. immutable indica que su
+        nombre es único y el contenido no cambia (p. ej. un uuid), así se puede cachear sin revalidar.
+        """
+        name = os.path.basename(path)
+        try:
+            size = os.path.getsize(self.path(name))
+        except OSError:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO artifacts (name, size, immutable, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (name, size, int(immutable), now, now),
+            )
+
+    def _count(self, hits=0, misses=0, evictions=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def lookup(self, name):
+        """
+        Datos del archivo para servirlo ({'path', 'size', 'immutable', 'created_at'}) o None si
+        no existe. Un archivo presente pero fuera del índice se sirve sin adoptarlo: el almacén
+        no expulsa archivos que no registró.
+        """
+        if not self._valid_name(name):
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM artifacts WHERE name = ?', (name,)).fetchone()
+            if row is not None and row['accessed_at'] < now - self.access_resolution:
+                self._conn.execute('UPDATE artifacts SET accessed_at = ? WHERE name = ?', (now, name))
+        if row is None:
+            if not os.path.isfile(self.path(name)):
+                self._count(misses=1)
+                return None
+            self._count(hits=1)
+            return {'path': self.path(name), 'size': os.path.getsize(self.path(name)), 'immutable': False, 'created_at': now}
+        if not os.path.isfile(self.path(name)):
+            # Se borró por fuera del almacén
+            self._forget([name])
+            self._count(misses=1)
+            return None
+        self._count(hits=1)
+        return {'path': self.path(name), 'size': row['size'], 'immutable': bool(row['immutable']), 'created_at': row['created_at']}
+
+    def _forget(self, names):
+        with self._lock:
+            self._conn.executemany('DELETE FROM artifacts WHERE name = ?', [(name,) for name in names])
+
+    def _remove(self, names):
+        removed = []
+        for name in names:
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error eliminando archivo {self.path(name)}: {e}")
+                continue
+            removed.append(name)
+        self._forget(removed)
+        self._count(evictions=len(removed))
+        return removed
+
+    def evict(self):
+        """Elimina lo que superó el TTL y, si hace falta, lo usado hace más tiempo hasta entrar en la cuota."""
+        limit = time.time() - self.ttl
+        with self._lock:
+            expired = [row['name'] for row in self._conn.execute('SELECT name FROM artifacts WHERE accessed_at < ?', (limit,))]
+        removed = self._remove(expired)
+
+        with self._lock:
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM artifacts').fetchone()[0]
+            over_quota = []
+            if total > self.max_bytes:
+                for row in self._conn.execute('SELECT name, size FROM artifacts ORDER BY accessed_at'):
+                    if total <= self.max_bytes:
+                        break
+                    over_quota.append(row['name'])
+                    total -= row['size']
+        removed += self._remove(over_quota)
+        if removed:
+            print(f"[artefactos] {len(removed)} archivos eliminados ({len(expired)} por antigüedad)")
+        return removed
+
+    def reconcile(self):
+        """
+        Recorre el directorio una vez (al iniciar, en segundo plano): adopta los MP3 con
+        nombre uuid que no están en el índice (ADOPTABLE_RE), con su fecha de modificación
+        como último acceso, y olvida los registrados que ya no existen.
+        """
+        with self._lock:
+            known = {row['name'] for row in self._conn.execute('SELECT name FROM artifacts')}
+        present = set()
+        settled = time.time() - SETTLE_SECONDS
+        adopted = []
+        for entry in os.scandir(self.directory):
+            if entry.name in known:
+                present.add(entry.name)
+                continue
+            if not ADOPTABLE_RE.fullmatch(entry.name) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            if stat.st_mtime < settled:
+                adopted.append((entry.name, stat.st_size, stat.st_mtime, stat.st_mtime))
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO artifacts (name, size, created_at, accessed_at) VALUES (?, ?, ?, ?)', adopted,
+            )
+        self._forget([name for name in known - present if not os.path.exists(self.path(name))])
+
+    def stats(self):
+        """Contadores con la misma forma que DiskLRUCache.stats, para /api/cache/stats y las métricas."""
+        with self._lock:
+            entries, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts').fetchone()
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'bytes': total,
+            'maxBytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'hitRatio': round(hits / lookups, 4) if lookups else 0.0,
+            'evictions': evictions,
+        }
+
+
+def start_background_eviction(store, interval=None, on_tick=None):
+    """
+    Hilo daemon que reconcilia el directorio una vez y luego aplica store.evict() cada
+    interval segundos (ARTIFACT_EVICT_INTERVAL). on_tick() se ejecuta en cada vuelta
+    (p. ej. para limpiar restos de subidas interrumpidas).
+    """
+    interval = interval or get_artifact_evict_interval()
+
+    def loop():
+        try:
+            store.reconcile()
+        except Exception as e:
+            print(f"[artefactos] Error reconciliando {store.directory}: {e}")
+        while True:
+            for task in (store.evict, on_tick):
+                if task is None:
+                    continue
+                try:
+                    task()
+                except Exception as e:
+                    print(f"[artefactos] Error en la limpieza: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name='artifact-eviction', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,172 @@
+"""
+Servidor async (aiohttp.web) para /api/text-to-audio.
+
+Atiende el mismo endpoint y el mismo JSON que app.py, pero cada petición es una tarea del
+event loop en vez de un hilo: mientras los proveedores responden, miles de peticiones en
+espera no ocupan hilos ni sus pilas. Los fragmentos se piden con las funciones async de
+cada proveedor (ver tts_async) y las peticiones idénticas simultáneas comparten una sola
+síntesis (ver tts_coalesce). Las rutas de OCR, trabajos y sesiones siguen en app.py.
+
+Uso (desde backend):
+    python async_app.py            # puerto ASYNC_PORT (5001 por defecto)
+"""
+import time
+# Inicio del arranque: al final del módulo se registra cuánto tardó (metrics.record_startup)
+_startup_started = time.perf_counter()
+
+import asyncio
+import os
+import uuid
+
+from aiohttp import web
+
+from artifact_store import ArtifactStore, get_artifact_max_bytes, get_artifact_ttl, start_background_eviction
+from metrics import BYTES, REQUEST_SECONDS, record_startup, render_metrics
+from text_to_speech import parse_speed
+from tts_async import synthesize_text_to_file_async
+from tts_coalesce import LEADER, get_coalescer, synthesis_key
+from tts_http import close_async_http_session
+from tts_providers import get_provider_status
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+OUTPUT_DIR = os.path.join(basedir, 'output')
+# Mismo índice de artefactos que app.py (SQLite en output/), ver artifact_store
+artifacts = ArtifactStore(OUTPUT_DIR, get_artifact_max_bytes(), get_artifact_ttl())
+
+
+def get_async_max_jobs():
+    """Síntesis simultáneas en el servidor async (ASYNC_MAX_JOBS, por defecto 64); el resto espera su turno."""
+    try:
+        return max(1, int(os.getenv('ASYNC_MAX_JOBS', '64')))
+    except ValueError:
+        return 64
+
+def get_async_port():
+    try:
+        return int(os.getenv('ASYNC_PORT', '5001'))
+    except ValueError:
+        return 5001
+
+def record_audio_output(path):
+    if os.path.exists(path):
+        BYTES.inc(os.path.getsize(path), kind='mp3_output')
+        artifacts.register(path, immutable=True)
+
+def output_exists(result):
+    return os.path.exists(os.path.join(OUTPUT_DIR, result['audio']))
+
+def _remove(path):
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except OSError:
+        pass
+
+# --- Métricas y CORS ---
+
+@web.middleware
+async def request_middleware(request, handler):
+    started = time.perf_counter()
+    if request.method == 'OPTIONS':
+        response = web.Response()
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = request.headers.get('Access-Control-Request-Headers', '*')
+    else:
+        try:
+            response = await handler(request)
+        except web.HTTPException as e:
+            response = e
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    resource = request.match_info.route.resource
+    route = resource.canonical if resource is not None else 'no-encontrada'
+    REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method, status=str(response.status))
+    return response
+
+# --- Rutas ---
+
+async def text_to_audio(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data or 'text' not in data or 'voice' not in data:
+        return web.json_response({'error': 'Faltan los parámetros "text" o "voice"'}, status=400)
+
+    text = data['text']
+    voice = data['voice']
+    try:
+        speed = parse_speed(data.get('speed'))
+    except ValueError as e:
+        return web.json_response({'error': str(e)}, status=400)
+    if not text.strip():
+        return web.json_response({'error': 'El texto está vacío'}, status=400)
+
+    async def produce():
+        audio_filename = str(uuid.uuid4()) + ".mp3"
+        output_path = os.path.join(OUTPUT_DIR, audio_filename)
+        try:
+            async with request.app['synthesis_slots']:
+                synthesis_result = await synthesize_text_to_file_async(text, output_path, voice, speed)
+            if not await asyncio.to_thread(lambda: os.path.exists(output_path) and os.path.getsize(output_path) > 0):
+                raise RuntimeError('La conversión finalizó sin generar un archivo MP3 válido')
+        except BaseException:
+            await asyncio.to_thread(_remove, output_path)
+            raise
+        await asyncio.to_thread(record_audio_output, output_path)
+        return dict(synthesis_result, audio=audio_filename)
+
+    try:
+        # Peticiones idénticas simultáneas comparten una sola síntesis y su MP3 (ver tts_coalesce)
+        synthesis_result, outcome = await get_coalescer().run_async(
+            synthesis_key(text, voice, speed), produce, is_valid=output_exists,
+        )
+    except Exception as e:
+        return web.json_response({'error': f'Error generando audio: {str(e)}'}, status=500)
+    return web.json_response({
+        'audio': synthesis_result['audio'],
+        'provider': synthesis_result['provider'],
+        'voiceRequested': synthesis_result['voice_requested'],
+        'voiceUsed': synthesis_result['voice_used'],
+        'speedUsed': speed,
+        'audioCache': synthesis_result['cache'],
+        'coalesced': None if outcome == LEADER else outcome,
+    })
+
+async def serve_output(request):
+    artifact = await asyncio.to_thread(artifacts.lookup, request.match_info['filename'])
+    if artifact is None:
+        return web.json_response({'error': 'Archivo no encontrado'}, status=404)
+    # Los nombres únicos (uuid) no cambian de contenido; el resto se revalida con ETag
+    cache_control = 'public, max-age=31536000, immutable' if artifact['immutable'] else 'no-cache'
+    return web.FileResponse(artifact['path'], headers={'Cache-Control': cache_control})
+
+async def get_tts_providers(request):
+    """Salud de cada proveedor TTS (latencia, tasa de error, circuito) en el orden en que se elegirían."""
+    return web.json_response(get_provider_status())
+
+async def metrics(request):
+    """Métricas en formato de texto de Prometheus."""
+    return web.Response(text=render_metrics(), content_type='text/plain', charset='utf-8')
+
+async def close_sessions(app):
+    await close_async_http_session()
+
+_eviction_thread = None
+
+def create_app():
+    app = web.Application(middlewares=[request_middleware], client_max_size=16 * 1024 * 1024)
+    app['synthesis_slots'] = asyncio.Semaphore(get_async_max_jobs())
+    app.router.add_post('/api/text-to-audio', text_to_audio)
+    app.router.add_get('/api/output/{filename}', serve_output)
+    app.router.add_get('/api/tts-providers', get_tts_providers)
+    app.router.add_get('/api/metrics', metrics)
+    app.on_cleanup.append(close_sessions)
+    global _eviction_thread
+    if _eviction_thread is None and os.getenv('ARTIFACT_BACKGROUND_EVICTION', '1') != '0':
+        _eviction_thread = start_background_eviction(artifacts)
+    return app
+
+record_startup('async_app', time.perf_counter() - _startup_started)
+
+if __name__ == '__main__':
+    web.run_app(create_app(), host='0.0.0.0', port=get_async_port())
@@ -0,0 +1,145 @@
+import subprocess
+import threading
+import wave
+
+from metrics import span
+
+
+def mp3_encoder_command(ffmpeg_bin, output, sample_rate, channels=1, quality='2'):
+    """Comando ffmpeg que codifica PCM int16 de stdin a MP3 en output (ruta o 'pipe:1')."""
+    return [
+        ffmpeg_bin, '-y', '-loglevel', 'error',
+        '-f', 's16le', '-ar', str(sample_rate), '-ac', str(channels), '-i', 'pipe:0',
+        '-codec:a', 'libmp3lame', '-q:a', str(quality), '-f', 'mp3', output,
+    ]
+
+
+class Mp3EncoderSink:
+    """
+    Codificador MP3 de una sola pasada: un único ffmpeg recibe PCM int16 por stdin
+    y escribe el MP3 final. Todos los fragmentos se codifican en el mismo proceso,
+    sin archivos intermedios por fragmento ni paso de concatenación.
+
+    Uso:
+        with Mp3EncoderSink(ffmpeg_bin, 'salida.mp3', sample_rate=22050) as sink:
+            sink.write(pcm_bytes)
+    """
+
+    def __init__(self, ffmpeg_bin, output_file, sample_rate, channels=1, quality='2'):
+        self.output_file = output_file
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bytes_written = 0
+        self._stderr_tail = b''
+        cmd = mp3_encoder_command(ffmpeg_bin, output_file, sample_rate, channels, quality)
+        self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        # Vaciar stderr en segundo plano para que ffmpeg nunca se bloquee escribiendo logs
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+
+    def _drain_stderr(self):
+        for line in self._process.stderr:
+            self._stderr_tail = (self._stderr_tail + line)[-4000:]
+
+    def write(self, pcm):
+        """Envía un bloque de PCM int16 intercalado al codificador."""
+        if not pcm:
+            return
+        try:
+            self._process.stdin.write(pcm)
+        except BrokenPipeError as e:
+            raise RuntimeError(f"ffmpeg terminó antes de tiempo: {self._error_detail()}") from e
+        self.bytes_written += len(pcm)
+
+    def write_wav(self, wav_path, chunk_frames=65536):
+        """Transfiere un WAV PCM de 16 bits al codificador por bloques."""
+        with wave.open(wav_path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise RuntimeError('Solo se admiten WAV PCM de 16 bits')
+            if wav.getframerate() != self.sample_rate or wav.getnchannels() != self.channels:
+                raise RuntimeError('El WAV no coincide con el formato del codificador')
+            while True:
+                frames = wav.readframes(chunk_frames)
+                if not frames:
+                    break
+                self.write(frames)
+
+    def close(self):
+        """Cierra la entrada y espera a que ffmpeg termine de escribir el MP3."""
+        if self._process.stdin and not self._process.stdin.closed:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+        with span('ffmpeg_finish'):
+            returncode = self._process.wait()
+        self._stderr_thread.join(timeout=5)
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg devolvió código {returncode}: {self._error_detail()}")
+
+    def abort(self):
+        """Detiene el codificador sin esperar un MP3 válido (usado ante errores)."""
+        try:
+            self._process.kill()
+        finally:
+            self._process.wait()
+
+    def _error_detail(self):
+        return self._stderr_tail.decode('utf-8', errors='replace').strip() or 'sin detalle'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def iter_encoded_mp3(ffmpeg_bin, pcm_chunks, sample_rate, channels=1, quality='2', read_size=16384):
+    """
+    Codifica en streaming: un hilo envía los bloques PCM de `pcm_chunks` a ffmpeg mientras
+    este generador entrega los bytes MP3 a medida que ffmpeg los produce.
+    Si `pcm_chunks` falla, la excepción se propaga al consumidor al terminar el stream.
+    """
+    cmd = mp3_encoder_command(ffmpeg_bin, 'pipe:1', sample_rate, channels, quality)
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    errors = []
+
+    def feed():
+        try:
+            for pcm in pcm_chunks:
+                process.stdin.write(pcm)
+                process.stdin.flush()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        while True:
+            data = process.stdout.read1(read_size)
+            if not data:
+                break
+            yield data
+        feeder.join()
+        returncode = process.wait()
+        if errors:
+            raise errors[0]
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg devolvió código {returncode}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+def read_wav_format(wav_path):
+    """Devuelve (sample_rate, channels) de un WAV."""
+    with wave.open(wav_path, 'rb') as wav:
+        return wav.getframerate(), wav.getnchannels()
@@ -0,0 +1,200 @@
+"""
+Procesamiento por lotes de PDFs (modo batch de main.py).
+
+El OCR de varios PDFs corre en paralelo en un pool de procesos (un PDF por proceso, cada uno
+con su OCR secuencial) y la síntesis en un pool de hilos acotado aparte, que toma cada texto
+apenas termina su OCR. El estado de cada documento se guarda en output/.batch_state.json tras
+cada paso, con el hash del PDF, del texto y del audio:
+- si el PDF, el idioma y el texto de salida no cambiaron, no se repite el OCR;
+- si además la voz y el audio coinciden, no se repite la síntesis.
+Así, al relanzar después de una caída solo se procesa lo que quedó pendiente.
+"""
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from disk_cache import hash_file
+
+STATE_FILE = '.batch_state.json'
+
+# Se sube si cambia el formato del estado: las entradas anteriores dejan de coincidir
+STATE_VERSION = 1
+
+
+def list_pdfs(directory):
+    """PDFs de un directorio (sin recorrer subcarpetas), ordenados por nombre."""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith('.pdf') and os.path.isfile(os.path.join(directory, name))
+    )
+
+def read_manifest(path):
+    """
+    Lista de PDFs de un manifiesto: una ruta por línea (relativa a la carpeta del manifiesto),
+    ignorando líneas vacías y comentarios con #.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    pdfs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                pdfs.append(os.path.join(base, line))
+    return pdfs
+
+def load_state(output_dir):
+    try:
+        with open(os.path.join(output_dir, STATE_FILE), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state.get('files', {}) if state.get('version') == STATE_VERSION else {}
+
+def save_state(output_dir, files):
+    """Escribe el estado completo de forma atómica (un corte a mitad no lo corrompe)."""
+    path = os.path.join(output_dir, STATE_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': STATE_VERSION, 'files': files}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def _file_matches(path, sha):
+    return bool(sha) and os.path.exists(path) and hash_file(path) == sha
+
+def _ocr_document(pdf_path, out_txt, language, pdf_hash):
+    """Se ejecuta en el pool de procesos: OCR de un PDF completo a out_txt."""
+    from ocr_pdf_to_text import ocr_pdf_to_text
+    start = time.perf_counter()
+    tmp = out_txt + '.part'
+    page_stats = []
+    ocr_pdf_to_text(pdf_path, tmp, language=language, workers=1, pdf_hash=pdf_hash, page_stats=page_stats)
+    os.replace(tmp, out_txt)
+    return {'text_sha': hash_file(out_txt), 'pages': len(page_stats), 'seconds': time.perf_counter() - start}
+
+def _synthesize_document(out_txt, out_audio, voice):
+    """Se ejecuta en el pool de síntesis: texto completo a out_audio."""
+    from text_to_speech import synthesize_text_to_file
+    start = time.perf_counter()
+    with open(out_txt, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if not text.strip():
+        return {'audio_sha': None, 'provider': None, 'seconds': 0.0}
+    # Nombre temporal con extensión .mp3: ffmpeg deduce el formato de la extensión
+    tmp = os.path.splitext(out_audio)[0] + '.part.mp3'
+    info = synthesize_text_to_file(text, tmp, voice)
+    os.replace(tmp, out_audio)
+    return {'audio_sha': hash_file(out_audio), 'provider': info.get('provider'), 'seconds': time.perf_counter() - start}
+
+def run_batch(pdfs, output_dir, language='spa', voice='es-ES-ElviraNeural', jobs=None, tts_jobs=2, force=False):
+    """
+    Procesa una lista de PDFs y devuelve el reporte: una entrada por PDF con su estado
+    ('ok', 'al_dia', 'error'), los tiempos de OCR y síntesis y el proveedor usado.
+    jobs: procesos de OCR en paralelo (por defecto, los núcleos disponibles).
+    tts_jobs: documentos sintetizándose a la vez.
+    force: reprocesa aunque las salidas estén al día.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    state = load_state(output_dir)
+    report = {}
+    docs = {}
+
+    for pdf_path in pdfs:
+        key = os.path.abspath(pdf_path)
+        if key in report:
+            continue
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        entry = {'pdf': pdf_path, 'status': 'ok', 'ocr_seconds': None, 'tts_seconds': None, 'provider': None}
+        report[key] = entry
+        if any(doc['base_name'] == base_name for doc in docs.values()):
+            entry.update(status='error', error=f'Nombre de salida repetido: {base_name}')
+            continue
+        if not os.path.isfile(pdf_path):
+            entry.update(status='error', error='No se encontró el archivo PDF')
+            continue
+        docs[key] = {
+            'base_name': base_name,
+            'pdf_hash': hash_file(pdf_path),
+            'out_txt': os.path.join(output_dir, f'{base_name}.txt'),
+            'out_audio': os.path.join(output_dir, f'{base_name}.mp3'),
+        }
+
+    started = {}
+    pending = {}
+
+    def finish(key):
+        report[key]['seconds'] = round(time.perf_counter() - started[key], 3)
+
+    with ProcessPoolExecutor(max_workers=jobs) as ocr_pool, ThreadPoolExecutor(max_workers=max(1, tts_jobs)) as tts_pool:
+
+        def submit_tts(key):
+            doc = docs[key]
+            previous = state[key]
+            if not force and previous.get('voice') == voice and previous.get('audio_source') == previous['text_sha'] \
+                    and _file_matches(doc['out_audio'], previous.get('audio_sha')):
+                if report[key]['ocr_seconds'] is None:
+                    report[key]['status'] = 'al_dia'
+                finish(key)
+                return
+            future = tts_pool.submit(_synthesize_document, doc['out_txt'], doc['out_audio'], voice)
+            pending[future] = ('tts', key)
+
+        for key, doc in docs.items():
+            started[key] = time.perf_counter()
+            previous = state.get(key, {})
+            text_ok = (
+                not force and previous.get('pdf_hash') == doc['pdf_hash'] and previous.get('language') == language
+                and _file_matches(doc['out_txt'], previous.get('text_sha'))
+            )
+            if text_ok:
+                submit_tts(key)
+            else:
+                state[key] = {'pdf_hash': doc['pdf_hash'], 'language': language}
+                future = ocr_pool.submit(_ocr_document, key, doc['out_txt'], language, doc['pdf_hash'])
+                pending[future] = ('ocr', key)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, key = pending.pop(future)
+                entry = report[key]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    entry.update(status='error', error=f'{step}: {e}')
+                    print(f"[ERROR] {entry['pdf']} ({step}): {e}")
+                    finish(key)
+                    continue
+                if step == 'ocr':
+                    entry['ocr_seconds'] = round(result['seconds'], 3)
+                    entry['pages'] = result['pages']
+                    state[key].update(text_sha=result['text_sha'])
+                    save_state(output_dir, state)
+                    print(f"[OCR] {entry['pdf']}: {result['pages']} páginas en {result['seconds']:.1f} s")
+                    submit_tts(key)
+                else:
+                    entry['tts_seconds'] = round(result['seconds'], 3)
+                    entry['provider'] = result['provider']
+                    state[key].update(voice=voice, audio_source=state[key]['text_sha'], audio_sha=result['audio_sha'])
+                    save_state(output_dir, state)
+                    print(f"[TTS] {entry['pdf']}: audio en {result['seconds']:.1f} s")
+                    finish(key)
+
+    return list(report.values())
+
+def print_report(report):
+    print(f"\n{'archivo':<40} {'estado':<8} {'OCR (s)':>8} {'TTS (s)':>8} {'total (s)':>9}")
+    for entry in report:
+        name = os.path.basename(entry['pdf'])[:40]
+        row = [entry.get(field) for field in ('ocr_seconds', 'tts_seconds', 'seconds')]
+        row = [f"{value:.1f}" if value is not None else '-' for value in row]
+        print(f"{name:<40} {entry['status']:<8} {row[0]:>8} {row[1]:>8} {row[2]:>9}")
+    counts = {}
+    for entry in report:
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+    print(', '.join(f'{status}: {count}' for status, count in sorted(counts.items())))
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'generated_at': time.time(), 'files': report}, f, ensure_ascii=False, indent=1)
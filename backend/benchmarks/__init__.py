@@ -0,0 +1 @@
+"""Benchmarks del backend PDF a Audio. Ejecutar desde la carpeta backend con `python -m benchmarks.<modulo>`."""
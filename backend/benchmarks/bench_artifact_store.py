@@ -0,0 +1,135 @@
+"""
+Costo por petición del almacén de artefactos (artifact_store) según el tamaño de output/.
+
+Antes, cada /api/pdf-to-text recorría INPUT_DIR y OUTPUT_DIR con os.listdir y
+os.path.getmtime; ahora una petición solo consulta o actualiza el índice SQLite y la
+limpieza corre en un hilo. Para varios tamaños de directorio mide el recorrido anterior
+contra register() + lookup(), y comprueba que evict() respete la cuota y el TTL sin tocar
+archivos que el almacén no registró (p. ej. los del procesamiento por lotes).
+
+Uso (desde backend):
+    python -m benchmarks.bench_artifact_store --files 1000 10000 50000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from artifact_store import ArtifactStore
+
+
+def legacy_scan(directory, max_age):
+    """El recorrido que hacía cleanup_old_files en cada petición (sin borrar nada)."""
+    now = time.time()
+    old = 0
+    for filename in os.listdir(directory):
+        if filename.lower().endswith('.mp3'):
+            if os.path.getmtime(os.path.join(directory, filename)) < now - max_age:
+                old += 1
+    return old
+
+def fill(directory, count, size):
+    payload = b'\0' * size
+    for i in range(count):
+        with open(os.path.join(directory, f'{i:08d}.mp3'), 'wb') as f:
+            f.write(payload)
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        function(i)
+    return (time.perf_counter() - start) / repeat
+
+def check_eviction(failures):
+    directory = tempfile.mkdtemp(prefix='bench_artifacts_evict_')
+    try:
+        store = ArtifactStore(directory, max_bytes=10 * 1000, ttl=3600, access_resolution=0)
+        fill(directory, 20, 1000)
+        for i in range(20):
+            store.register(os.path.join(directory, f'{i:08d}.mp3'))
+            time.sleep(0.001)
+        store.lookup('00000000.mp3')  # el más viejo pasa a ser el más reciente
+        removed = store.evict()
+        stats = store.stats()
+        if stats['bytes'] > store.max_bytes or '00000000.mp3' in removed or '00000001.mp3' not in removed:
+            failures.append(f"cuota: quedaron {stats['bytes']} bytes, eliminados {sorted(removed)[:3]}...")
+
+        store.ttl = 0
+        time.sleep(0.01)
+        store.evict()
+        if store.stats()['entries'] or [name for name in os.listdir(directory) if not name.startswith('.')]:
+            failures.append('TTL: quedaron archivos vencidos')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def check_scope(failures):
+    """reconcile y evict solo tocan los MP3 del servidor, no los archivos del procesamiento por lotes."""
+    directory = tempfile.mkdtemp(prefix='bench_artifacts_scope_')
+    try:
+        legacy = '0b6f2c1e-3a4d-4e5f-8a9b-0c1d2e3f4a5b.mp3'
+        others = ['libro.txt', 'libro.mp3', 'libro.part.mp3', '.batch_state.json']
+        old = time.time() - 3600
+        for name in [legacy] + others:
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(b'\0' * 16)
+            os.utime(os.path.join(directory, name), (old, old))
+        store = ArtifactStore(directory, max_bytes=1, ttl=60)
+        store.reconcile()
+        store.evict()
+        remaining = set(os.listdir(directory))
+        if legacy in remaining:
+            failures.append('alcance: no se adoptó el MP3 uuid anterior al índice')
+        if not set(others) <= remaining:
+            failures.append(f"alcance: se eliminaron archivos ajenos al almacén: {sorted(set(others) - remaining)}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del almacén de artefactos')
+    parser.add_argument('--files', type=int, nargs='+', default=[1000, 10000, 50000], help='Archivos en output/')
+    parser.add_argument('--repeat', type=int, default=200, help='Peticiones simuladas por medición')
+    args = parser.parse_args()
+
+    rows = []
+    failures = []
+    for count in args.files:
+        directory = tempfile.mkdtemp(prefix='bench_artifacts_')
+        try:
+            fill(directory, count, 16)
+            store = ArtifactStore(directory, max_bytes=10 ** 12, ttl=12 * 60 * 60)
+            start = time.perf_counter()
+            store.reconcile()
+            reconcile = time.perf_counter() - start
+            # reconcile no adopta lo recién escrito: se registra como lo haría cada petición
+            for i in range(count):
+                store.register(f'{i:08d}.mp3')
+
+            scan = timed(lambda i: legacy_scan(directory, 12 * 60 * 60), max(1, args.repeat // 20))
+            indexed = timed(lambda i: (store.register(f'{i % count:08d}.mp3'), store.lookup(f'{(i * 7) % count:08d}.mp3')), args.repeat)
+            start = time.perf_counter()
+            store.evict()
+            evict = time.perf_counter() - start
+            rows.append((count, scan, indexed, reconcile, evict))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{'archivos':>9} {'recorrido (ms)':>15} {'índice (ms)':>12} {'reconciliar (s)':>16} {'evict (s)':>10}")
+    for count, scan, indexed, reconcile, evict in rows:
+        print(f"{count:>9} {scan * 1000:>15.2f} {indexed * 1000:>12.3f} {reconcile:>16.2f} {evict:>10.3f}")
+
+    if len(rows) > 1:
+        small, large = rows[0][2], rows[-1][2]
+        # El costo por petición no debe crecer con el directorio (margen para el ruido)
+        if large > max(5 * small, 0.002):
+            failures.append(f"el costo por petición creció de {small * 1000:.3f} ms a {large * 1000:.3f} ms")
+    check_eviction(failures)
+    check_scope(failures)
+
+    if failures:
+        print("\nFALLO:\n  " + "\n  ".join(failures))
+        raise SystemExit(1)
+    print("\nEl costo por petición no depende del tamaño del directorio; cuota, TTL y alcance: OK")
+
+if __name__ == '__main__':
+    main()
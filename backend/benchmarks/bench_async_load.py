@@ -0,0 +1,160 @@
+"""
+Carga concurrente sobre /api/text-to-audio: servidor async (async_app) contra hilos.
+
+Lanza N peticiones simultáneas de un texto corto (un solo fragmento, no requiere ffmpeg)
+contra async_app servido en este proceso, con Azure apuntando a benchmarks.stubs.StubTTSServer.
+Como referencia, sintetiza lo mismo con synthesize_text_to_file en un pool de N hilos (lo que
+hace app.py con un hilo por petición). Reporta el tiempo total, p50/p95 por petición y el
+pico de hilos del proceso (sin contar los del stub).
+
+Uso (desde backend):
+    python -m benchmarks.bench_async_load --requests 500 --latency 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import StubTTSServer
+
+VOICE = 'es-CL-CatalinaNeural'
+TEXT = 'Este es un texto corto para medir la concurrencia del servidor.'
+
+
+class ThreadSampler:
+    """Registra el máximo de hilos vivos del proceso, sin contar los que atienden el stub."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            count = sum(1 for t in threading.enumerate() if 'process_request_thread' not in t.name)
+            self.peak = max(self.peak, count)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run_async(requests):
+    import aiohttp
+    from aiohttp import web
+    from async_app import create_app
+
+    runner = web.AppRunner(create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    url = f"http://{host}:{port}/api/text-to-audio"
+    latencies = []
+    errors = []
+
+    async def one(session, idx):
+        start = time.perf_counter()
+        # Un texto distinto por petición: ninguna respuesta sale de la caché
+        async with session.post(url, json={'text': f'{TEXT} Número {idx}.', 'voice': VOICE}) as response:
+            body = await response.json()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(body.get('error'))
+        elif body.get('audio'):
+            os.remove(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'output', body['audio']))
+
+    try:
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            with ThreadSampler() as sampler:
+                start = time.perf_counter()
+                await asyncio.gather(*(one(session, idx) for idx in range(requests)))
+                total = time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+    return total, latencies, sampler.peak, errors
+
+def run_threads(requests):
+    from text_to_speech import synthesize_text_to_file
+
+    latencies = []
+    errors = []
+    directory = tempfile.mkdtemp(prefix='bench_async_load_')
+
+    def one(idx):
+        start = time.perf_counter()
+        output = os.path.join(directory, f'{idx}.mp3')
+        try:
+            synthesize_text_to_file(f'{TEXT} Hilo {idx}.', output, VOICE)
+            os.remove(output)
+        except Exception as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadSampler() as sampler, ThreadPoolExecutor(max_workers=requests) as pool:
+        start = time.perf_counter()
+        list(pool.map(one, range(requests)))
+        total = time.perf_counter() - start
+    os.rmdir(directory)
+    return total, latencies, sampler.peak, errors
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga del servidor async')
+    parser.add_argument('--requests', type=int, default=200, help='Peticiones simultáneas')
+    parser.add_argument('--latency', type=float, default=0.5, help='Latencia simulada por fragmento (s)')
+    args = parser.parse_args()
+
+    os.environ.update({
+        'AZURE_SPEECH_KEY': 'stub',
+        'AZURE_SPEECH_REGION': 'stub',
+        'AUDIO_CACHE_ENABLED': '0',
+        'EDGE_TTS_ENABLED': '0',
+        'ASYNC_MAX_JOBS': str(args.requests),
+    })
+    for name in ('GOOGLE_APPLICATION_CREDENTIALS', 'GOOGLE_CLOUD_TTS_CREDENTIALS_JSON'):
+        os.environ.pop(name, None)
+
+    with StubTTSServer(latency=args.latency) as stub:
+        os.environ['AZURE_SPEECH_ENDPOINT'] = stub.azure_url
+        rows = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows.append(('async (aiohttp)',) + asyncio.run(run_async(args.requests)))
+            rows.append(('hilos',) + run_threads(args.requests))
+
+    print(f"{args.requests} peticiones simultáneas, latencia del proveedor {args.latency}s")
+    print(f"{'servidor':<16} {'total (s)':>10} {'p50 (s)':>8} {'p95 (s)':>8} {'hilos':>6} {'errores':>8}")
+    for label, total, latencies, peak, errors in rows:
+        print(f"{label:<16} {total:>10.2f} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f} {peak:>6} {len(errors):>8}")
+
+    failures = []
+    label, total, _, peak, errors = rows[0]
+    if errors:
+        failures.append(f"{len(errors)} peticiones con error, p. ej.: {errors[0]}")
+    # Secuenciales tardarían requests * latency; con concurrencia real, unas pocas latencias
+    if total > max(5 * args.latency, args.requests * args.latency / 10):
+        failures.append(f"el servidor async no atendió en paralelo ({total:.2f} s)")
+    if peak >= rows[1][3]:
+        failures.append(f"el servidor async usó tantos hilos como el pool ({peak})")
+    if failures:
+        print("\nFALLO:\n  " + "\n  ".join(failures))
+        raise SystemExit(1)
+    print("\nEl servidor async atiende en paralelo sin un hilo por petición: OK")
+
+if __name__ == '__main__':
+    main()
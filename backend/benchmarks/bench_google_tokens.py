@@ -0,0 +1,106 @@
+"""
+Costo por petición de la autenticación de Google Cloud TTS contra un stub local.
+
+Compara, para N peticiones cortas (un fragmento cada una):
+- anterior: leer y parsear la cuenta de servicio y pedir un token nuevo en cada petición.
+- gestor: GoogleTokenManager (credenciales y token en caché, renovación anticipada).
+
+El token_uri de la cuenta de servicio falsa apunta a StubTTSServer (/token), con una
+latencia configurable para simular el viaje OAuth. Verifica además que con el gestor solo
+se pida un token para todas las peticiones y que un token de vida corta se renueve en
+segundo plano antes de vencer, sin que la petición siguiente espere.
+
+Uso (desde backend):
+    python -m benchmarks.bench_google_tokens --requests 50 --token-latency 0.15
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from benchmarks.stubs import StubTTSServer
+
+VOICE = 'es-CL-CatalinaNeural'
+
+def legacy_request(synthesize_fragment_with_token):
+    """Camino anterior: credenciales nuevas y refresh() por petición."""
+    from google.auth.transport.requests import Request
+    from tts_google import get_google_tts_credentials
+    credentials = get_google_tts_credentials()
+    credentials.refresh(Request())
+    return synthesize_fragment_with_token(credentials.token)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de tokens de Google Cloud TTS')
+    parser.add_argument('--requests', type=int, default=50, help='Peticiones cortas por variante')
+    parser.add_argument('--latency', type=float, default=0.02, help='Latencia simulada de la síntesis (s)')
+    parser.add_argument('--token-latency', type=float, default=0.15, help='Latencia simulada del token endpoint (s)')
+    args = parser.parse_args()
+
+    failures = []
+    with StubTTSServer(latency=args.latency, token_latency=args.token_latency) as stub:
+        os.environ.update({
+            'GOOGLE_CLOUD_TTS_CREDENTIALS_JSON': json.dumps(stub.google_service_account_info()),
+            'GOOGLE_TTS_ENDPOINT': stub.google_url,
+            'AUDIO_CACHE_ENABLED': '0',
+        })
+        os.environ.pop('GOOGLE_APPLICATION_CREDENTIALS', None)
+        import tts_google
+        from tts_http import get_http_session
+
+        def synthesize_with_token(token):
+            response = get_http_session().post(
+                stub.google_url, headers={'Authorization': f'Bearer {token}'},
+                json={'input': {'text': 'Hola.'}}, timeout=30,
+            )
+            response.raise_for_status()
+            return response.content
+
+        timings = {}
+        stub.token_requests = 0
+        samples = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            legacy_request(synthesize_with_token)
+            samples.append(time.perf_counter() - start)
+        timings['anterior'] = (samples, stub.token_requests)
+
+        stub.token_requests = 0
+        samples = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            plan = tts_google.prepare_google_cloud_synthesis(VOICE)
+            plan['synthesize_fragment'](0, 'Hola.')
+            samples.append(time.perf_counter() - start)
+        timings['gestor'] = (samples, stub.token_requests)
+        if stub.token_requests != 1:
+            failures.append(f'el gestor pidió {stub.token_requests} tokens (se esperaba 1)')
+
+        # Token de vida corta: se renueva antes de vencer sin que ninguna petición espere
+        stub.token_expires_in = 4
+        stub.token_requests = 0
+        manager = tts_google.GoogleTokenManager(margin=2)
+        first = manager.get_token()
+        time.sleep(2 + args.token_latency + 0.5)
+        start = time.perf_counter()
+        renewed = manager.get_token()
+        blocked = time.perf_counter() - start
+        if renewed == first or stub.token_requests != 2:
+            failures.append('el token no se renovó en segundo plano antes de vencer')
+        if blocked > args.token_latency / 2:
+            failures.append('la petición esperó la renovación del token')
+
+    print(f"{'variante':<10} {'mediana (ms)':>13} {'p95 (ms)':>10} {'tokens pedidos':>15}")
+    for name, (samples, tokens) in timings.items():
+        samples = sorted(samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(f"{name:<10} {statistics.median(samples) * 1000:>13.1f} {p95 * 1000:>10.1f} {tokens:>15}")
+
+    if failures:
+        print("\nFALLO:\n  " + "\n  ".join(failures))
+        raise SystemExit(1)
+    print("\nCaché y renovación anticipada del token: OK")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compara páginas por segundo entre el motor pytesseract (un proceso por página)
+y el motor persistente tesserocr (instancias de Tesseract que se mantienen cargadas).
+
+Uso (desde backend):
+    python -m benchmarks.bench_ocr_engines --pages 12
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import ocr_pdf_to_text
+from benchmarks.corpus import build_scanned_pdf
+
+def run_engine(engine, pdf_path, language):
+    """Ejecuta la extracción completa forzando un motor; devuelve (segundos, motor_usado)."""
+    os.environ['OCR_ENGINE'] = engine
+    ocr_pdf_to_text._ocr_engine = None
+    page_stats = []
+    start = time.perf_counter()
+    ocr_pdf_to_text.extract_text_from_pdf(pdf_path, language=language, workers=1, page_stats=page_stats)
+    seconds = time.perf_counter() - start
+    used = {stats.get('engine') for stats in page_stats if stats.get('engine')}
+    return seconds, ', '.join(sorted(used)) or '-'
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de motores de OCR')
+    parser.add_argument('--pages', type=int, default=8, help='Páginas del PDF sintético')
+    parser.add_argument('--lang', default='spa', help='Idioma para Tesseract')
+    args = parser.parse_args()
+
+    os.environ['PDF_CACHE_ENABLED'] = '0'
+    fd, pdf_path = tempfile.mkstemp(suffix='_bench_engines.pdf')
+    os.close(fd)
+    try:
+        build_scanned_pdf(pdf_path, args.pages)
+        results = [(engine, *run_engine(engine, pdf_path, args.lang)) for engine in ('pytesseract', 'tesserocr')]
+    finally:
+        os.remove(pdf_path)
+
+    print(f"\nPDF sintético: {args.pages} páginas escaneadas")
+    print(f"{'pedido':<12} {'usado':<12} {'segundos':>10} {'pág/s':>8}")
+    for engine, seconds, used in results:
+        print(f"{engine:<12} {used:<12} {seconds:>10.2f} {args.pages / seconds:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Mide la aceleración del OCR en paralelo según el número de procesos.
+
+Genera un PDF escaneado sintético (páginas que solo contienen una imagen) y ejecuta
+extract_text_from_pdf con distintos valores de workers.
+
+Uso (desde backend):
+    python -m benchmarks.bench_ocr_workers --pages 24 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.corpus import build_scanned_pdf
+from ocr_pdf_to_text import extract_text_from_pdf
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de OCR por número de procesos')
+    parser.add_argument('--pages', type=int, default=16, help='Páginas del PDF sintético')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Valores de workers a medir')
+    parser.add_argument('--lang', default='spa', help='Idioma para Tesseract')
+    args = parser.parse_args()
+
+    fd, pdf_path = tempfile.mkstemp(suffix='_bench_scanned.pdf')
+    os.close(fd)
+    try:
+        build_scanned_pdf(pdf_path, args.pages)
+        timings = {}
+        for workers in args.workers:
+            start = time.perf_counter()
+            extract_text_from_pdf(pdf_path, language=args.lang, workers=workers)
+            timings[workers] = time.perf_counter() - start
+
+        baseline = timings[args.workers[0]]
+        print(f"\nPDF sintético: {args.pages} páginas escaneadas")
+        print(f"{'workers':>8} {'segundos':>10} {'pág/s':>8} {'speedup':>8}")
+        for workers, seconds in timings.items():
+            print(f"{workers:>8} {seconds:>10.2f} {args.pages / seconds:>8.2f} {baseline / seconds:>7.2f}x")
+    finally:
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+"""
+Suite de benchmarks del pipeline PDF -> texto -> audio.
+
+Genera los corpus de forma sintética (PDF con capa de texto, PDF escaneado y textos largos),
+mide cada etapa por separado y de punta a punta, y guarda los resultados en JSON para
+compararlos entre commits con benchmarks.compare. Azure, Google y edge-tts se reemplazan
+por servidores locales (benchmarks.stubs); no se usa red ni credenciales reales.
+Las cachés de texto y audio se desactivan para medir el trabajo real.
+
+Uso (desde backend):
+    python -m benchmarks.bench_pipeline --output base.json
+    python -m benchmarks.bench_pipeline --only split merge --repeat 5 --output nuevo.json
+    python -m benchmarks.compare base.json nuevo.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import build_scanned_pdf, build_text_pdf, long_text
+from benchmarks.stubs import StubEdgeTTSServer, StubTTSServer, silent_mp3
+
+VOICE = 'es-CL-CatalinaNeural'
+GOOGLE_VOICE = 'es-CL-LorenzoNeural'
+
+def git_revision():
+    """Commit actual y si el árbol tiene cambios sin confirmar."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain'], capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def temp_path(suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+def remove(*paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+class Suite:
+    """Registra etapas y las ejecuta con repeticiones, guardando los tiempos en un dict."""
+
+    def __init__(self, repeat, only=None, verbose=False):
+        self.repeat = repeat
+        self.only = only
+        self.verbose = verbose
+        self.results = {}
+
+    def wanted(self, name):
+        return not self.only or any(name.startswith(prefix) for prefix in self.only)
+
+    def run(self, name, stage, setup=None, teardown=None):
+        """
+        stage(contexto) -> dict opcional con datos extra (bytes, fragmentos...).
+        setup() prepara el contexto fuera del tiempo medido; teardown(contexto) lo limpia.
+        """
+        if not self.wanted(name):
+            return
+        print(f"[bench] {name}...", file=sys.stderr)
+        context = None
+        seconds = []
+        extra = {}
+        try:
+            context = setup() if setup else None
+            for _ in range(self.repeat):
+                output = io.StringIO()
+                with contextlib.redirect_stdout(sys.stderr if self.verbose else output):
+                    start = time.perf_counter()
+                    extra = stage(context) or {}
+                    seconds.append(time.perf_counter() - start)
+        except Exception as e:
+            self.results[name] = {'error': f"{type(e).__name__}: {e}"}
+            print(f"[bench] {name} falló: {e}", file=sys.stderr)
+            return
+        finally:
+            if teardown and context is not None:
+                teardown(context)
+
+        self.results[name] = {
+            'runs': len(seconds),
+            'seconds': [round(value, 6) for value in seconds],
+            'min': round(min(seconds), 6),
+            'median': round(statistics.median(seconds), 6),
+            'mean': round(statistics.fmean(seconds), 6),
+            **extra,
+        }
+
+
+def bench_pdf_extraction(suite, text_pages, scanned_pages, workers):
+    from ocr_pdf_to_text import extract_text_from_pdf
+
+    def extract(pdf_path):
+        text = extract_text_from_pdf(pdf_path, workers=workers)
+        return {'chars': len(text)}
+
+    for pages in text_pages:
+        def setup(pages=pages):
+            path = temp_path('_bench_text.pdf')
+            build_text_pdf(path, pages)
+            return path
+        suite.run(f"pdf_text_layer[pages={pages}]", extract, setup, remove)
+
+    for pages in scanned_pages:
+        def setup(pages=pages):
+            path = temp_path('_bench_scanned.pdf')
+            build_scanned_pdf(path, pages)
+            return path
+        suite.run(f"pdf_scanned[pages={pages}]", extract, setup, remove)
+
+def bench_split(suite, sizes):
+    from text_to_speech import split_text_by_dot
+
+    for chars in sizes:
+        text = long_text(chars)
+        suite.run(
+            f"split_text_by_dot[chars={chars}]",
+            lambda _, text=text: {'fragments': len(split_text_by_dot(text, max_length=2500))},
+        )
+
+def bench_merge(suite, fragment_counts):
+    from text_to_speech import merge_mp3_files
+
+    audio = silent_mp3()
+
+    for count in fragment_counts:
+        def stage(_, count=count):
+            # merge_mp3_files mueve o consume los temporales: se recrean en cada repetición
+            fragments = []
+            output = temp_path('_bench_merged.mp3')
+            try:
+                for _ in range(count):
+                    path = temp_path('_bench_fragment.mp3')
+                    with open(path, 'wb') as f:
+                        f.write(audio)
+                    fragments.append(path)
+                merge_mp3_files(fragments, output)
+                return {'bytes': os.path.getsize(output)}
+            finally:
+                remove(output, *fragments)
+        suite.run(f"merge_mp3_files[fragments={count}]", stage)
+
+def bench_providers(suite, sizes, latency):
+    names = [f"{provider}[chars={chars}]" for chars in sizes for provider in ('azure', 'google')]
+    if not any(suite.wanted(name) for name in names):
+        return
+    import tts_azure
+    import tts_google
+
+    with StubTTSServer(latency=latency) as stub:
+        os.environ.update({
+            'AZURE_SPEECH_KEY': 'stub',
+            'AZURE_SPEECH_REGION': 'stub',
+            'AZURE_SPEECH_ENDPOINT': stub.azure_url,
+            'GOOGLE_TTS_ENDPOINT': stub.google_url,
+        })
+
+        for chars in sizes:
+            text = long_text(chars)
+
+            def azure(_, text=text):
+                output = temp_path('_bench_azure.mp3')
+                try:
+                    tts_azure.text_to_speech_azure(text, output, VOICE)
+                    return {'bytes': os.path.getsize(output)}
+                finally:
+                    remove(output)
+            suite.run(f"azure[chars={chars}]", azure)
+
+            def google_setup():
+                # Cuenta de servicio falsa: el token se pide al mismo stub
+                os.environ['GOOGLE_CLOUD_TTS_CREDENTIALS_JSON'] = json.dumps(stub.google_service_account_info())
+
+            def google(_, text=text):
+                output = temp_path('_bench_google.mp3')
+                try:
+                    tts_google.text_to_speech_google_cloud(text, output, GOOGLE_VOICE)
+                    return {'bytes': os.path.getsize(output)}
+                finally:
+                    remove(output)
+            suite.run(f"google[chars={chars}]", google, google_setup)
+
+def bench_edge_tts(suite, sizes, latency):
+    if not any(suite.wanted(f"edge_tts[chars={chars}]") for chars in sizes):
+        return
+    from text_to_speech import merge_mp3_files, split_text, synthesize_fragments
+    from tts_edge import prepare_edge_synthesis
+
+    with StubEdgeTTSServer(latency=latency) as stub:
+        stub.patch_edge_tts()
+        plan = prepare_edge_synthesis(VOICE)
+        for chars in sizes:
+            def stage(_, text=long_text(chars)):
+                temp_files = []
+                output = temp_path('_bench_edge_out.mp3')
+                try:
+                    synthesize_fragments(
+                        plan['cache_namespace'], plan['label'], split_text(text, plan['max_length']), VOICE, 1.0,
+                        plan['synthesize_fragment'], temp_files, max_in_flight=plan['max_in_flight'],
+                    )
+                    merge_mp3_files(temp_files, output)
+                    return {'fragments': len(temp_files), 'bytes': os.path.getsize(output)}
+                finally:
+                    remove(output, *temp_files)
+            suite.run(f"edge_tts[chars={chars}]", stage)
+
+def bench_end_to_end(suite, pages, latency, workers):
+    name = f"end_to_end_azure[pages={pages}]"
+    if not suite.wanted(name):
+        return
+    from ocr_pdf_to_text import extract_text_from_pdf
+    from tts_azure import text_to_speech_azure
+
+    def setup():
+        path = temp_path('_bench_e2e.pdf')
+        build_text_pdf(path, pages)
+        return path
+
+    with StubTTSServer(latency=latency) as stub:
+        os.environ.update({
+            'AZURE_SPEECH_KEY': 'stub',
+            'AZURE_SPEECH_REGION': 'stub',
+            'AZURE_SPEECH_ENDPOINT': stub.azure_url,
+        })
+
+        def stage(pdf_path):
+            output = temp_path('_bench_e2e.mp3')
+            try:
+                text = extract_text_from_pdf(pdf_path, workers=workers)
+                text_to_speech_azure(text, output, VOICE)
+                return {'chars': len(text), 'bytes': os.path.getsize(output)}
+            finally:
+                remove(output)
+        suite.run(name, stage, setup, remove)
+
+def bench_overlap(suite, pages, latency, workers):
+    """
+    PDF escaneado a MP3 con Azure (stub): secuencial (ocr_pdf_to_text, luego la síntesis del
+    .txt) contra pipeline.pdf_to_audio, que sintetiza mientras el OCR sigue avanzando.
+    """
+    names = (f"overlap_secuencial[scanned={pages}]", f"overlap_pipeline[scanned={pages}]")
+    if not any(suite.wanted(name) for name in names):
+        return
+    from ocr_pdf_to_text import ocr_pdf_to_text
+    from pipeline import pdf_to_audio
+    from text_to_speech import synthesize_text_to_file
+
+    def setup():
+        path = temp_path('_bench_overlap.pdf')
+        build_scanned_pdf(path, pages)
+        return path
+
+    with StubTTSServer(latency=latency) as stub:
+        os.environ.update({
+            'AZURE_SPEECH_KEY': 'stub',
+            'AZURE_SPEECH_REGION': 'stub',
+            'AZURE_SPEECH_ENDPOINT': stub.azure_url,
+            'EDGE_TTS_ENABLED': '0',
+        })
+
+        def sequential(pdf_path):
+            out_txt, output = temp_path('_bench_overlap.txt'), temp_path('_bench_overlap.mp3')
+            try:
+                ocr_pdf_to_text(pdf_path, out_txt, workers=workers)
+                with open(out_txt, 'r', encoding='utf-8') as f:
+                    synthesize_text_to_file(f.read(), output, VOICE)
+                return {'bytes': os.path.getsize(output)}
+            finally:
+                remove(out_txt, output)
+
+        def overlapped(pdf_path):
+            out_txt, output = temp_path('_bench_overlap.txt'), temp_path('_bench_overlap.mp3')
+            try:
+                pdf_to_audio(pdf_path, out_txt, output, voice=VOICE, workers=workers)
+                return {'bytes': os.path.getsize(output)}
+            finally:
+                remove(out_txt, output)
+
+        suite.run(names[0], sequential, setup, remove)
+        suite.run(names[1], overlapped, setup, remove)
+
+def print_summary(results):
+    print(f"\n{'etapa':<40} {'mediana (s)':>12} {'mín (s)':>10}", file=sys.stderr)
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:<40} {'error':>12}   {result['error']}", file=sys.stderr)
+        else:
+            print(f"{name:<40} {result['median']:>12.4f} {result['min']:>10.4f}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description='Suite de benchmarks del pipeline PDF a audio')
+    parser.add_argument('--output', help='Archivo JSON de resultados (por defecto se imprime en stdout)')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por etapa')
+    parser.add_argument('--only', nargs='+', help='Ejecutar solo las etapas cuyo nombre empiece así')
+    parser.add_argument('--text-pages', type=int, nargs='+', default=[10, 100], help='Páginas de los PDF con texto')
+    parser.add_argument('--scanned-pages', type=int, nargs='+', default=[2, 8], help='Páginas de los PDF escaneados')
+    parser.add_argument('--chars', type=int, nargs='+', default=[50_000, 500_000], help='Largos de texto para split')
+    parser.add_argument('--tts-chars', type=int, nargs='+', default=[20_000], help='Largos de texto para los proveedores')
+    parser.add_argument('--merge-fragments', type=int, nargs='+', default=[10, 100], help='MP3 a unir con merge_mp3_files')
+    parser.add_argument('--e2e-pages', type=int, default=10, help='Páginas del PDF de punta a punta')
+    parser.add_argument('--overlap-pages', type=int, default=8, help='Páginas del PDF escaneado para OCR y síntesis superpuestos')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latencia simulada de los stubs (s)')
+    parser.add_argument('--workers', type=int, default=1, help='Procesos de OCR')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar la salida de las funciones medidas')
+    args = parser.parse_args()
+
+    # Medir siempre el trabajo real, no la caché
+    os.environ['PDF_CACHE_ENABLED'] = '0'
+    os.environ['AUDIO_CACHE_ENABLED'] = '0'
+
+    suite = Suite(args.repeat, only=args.only, verbose=args.verbose)
+    bench_pdf_extraction(suite, args.text_pages, args.scanned_pages, args.workers)
+    bench_split(suite, args.chars)
+    bench_merge(suite, args.merge_fragments)
+    bench_providers(suite, args.tts_chars, args.latency)
+    bench_edge_tts(suite, args.tts_chars, args.latency)
+    bench_end_to_end(suite, args.e2e_pages, args.latency, args.workers)
+    bench_overlap(suite, args.overlap_pages, args.latency, args.workers)
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpuCount': os.cpu_count(),
+        'ffmpeg': shutil.which('ffmpeg'),
+        'params': vars(args),
+        'stages': suite.results,
+    }
+    print_summary(report['stages'])
+
+    data = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + "\n")
+        print(f"\nResultados guardados en {args.output}", file=sys.stderr)
+    else:
+        print(data)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Compara el motor Piper en proceso contra el camino de un subproceso piper por fragmento,
+y mide text_to_speech_piper completo (PCM de todos los fragmentos a un único codificador MP3).
+
+Descarga la voz en backend/models si no existe. Requiere piper-tts >= 1.3 y ffmpeg.
+
+Uso (desde backend):
+    python -m benchmarks.bench_piper_engine --voice piper:es_MX-claude-high --fragments 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from piper_engine import PiperEngine
+from tts_piper import (
+    ensure_piper_voice,
+    map_voice_to_piper,
+    synthesize_piper_subprocess,
+    text_to_speech_piper,
+)
+
+FRAGMENT = (
+    "La síntesis offline permite escuchar documentos sin conexión. "
+    "Cada fragmento corto paga el costo de cargar el modelo si se lanza un proceso nuevo. "
+)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del motor Piper en proceso vs subproceso')
+    parser.add_argument('--voice', default='piper:es_MX-claude-high', help='Voz de map_voice_to_piper')
+    parser.add_argument('--fragments', type=int, default=8, help='Cantidad de fragmentos a sintetizar')
+    parser.add_argument('--repeat', type=int, default=2, help='Repeticiones del texto base por fragmento')
+    args = parser.parse_args()
+
+    piper_voice = map_voice_to_piper(args.voice)
+    if piper_voice is None:
+        raise SystemExit(f"Voz Piper desconocida: {args.voice}")
+    model_path, config_path = ensure_piper_voice(piper_voice['voice_code'])
+    speaker = piper_voice['speaker']
+    length_scale = piper_voice['length_scale']
+    fragments = [f"Fragmento {i + 1}. " + FRAGMENT * args.repeat for i in range(args.fragments)]
+
+    start = time.perf_counter()
+    for fragment in fragments:
+        synthesize_piper_subprocess(model_path, fragment, speaker, length_scale)
+    subprocess_seconds = time.perf_counter() - start
+
+    engine = PiperEngine(max_voices=1)
+    start = time.perf_counter()
+    engine.get_voice(model_path, config_path)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for fragment in fragments:
+        engine.synthesize_pcm(model_path, fragment, speaker, length_scale, config_path)
+    engine_seconds = time.perf_counter() - start
+
+    os.environ['AUDIO_CACHE_ENABLED'] = '0'
+    fd, output = tempfile.mkstemp(suffix='_bench_piper.mp3')
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        text_to_speech_piper(" ".join(fragments), output, args.voice)
+        full_seconds = time.perf_counter() - start
+        mp3_bytes = os.path.getsize(output)
+    finally:
+        os.remove(output)
+
+    n = len(fragments)
+    print(f"\nVoz {piper_voice['voice_code']}, {n} fragmentos de ~{len(fragments[0])} caracteres")
+    print(f"{'camino':<34} {'total (s)':>10} {'por fragmento (s)':>18}")
+    print(f"{'subproceso piper (PCM)':<34} {subprocess_seconds:>10.2f} {subprocess_seconds / n:>18.3f}")
+    print(f"{'motor en proceso (PCM)':<34} {engine_seconds:>10.2f} {engine_seconds / n:>18.3f}")
+    print(f"{'text_to_speech_piper (1 encoder)':<34} {full_seconds:>10.2f} {full_seconds / n:>18.3f}")
+    print(f"Carga única del modelo: {load_seconds:.2f}s; aceleración PCM: {subprocess_seconds / engine_seconds:.2f}x")
+    print(f"MP3 final: {mp3_bytes} bytes, sin archivos temporales por fragmento")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Tiempo de arranque en frío de la app Flask y de la CLI (main.py).
+
+Cada medición lanza un intérprete nuevo que solo importa el módulo (sin atender peticiones
+ni procesar PDFs), con -X importtime para ver qué importaciones pesan más. Además verifica
+que al arrancar no se carguen las librerías de proveedores (fitz, PIL, pytesseract,
+edge_tts, requests, google-auth, piper): se importan en el primer uso (ver tts_providers).
+
+Con --compare-ref se mide también una versión anterior del repositorio (git worktree
+temporal), para comparar contra el arranque previo a un cambio.
+
+Uso (desde backend):
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --compare-ref HEAD~1
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = ('app', 'main')
+HEAVY_MODULES = ('fitz', 'PIL', 'pytesseract', 'tesserocr', 'edge_tts', 'requests', 'google.auth', 'google.oauth2', 'piper')
+PROVIDERS = ('azure', 'google', 'edge', 'piper')
+
+def _env():
+    env = dict(os.environ)
+    # Sin hilo de refresco del catálogo (consultaría edge-tts durante la medición)
+    env['VOICES_BACKGROUND_REFRESH'] = '0'
+    env['STARTUP_LOG'] = '1'
+    return env
+
+def parse_importtime(stderr, top=5):
+    """Importaciones de primer nivel con más tiempo acumulado: [(módulo, ms), ...]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name[1:]
+        if name.startswith(' '):
+            continue  # importación anidada: ya cuenta en el acumulado de su padre
+        rows.append((name.strip(), int(cumulative) / 1000))
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+
+def measure_import(target, cwd, repeat):
+    """Importa target en intérpretes nuevos: (mediana de pared en ms, arranque interno en ms, top de importaciones)."""
+    walls = []
+    internal = None
+    top = []
+    code = f"import {target}, metrics; print(json.dumps(getattr(metrics, 'get_startup_seconds', dict)()))"
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import json; ' + code],
+            cwd=cwd, env=_env(), capture_output=True, text=True,
+        )
+        walls.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"No se pudo importar {target} en {cwd}:\n{result.stderr[-2000:]}")
+        lines = result.stdout.strip().splitlines()
+        phases = json.loads(lines[-1]) if lines else {}
+        if target in phases:
+            internal = phases[target] * 1000
+        top = parse_importtime(result.stderr)
+    return statistics.median(walls), internal, top
+
+def check_lazy_imports(target, cwd):
+    """Devuelve las librerías pesadas que quedaron cargadas tras importar target (debe ser vacío)."""
+    code = (
+        f"import json, sys, {target}; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=_env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure_provider_load(name):
+    """Tiempo de la primera carga de un proveedor (None si sus dependencias no están instaladas)."""
+    code = (
+        "import json, text_to_speech, tts_providers, metrics; "
+        f"tts_providers.get_provider({name!r}).load(); "
+        "print(json.dumps(metrics.get_startup_seconds()))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    return phases.get(f'provider_{name}', 0) * 1000
+
+def checkout_ref(ref):
+    """Worktree temporal con la versión ref del repositorio; devuelve (ruta, ruta del backend)."""
+    path = tempfile.mkdtemp(prefix='bench_startup_')
+    subprocess.run(['git', 'worktree', 'add', '--detach', path, ref], cwd=BACKEND_DIR, check=True, capture_output=True)
+    toplevel = subprocess.run(['git', 'rev-parse', '--show-toplevel'], cwd=BACKEND_DIR, check=True, capture_output=True, text=True)
+    relative = os.path.relpath(BACKEND_DIR, toplevel.stdout.strip())
+    return path, os.path.join(path, relative)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del arranque en frío del backend')
+    parser.add_argument('--repeat', type=int, default=5, help='Intérpretes nuevos por objetivo')
+    parser.add_argument('--compare-ref', default=None, help='Versión git contra la que comparar (p. ej. HEAD~1)')
+    args = parser.parse_args()
+
+    failures = []
+    for target in TARGETS:
+        loaded = check_lazy_imports(target, BACKEND_DIR)
+        if loaded:
+            failures.append(f"{target} carga al arrancar: {', '.join(loaded)}")
+
+    baseline = {}
+    if args.compare_ref:
+        worktree, backend = checkout_ref(args.compare_ref)
+        try:
+            for target in TARGETS:
+                baseline[target] = measure_import(target, backend, args.repeat)[0]
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=BACKEND_DIR, capture_output=True)
+
+    print(f"{'objetivo':<8} {'pared (ms)':>11} {'interno (ms)':>13} {'ref (ms)':>10} {'speedup':>8}")
+    tops = {}
+    for target in TARGETS:
+        wall, internal, top = measure_import(target, BACKEND_DIR, args.repeat)
+        tops[target] = top
+        internal = f"{internal:.1f}" if internal is not None else '-'
+        ref = f"{baseline[target]:.1f}" if target in baseline else '-'
+        speedup = f"{baseline[target] / wall:.2f}x" if target in baseline else '-'
+        print(f"{target:<8} {wall:>11.1f} {internal:>13} {ref:>10} {speedup:>8}")
+
+    for target, top in tops.items():
+        print(f"\nImportaciones más costosas de {target}:")
+        for name, ms in top:
+            print(f"  {name:<30} {ms:>8.1f} ms")
+
+    print("\nPrimera carga de cada proveedor:")
+    for name in PROVIDERS:
+        ms = measure_provider_load(name)
+        print(f"  {name:<8} {'sin dependencias' if ms is None else f'{ms:.1f} ms'}")
+
+    if failures:
+        print("\nFALLO:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nNinguna librería de proveedor se carga al arrancar: OK")
+
+if __name__ == '__main__':
+    main()
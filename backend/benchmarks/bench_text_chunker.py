@@ -0,0 +1,152 @@
+"""
+Throughput del fragmentador de texto (text_chunker) frente al split_text_by_dot original,
+más verificaciones de propiedades sobre textos aleatorios. Mide split_text sobre el texto
+completo e iter_stream_chunks recibiendo el mismo texto oración por oración (como llega del
+OCR); falla si alguno es más lento que la implementación anterior.
+
+Propiedades verificadas (para cada largo de fragmento de los proveedores):
+- Ningún fragmento supera max_length.
+- No se pierde ni se agrega texto: sin espacios, la concatenación es igual al original.
+- No se corta una palabra si la ventana tenía algún espacio.
+- Cada corte (salvo el último) avanza al menos max_length // 2 caracteres del original.
+- Si la ventana tenía un fin de oración en su segunda mitad, el fragmento termina en uno.
+- iter_text_chunks es perezoso: entrega el primer fragmento sin recorrer todo el texto.
+
+Uso (desde backend):
+    python -m benchmarks.bench_text_chunker --mb 1 4 --cases 2000
+"""
+import argparse
+import random
+import re
+import time
+
+from benchmarks.corpus import long_text
+from text_chunker import PROVIDER_MAX_LENGTH, _SENTENCE_END_RE, iter_stream_chunks, iter_text_chunks, split_text
+
+def legacy_split_text_by_dot(text, max_length=3000):
+    """Implementación anterior (O(n²): copia el resto del texto en cada corte)."""
+    fragments = []
+    while len(text) > max_length:
+        split_pos = text.rfind('.', 0, max_length)
+        if split_pos == -1:
+            split_pos = max_length
+        else:
+            split_pos += 1
+        fragments.append(text[:split_pos].strip())
+        text = text[split_pos:].lstrip()
+    if text:
+        fragments.append(text.strip())
+    return fragments
+
+def random_text(rng):
+    """Textos con puntuación variada, palabras muy largas, saltos de línea o sin puntuación."""
+    pieces = []
+    for _ in range(rng.randint(0, 200)):
+        kind = rng.random()
+        if kind < 0.6:
+            pieces.append(rng.choice(['hola', 'mundo', 'texto', '¿qué', 'tal?', 'sí', 'árbol', 'niño']))
+        elif kind < 0.8:
+            pieces.append(rng.choice(['.', '!', '?', ';', ':', ',', '…', '."', '?»', ')', '—']))
+        elif kind < 0.9:
+            pieces.append('x' * rng.randint(1, 60))
+        else:
+            pieces.append(rng.choice(['\n', '\n\n', '\t', '   ']))
+    return ''.join(piece + (' ' if rng.random() < 0.8 else '') for piece in pieces)
+
+def find_fragment_offsets(text, fragments):
+    """Ubica cada fragmento en el texto original (los fragmentos son subcadenas en orden)."""
+    offsets = []
+    pos = 0
+    for fragment in fragments:
+        start = text.index(fragment, pos)
+        offsets.append((start, start + len(fragment)))
+        pos = start + len(fragment)
+    return offsets
+
+def check_properties(text, max_length):
+    fragments = split_text(text, max_length)
+    assert all(0 < len(f) <= max_length for f in fragments), 'fragmento fuera de rango'
+    assert re.sub(r'\s', '', ''.join(fragments)) == re.sub(r'\s', '', text), 'se perdió o agregó texto'
+
+    min_length = max(1, max_length // 2)
+    offsets = find_fragment_offsets(text, fragments)
+    for i, (start, end) in enumerate(offsets[:-1]):
+        assert offsets[i + 1][0] - start >= min_length, 'corte intermedio demasiado corto'
+        window = text[start:start + max_length]
+        cut_inside_word = end < len(text) and not text[end].isspace() and not text[end - 1].isspace()
+        if cut_inside_word:
+            assert not re.search(r'\s', window[min_length:]), 'se cortó una palabra habiendo espacios'
+        sentence_ends = [m.end() for m in _SENTENCE_END_RE.finditer(text, start, min(start + max_length + 1, len(text)))
+                         if min_length <= m.end() - start <= max_length]
+        if sentence_ends:
+            assert end == sentence_ends[-1], 'había un fin de oración disponible y no se usó'
+    return len(fragments)
+
+def check_lazy():
+    text = "Primera oración. " * 200_000
+    generator = iter_text_chunks(text, 100)
+    start = time.perf_counter()
+    first = next(generator)
+    elapsed = time.perf_counter() - start
+    assert first.startswith('Primera') and elapsed < 0.01, 'el primer fragmento no fue inmediato'
+
+def run_property_checks(cases, seed):
+    rng = random.Random(seed)
+    lengths = sorted(set(PROVIDER_MAX_LENGTH.values())) + [1, 5, 40, 200]
+    checked = 0
+    for _ in range(cases):
+        text = random_text(rng)
+        for max_length in lengths:
+            check_properties(text, max_length)
+            checked += 1
+    for max_length in PROVIDER_MAX_LENGTH.values():
+        check_properties(long_text(200_000, seed=seed), max_length)
+    check_lazy()
+    return checked
+
+def timed(function, repeat=3):
+    """Mejor tiempo de varias ejecuciones (los textos chicos se miden en milisegundos)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark y propiedades del fragmentador de texto')
+    parser.add_argument('--mb', type=float, nargs='+', default=[1, 4], help='Tamaños de texto (millones de caracteres)')
+    parser.add_argument('--cases', type=int, default=1000, help='Textos aleatorios para las propiedades')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-legacy', action='store_true', help='No medir la implementación anterior (lenta)')
+    args = parser.parse_args()
+
+    checked = run_property_checks(args.cases, args.seed)
+    print(f"Propiedades verificadas en {checked} combinaciones texto/largo: OK")
+
+    print(f"\n{'MB':>6} {'largo':>6} {'nuevo (s)':>10} {'MB/s':>8} {'stream (s)':>11} {'anterior (s)':>13} {'speedup':>8}")
+    failures = []
+    for mb in args.mb:
+        text = long_text(int(mb * 1_000_000), seed=args.seed)
+        sentences = re.split(r'(?<=[.!?])\s+', text)
+        for max_length in sorted(set(PROVIDER_MAX_LENGTH.values())):
+            new_seconds = timed(lambda: split_text(text, max_length))
+            stream_seconds = timed(lambda: list(iter_stream_chunks(sentences, max_length)))
+            if args.skip_legacy:
+                legacy = '-'
+                speedup = '-'
+            else:
+                legacy_seconds = timed(lambda: legacy_split_text_by_dot(text, max_length))
+                legacy = f"{legacy_seconds:.3f}"
+                speedup = f"{legacy_seconds / new_seconds:.1f}x"
+                if max(new_seconds, stream_seconds) > legacy_seconds:
+                    failures.append(f"{mb} MB, largo {max_length}: más lento que la implementación anterior")
+            print(f"{mb:>6} {max_length:>6} {new_seconds:>10.3f} {mb / new_seconds:>8.1f} {stream_seconds:>11.3f} {legacy:>13} {speedup:>8}")
+
+    if failures:
+        print("\nFALLO:\n  " + "\n  ".join(failures))
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Peticiones idénticas simultáneas a /api/text-to-audio (tts_coalesce) contra un stub de Azure.
+
+Simula un documento compartido con un curso: N peticiones con el mismo texto y la misma
+voz llegan a la vez, primero al servidor async (async_app, en este proceso) y después al
+camino con hilos de app.py (SynthesisCoalescer.run desde un pool de N hilos). Mide el
+tiempo, cuántas síntesis llegaron al proveedor y cuántos MP3 distintos se escribieron, y
+luego repite la petición para comprobar que se reutiliza el resultado reciente.
+
+Uso (desde backend):
+    python -m benchmarks.bench_tts_coalesce --requests 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.corpus import long_text
+from benchmarks.stubs import StubTTSServer
+
+VOICE = 'es-CL-CatalinaNeural'
+
+
+async def run_async(text, requests):
+    import aiohttp
+    from aiohttp import web
+    import async_app
+
+    runner = web.AppRunner(async_app.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    url = f"http://{host}:{port}/api/text-to-audio"
+
+    async def one(session):
+        async with session.post(url, json={'text': text, 'voice': VOICE}) as response:
+            return await response.json()
+
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            start = time.perf_counter()
+            bodies = await asyncio.gather(*(one(session) for _ in range(requests)))
+            seconds = time.perf_counter() - start
+            repeat = await one(session)
+    finally:
+        await runner.cleanup()
+    for name in {body.get('audio') for body in bodies + [repeat] if body.get('audio')}:
+        os.remove(os.path.join(async_app.OUTPUT_DIR, name))
+    return seconds, bodies, repeat
+
+def run_threads(text, requests):
+    from text_to_speech import synthesize_text_to_file
+    from tts_coalesce import SynthesisCoalescer, synthesis_key
+
+    coalescer = SynthesisCoalescer(ttl=600)
+    directory = tempfile.mkdtemp(prefix='bench_coalesce_')
+    key = synthesis_key(text, VOICE, 1.0)
+
+    def produce():
+        name = str(uuid.uuid4()) + '.mp3'
+        synthesize_text_to_file(text, os.path.join(directory, name), VOICE)
+        return {'audio': name}
+
+    def one(_):
+        result, outcome = coalescer.run(key, produce)
+        return dict(result, coalesced=outcome)
+
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        start = time.perf_counter()
+        bodies = list(pool.map(one, range(requests)))
+        seconds = time.perf_counter() - start
+    repeat = one(None)
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+    return seconds, bodies, repeat
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de deduplicación de síntesis idénticas')
+    parser.add_argument('--requests', type=int, default=50, help='Peticiones idénticas simultáneas')
+    parser.add_argument('--chars', type=int, default=1500, help='Largo del texto (más de un fragmento requiere ffmpeg)')
+    parser.add_argument('--latency', type=float, default=0.5, help='Latencia simulada por fragmento (s)')
+    args = parser.parse_args()
+
+    os.environ.update({
+        'AZURE_SPEECH_KEY': 'stub',
+        'AZURE_SPEECH_REGION': 'stub',
+        'AUDIO_CACHE_ENABLED': '0',
+        'EDGE_TTS_ENABLED': '0',
+        'TTS_COALESCE_TTL': '600',
+    })
+    for name in ('GOOGLE_APPLICATION_CREDENTIALS', 'GOOGLE_CLOUD_TTS_CREDENTIALS_JSON'):
+        os.environ.pop(name, None)
+    text = long_text(args.chars)
+    failures = []
+    rows = []
+
+    with StubTTSServer(latency=args.latency) as stub:
+        os.environ['AZURE_SPEECH_ENDPOINT'] = stub.azure_url
+        for label, run in (('async (aiohttp)', lambda: asyncio.run(run_async(text, args.requests))),
+                           ('hilos', lambda: run_threads(text, args.requests))):
+            stub.requests = 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                seconds, bodies, repeat = run()
+            errors = [body['error'] for body in bodies if 'error' in body]
+            files = {body.get('audio') for body in bodies}
+            rows.append((label, seconds, stub.requests, len(files), repeat.get('coalesced')))
+            if errors:
+                failures.append(f"{label}: {len(errors)} peticiones con error, p. ej.: {errors[0]}")
+            if len(files) != 1:
+                failures.append(f"{label}: se escribieron {len(files)} MP3 para el mismo texto")
+            if repeat.get('coalesced') != 'recent' or repeat.get('audio') not in files:
+                failures.append(f"{label}: la petición repetida no reutilizó el resultado ({repeat.get('coalesced')})")
+
+    print(f"{args.requests} peticiones idénticas, {args.chars} caracteres, latencia {args.latency}s")
+    print(f"{'servidor':<16} {'total (s)':>10} {'peticiones TTS':>15} {'MP3':>5} {'repetida':>9}")
+    for label, seconds, requests, files, repeat in rows:
+        print(f"{label:<16} {seconds:>10.2f} {requests:>15} {files:>5} {repeat or '-':>9}")
+
+    if failures:
+        print("\nFALLO:\n  " + "\n  ".join(failures))
+        raise SystemExit(1)
+    print("\nLas peticiones idénticas comparten una sola síntesis: OK")
+
+if __name__ == '__main__':
+    main()
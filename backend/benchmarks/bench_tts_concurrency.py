@@ -0,0 +1,58 @@
+"""
+Compara la síntesis secuencial y concurrente de fragmentos contra un servidor Azure local.
+
+No usa red ni credenciales reales: AZURE_SPEECH_ENDPOINT apunta a benchmarks.stubs.StubTTSServer.
+Requiere ffmpeg para unir los fragmentos, igual que en producción.
+
+Uso (desde backend):
+    python -m benchmarks.bench_tts_concurrency --chars 200000 --latency 0.3 --in-flight 1 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.stubs import StubTTSServer
+
+SENTENCE = "Este es un texto de prueba para medir la síntesis por fragmentos. "
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de síntesis concurrente con un stub HTTP local')
+    parser.add_argument('--chars', type=int, default=100_000, help='Largo del texto sintético')
+    parser.add_argument('--latency', type=float, default=0.3, help='Latencia simulada por petición (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Proporción de respuestas 429')
+    parser.add_argument('--in-flight', type=int, nargs='+', default=[1, 4, 8], help='Valores de TTS_MAX_IN_FLIGHT')
+    args = parser.parse_args()
+
+    text = (SENTENCE * (args.chars // len(SENTENCE) + 1))[:args.chars]
+
+    with StubTTSServer(latency=args.latency, error_rate=args.error_rate) as stub:
+        os.environ.update({
+            'AZURE_SPEECH_KEY': 'stub',
+            'AZURE_SPEECH_REGION': 'stub',
+            'AZURE_SPEECH_ENDPOINT': stub.azure_url,
+            'AUDIO_CACHE_ENABLED': '0',
+        })
+        from tts_azure import text_to_speech_azure
+
+        timings = {}
+        for in_flight in args.in_flight:
+            os.environ['TTS_MAX_IN_FLIGHT'] = str(in_flight)
+            fd, output = tempfile.mkstemp(suffix='_bench.mp3')
+            os.close(fd)
+            stub.max_concurrent = 0
+            try:
+                start = time.perf_counter()
+                text_to_speech_azure(text, output, 'es-CL-CatalinaNeural')
+                timings[in_flight] = (time.perf_counter() - start, stub.max_concurrent)
+            finally:
+                os.remove(output)
+
+        baseline = timings[args.in_flight[0]][0]
+        print(f"\nTexto: {args.chars} caracteres, latencia {args.latency}s, peticiones totales {stub.requests} (429: {stub.errors})")
+        print(f"{'in-flight':>9} {'segundos':>10} {'pico':>6} {'speedup':>8}")
+        for in_flight, (seconds, peak) in timings.items():
+            print(f"{in_flight:>9} {seconds:>10.2f} {peak:>6} {baseline / seconds:>7.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Failover por fragmento y circuit breakers entre proveedores TTS, con servidores locales.
+
+Azure apunta a un StubTTSServer (que puede fallar o responder lento) y edge-tts a un
+StubEdgeTTSServer, así que no usa red ni credenciales. Escenarios verificados:
+- azure_ok: Azure sano, todos los fragmentos salen de Azure.
+- azure_down: Azure responde siempre 429; el documento se completa con edge-tts y el
+  circuito de Azure se abre tras TTS_BREAKER_FAILURES fallos (los siguientes fragmentos
+  ya no lo esperan). Se compara contra el mismo caso sin circuit breaker.
+- azure_flaky: Azure falla en una parte de los fragmentos; el documento se completa igual.
+- azure_slow: Azure mucho más lento que edge-tts; tras el primer documento la elección
+  pasa a edge-tts por la latencia observada.
+
+Uso (desde backend):
+    python -m benchmarks.bench_tts_failover --chars 30000 --latency 0.2
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.corpus import long_text
+from benchmarks.stubs import StubEdgeTTSServer, StubTTSServer
+
+VOICE = 'es-CL-CatalinaNeural'
+
+def synthesize(text):
+    from text_to_speech import synthesize_text_to_file
+    fd, output = tempfile.mkstemp(suffix='_bench_failover.mp3')
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        result = synthesize_text_to_file(text, output, VOICE)
+        return result, time.perf_counter() - start
+    finally:
+        os.remove(output)
+
+def reset_health():
+    from tts_providers import iter_providers
+    for spec in iter_providers():
+        spec.reset_health()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de failover entre proveedores TTS')
+    parser.add_argument('--chars', type=int, default=30_000, help='Largo del texto sintético')
+    parser.add_argument('--latency', type=float, default=0.2, help='Latencia simulada de Azure sano (s)')
+    parser.add_argument('--edge-latency', type=float, default=0.05, help='Latencia simulada de edge-tts (s)')
+    args = parser.parse_args()
+
+    os.environ.update({
+        'AZURE_SPEECH_KEY': 'stub',
+        'AZURE_SPEECH_REGION': 'stub',
+        'AUDIO_CACHE_ENABLED': '0',
+        'EDGE_TTS_ENABLED': '1',
+        'TTS_HTTP_RETRIES': '0',
+        'TTS_MAX_IN_FLIGHT': '1',
+    })
+    for name in ('GOOGLE_APPLICATION_CREDENTIALS', 'GOOGLE_CLOUD_TTS_CREDENTIALS_JSON'):
+        os.environ.pop(name, None)
+    text = long_text(args.chars)
+    failures = []
+    rows = []
+
+    with StubTTSServer(latency=args.latency) as azure, StubEdgeTTSServer(latency=args.edge_latency) as edge:
+        os.environ['AZURE_SPEECH_ENDPOINT'] = azure.azure_url
+        edge.patch_edge_tts()
+        from tts_providers import get_provider
+
+        reset_health()
+        result, seconds = synthesize(text)
+        rows.append(('azure_ok', result, seconds))
+        if result['provider'] != 'azure-speech' or result['failover']:
+            failures.append('azure_ok: se esperaba solo Azure')
+
+        for label, threshold in (('azure_down_sin_breaker', '1000000'), ('azure_down', '3')):
+            os.environ['TTS_BREAKER_FAILURES'] = threshold
+            reset_health()
+            azure.error_rate = 1.0
+            azure.requests = 0
+            result, seconds = synthesize(text)
+            rows.append((label, result, seconds))
+            if result['failover'].get('edge', 0) == 0:
+                failures.append(f'{label}: ningún fragmento pasó a edge-tts')
+            if label == 'azure_down':
+                if get_provider('azure').health.state != 'open':
+                    failures.append('azure_down: el circuito de Azure no se abrió')
+                if azure.requests > int(threshold):
+                    failures.append(f'azure_down: Azure recibió {azure.requests} peticiones con el circuito abierto')
+        os.environ.pop('TTS_BREAKER_FAILURES')
+
+        reset_health()
+        azure.error_rate = 0.3
+        result, seconds = synthesize(text)
+        rows.append(('azure_flaky', result, seconds))
+
+        reset_health()
+        azure.error_rate = 0.0
+        azure.latency = 5.0
+        short_text = long_text(7_500)  # unos pocos fragmentos bastan para medir la latencia
+        synthesize(short_text)
+        result, seconds = synthesize(short_text)
+        rows.append(('azure_slow (2.º doc)', result, seconds))
+        if result['provider'] != 'edge-tts':
+            failures.append('azure_slow: la elección no pasó al proveedor más rápido')
+
+    print(f"{'escenario':<24} {'proveedor':<14} {'respaldo':<16} {'segundos':>9}")
+    for label, result, seconds in rows:
+        fallback = ', '.join(f"{name}={count}" for name, count in result['failover'].items()) or '-'
+        print(f"{label:<24} {result['provider']:<14} {fallback:<16} {seconds:>9.2f}")
+
+    if failures:
+        print("\nFALLO:\n  " + "\n  ".join(failures))
+        raise SystemExit(1)
+    print("\nFailover y circuit breakers: OK")
+
+if __name__ == '__main__':
+    main()
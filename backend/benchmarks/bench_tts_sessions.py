@@ -0,0 +1,94 @@
+"""
+Re-síntesis incremental de un texto editado (tts_sessions) contra un stub de Azure.
+
+Sintetiza un documento largo dentro de una sesión y después varias versiones editadas
+(una oración insertada, una palabra cambiada, un párrafo eliminado). Compara el tiempo y
+los fragmentos enviados al proveedor contra sintetizar cada versión completa desde cero.
+La caché de audio compartida se desactiva para que solo cuente la reutilización de la sesión.
+
+Uso (desde backend):
+    python -m benchmarks.bench_tts_sessions --chars 200000 --latency 0.1
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.corpus import long_text
+from benchmarks.stubs import StubTTSServer
+
+VOICE = 'es-CL-CatalinaNeural'
+
+def edits(text):
+    middle = len(text) // 2
+    cut = text.index('. ', middle) + 2
+    word = text.index(' ', len(text) // 3) + 1
+    end_word = text.index(' ', word)
+    paragraph = text.index('. ', 2 * len(text) // 3) + 2
+    return [
+        ('oración insertada', text[:cut] + 'Esta oración es nueva en el documento. ' + text[cut:]),
+        ('palabra cambiada', text[:word] + 'cambiada' + text[end_word:]),
+        ('párrafo eliminado', text[:paragraph] + text[paragraph + 400:]),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de sesiones de re-síntesis incremental')
+    parser.add_argument('--chars', type=int, default=200_000, help='Largo del documento')
+    parser.add_argument('--latency', type=float, default=0.1, help='Latencia simulada por fragmento (s)')
+    args = parser.parse_args()
+
+    os.environ.update({
+        'AZURE_SPEECH_KEY': 'stub',
+        'AZURE_SPEECH_REGION': 'stub',
+        'AUDIO_CACHE_ENABLED': '0',
+        'EDGE_TTS_ENABLED': '0',
+        'TTS_SESSION_DIR': tempfile.mkdtemp(prefix='bench_sessions_'),
+    })
+    for name in ('GOOGLE_APPLICATION_CREDENTIALS', 'GOOGLE_CLOUD_TTS_CREDENTIALS_JSON'):
+        os.environ.pop(name, None)
+    text = long_text(args.chars)
+    failures = []
+    rows = []
+
+    with StubTTSServer(latency=args.latency) as stub:
+        os.environ['AZURE_SPEECH_ENDPOINT'] = stub.azure_url
+        from text_to_speech import synthesize_text_to_file
+        from tts_sessions import synthesize_session_to_file
+
+        fd, output = tempfile.mkstemp(suffix='_bench_session.mp3')
+        os.close(fd)
+        try:
+            def timed(function, *call_args):
+                stub.requests = 0
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = function(*call_args)
+                return result, time.perf_counter() - start, stub.requests
+
+            result, seconds, requests = timed(synthesize_session_to_file, None, text, output, VOICE)
+            session = result['session']
+            rows.append(('documento inicial', seconds, requests, None, None))
+            for label, edited in edits(text):
+                result, seconds, requests = timed(synthesize_session_to_file, session, edited, output, VOICE)
+                _, full_seconds, full_requests = timed(synthesize_text_to_file, edited, output, VOICE)
+                rows.append((label, seconds, requests, full_seconds, full_requests))
+                if result['synthesized'] > 2:
+                    failures.append(f"{label}: se sintetizaron {result['synthesized']} fragmentos")
+                text = edited
+        finally:
+            os.remove(output)
+
+    print(f"{'versión':<20} {'sesión (s)':>11} {'peticiones':>11} {'completo (s)':>13} {'peticiones':>11}")
+    for label, seconds, requests, full_seconds, full_requests in rows:
+        full = f"{full_seconds:>13.2f} {full_requests:>11}" if full_seconds is not None else f"{'-':>13} {'-':>11}"
+        print(f"{label:<20} {seconds:>11.2f} {requests:>11} {full}")
+
+    if failures:
+        print("\nFALLO:\n  " + "\n  ".join(failures))
+        raise SystemExit(1)
+    print("\nSolo se re-sintetizan los fragmentos editados: OK")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Compara dos resultados JSON de benchmarks.bench_pipeline (por ejemplo, de dos commits).
+
+Muestra la mediana de cada etapa en ambos archivos y la variación. Sale con código 1
+si alguna etapa empeora más que --threshold, para poder usarlo en CI.
+
+Uso (desde backend):
+    python -m benchmarks.compare base.json nuevo.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara dos resultados de bench_pipeline')
+    parser.add_argument('base', help='JSON de referencia')
+    parser.add_argument('new', help='JSON a comparar')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Empeoramiento relativo tolerado (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    base = load(args.base)
+    new = load(args.new)
+    print(f"base:  {(base.get('commit') or '?')[:10]}{' (con cambios)' if base.get('dirty') else ''}")
+    print(f"nuevo: {(new.get('commit') or '?')[:10]}{' (con cambios)' if new.get('dirty') else ''}\n")
+    print(f"{'etapa':<40} {'base (s)':>10} {'nuevo (s)':>10} {'cambio':>9}")
+
+    regressions = []
+    for name in sorted(set(base['stages']) | set(new['stages'])):
+        old_result = base['stages'].get(name) or {}
+        new_result = new['stages'].get(name) or {}
+        old_median = old_result.get('median')
+        new_median = new_result.get('median')
+        if old_median is None or new_median is None:
+            print(f"{name:<40} {_fmt(old_median):>10} {_fmt(new_median):>10} {'-':>9}")
+            continue
+        change = (new_median - old_median) / old_median if old_median else 0.0
+        marker = ''
+        if change > args.threshold:
+            marker = '  <- más lento'
+            regressions.append(name)
+        print(f"{name:<40} {old_median:>10.4f} {new_median:>10.4f} {change:>+8.1%}{marker}")
+
+    if regressions:
+        print(f"\n{len(regressions)} etapa(s) empeoraron más de {args.threshold:.0%}")
+        sys.exit(1)
+
+def _fmt(value):
+    return 'n/a' if value is None else f"{value:.4f}"
+
+if __name__ == '__main__':
+    main()
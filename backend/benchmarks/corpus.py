@@ -0,0 +1,59 @@
+"""
+Generadores de corpus sintéticos para los benchmarks (sin red ni archivos externos).
+
+- build_text_pdf: PDF con capa de texto (extracción directa con PyMuPDF).
+- build_scanned_pdf: PDF en el que cada página es solo una imagen (fuerza el OCR).
+- long_text: texto largo en español con oraciones de largo variable, reproducible por semilla.
+"""
+import random
+
+SAMPLE_TEXT = (
+    "La lectura en voz alta de documentos escaneados requiere reconocer cada página. "
+    "Este párrafo se repite para simular un libro digitalizado con texto denso. "
+)
+
+WORDS = (
+    "documento página lectura audio voz texto capítulo párrafo libro síntesis oración "
+    "sonido archivo sistema proceso fragmento resultado tiempo palabra historia ciudad"
+).split()
+
+def _page_body(pg, repeat):
+    return f"Página {pg + 1}\n\n" + SAMPLE_TEXT * repeat
+
+def build_text_pdf(path, pages, repeat=12):
+    """Crea un PDF con capa de texto real en cada página."""
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    for pg in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), _page_body(pg, repeat), fontsize=11)
+    doc.save(path)
+    doc.close()
+
+def build_scanned_pdf(path, pages, dpi=150, repeat=12):
+    """Crea un PDF en el que cada página es solo una imagen rasterizada de texto."""
+    import fitz  # PyMuPDF
+    scanned = fitz.open()
+    for pg in range(pages):
+        source = fitz.open()
+        page = source.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), _page_body(pg, repeat), fontsize=11)
+        pix = page.get_pixmap(dpi=dpi)
+        source.close()
+
+        target = scanned.new_page(width=pix.width * 72 / dpi, height=pix.height * 72 / dpi)
+        target.insert_image(target.rect, pixmap=pix)
+    scanned.save(path)
+    scanned.close()
+
+def long_text(chars, seed=0):
+    """Texto de `chars` caracteres con oraciones de 4 a 40 palabras (siempre el mismo para una semilla)."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < chars:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 40))]
+        sentence = " ".join(words).capitalize() + rng.choice(('.', '.', '.', '?', '!')) + " "
+        parts.append(sentence)
+        total += len(sentence)
+    return "".join(parts)[:chars]
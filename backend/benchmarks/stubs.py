@@ -0,0 +1,263 @@
+"""
+Servidores locales que imitan a los proveedores TTS en la nube.
+
+Permiten medir el backend sin red ni credenciales: responden con un MP3 silencioso
+válido después de una latencia configurable y pueden devolver 429 de forma aleatoria.
+StubTTSServer cubre Azure y Google (REST); StubEdgeTTSServer habla el protocolo
+websocket de edge-tts.
+"""
+import asyncio
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Frame MPEG-1 Layer III de 128 kbps / 44.1 kHz en silencio (417 bytes)
+SILENT_MP3_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+def silent_mp3(frames=40):
+    """MP3 silencioso de ~1 segundo por cada 38 frames."""
+    return SILENT_MP3_FRAME * frames
+
+
+class StubTTSServer:
+    """
+    Servidor local con dos rutas:
+    - POST /azure  -> responde audio/mpeg como Azure Speech REST.
+    - POST /google -> responde {"audioContent": base64} como Google Cloud TTS.
+    - POST /token  -> entrega un access token falso (token_uri de la cuenta de servicio),
+      con su propia latencia (token_latency) y contador (token_requests).
+    """
+
+    def __init__(self, latency=0.2, error_rate=0.0, frames=40, token_latency=0.0, token_expires_in=3600):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.token_latency = token_latency
+        self.token_expires_in = token_expires_in
+        self.audio = silent_mp3(frames)
+        self.requests = 0
+        self.token_requests = 0
+        self.errors = 0
+        self.max_concurrent = 0
+        self._concurrent = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def azure_url(self):
+        return f"{self.base_url}/azure"
+
+    @property
+    def google_url(self):
+        return f"{self.base_url}/google"
+
+    @property
+    def token_url(self):
+        return f"{self.base_url}/token"
+
+    def google_service_account_info(self):
+        """Cuenta de servicio falsa cuyo token_uri apunta a este servidor."""
+        return {
+            'type': 'service_account',
+            'project_id': 'stub',
+            'private_key_id': 'stub',
+            'private_key': _generate_private_key_pem(),
+            'client_email': 'stub@stub.iam.gserviceaccount.com',
+            'client_id': '0',
+            'token_uri': self.token_url,
+        }
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                if self.path.startswith('/token'):
+                    with stub._lock:
+                        stub.token_requests += 1
+                        token = f'stub-token-{stub.token_requests}'
+                    time.sleep(stub.token_latency)
+                    body = json.dumps({'access_token': token, 'expires_in': stub.token_expires_in, 'token_type': 'Bearer'})
+                    self._send(200, body.encode('utf-8'), 'application/json')
+                    return
+                with stub._lock:
+                    stub.requests += 1
+                    stub._concurrent += 1
+                    stub.max_concurrent = max(stub.max_concurrent, stub._concurrent)
+                try:
+                    time.sleep(stub.latency)
+                    if stub.error_rate and random.random() < stub.error_rate:
+                        with stub._lock:
+                            stub.errors += 1
+                        self._send(429, b'{"error": "throttled"}', 'application/json', {'Retry-After': '0'})
+                    elif self.path.startswith('/google'):
+                        body = json.dumps({'audioContent': base64.b64encode(stub.audio).decode('ascii')}).encode('utf-8')
+                        self._send(200, body, 'application/json')
+                    else:
+                        self._send(200, stub.audio, 'audio/mpeg')
+                finally:
+                    with stub._lock:
+                        stub._concurrent -= 1
+
+            def _send(self, status, body, content_type, extra_headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (extra_headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _generate_private_key_pem():
+    """Clave RSA efímera para firmar el JWT de la cuenta de servicio falsa."""
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    except ImportError:
+        import rsa
+        _, key = rsa.newkeys(2048)
+        pem = key.save_pkcs1()
+    return pem.decode('ascii')
+
+
+class StubEdgeTTSServer:
+    """
+    Servidor websocket local compatible con edge-tts.
+
+    Por cada mensaje SSML responde turn.start, el audio en mensajes binarios
+    (cabecera de 2 bytes con el largo + cabeceras + MP3) y turn.end.
+    Usar con patch_edge_tts() para que edge_tts.Communicate se conecte aquí.
+    """
+
+    def __init__(self, latency=0.2, frames=40, chunk_size=4096):
+        self.latency = latency
+        self.audio = silent_mp3(frames)
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._port = None
+        self._ready = threading.Event()
+        self._original_wss_url = None
+
+    @property
+    def wss_url(self):
+        # edge-tts agrega parámetros con '&', así que la URL ya debe traer una query
+        return f"ws://127.0.0.1:{self._port}/edge/v1?TrustedClientToken=stub"
+
+    async def _handle(self, request):
+        from aiohttp import WSMsgType, web
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for message in ws:
+            if message.type != WSMsgType.TEXT or 'Path:ssml' not in message.data:
+                continue
+            self.requests += 1
+            request_id = uuid.uuid4().hex
+            await ws.send_str(self._text_message(request_id, 'turn.start', '{}'))
+            await asyncio.sleep(self.latency)
+            for offset in range(0, len(self.audio), self.chunk_size):
+                await ws.send_bytes(self._audio_message(request_id, self.audio[offset:offset + self.chunk_size]))
+            await ws.send_str(self._text_message(request_id, 'turn.end', '{}'))
+        return ws
+
+    @staticmethod
+    def _text_message(request_id, path, body):
+        return f"X-RequestId:{request_id}\r\nContent-Type:application/json; charset=utf-8\r\nPath:{path}\r\n\r\n{body}"
+
+    @staticmethod
+    def _audio_message(request_id, audio):
+        headers = f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n".encode('utf-8')
+        return len(headers).to_bytes(2, 'big') + headers + audio
+
+    def _serve(self):
+        from aiohttp import web
+
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/edge/v1', self._handle)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        self._port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=10)
+        return self
+
+    def stop(self):
+        if self._original_wss_url is not None:
+            import edge_tts.communicate
+            edge_tts.communicate.WSS_URL = self._original_wss_url
+            self._original_wss_url = None
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+            self._loop = None
+
+    def patch_edge_tts(self):
+        """Redirige edge_tts.Communicate a este servidor hasta llamar a stop()."""
+        import edge_tts.communicate
+        if self._original_wss_url is None:
+            self._original_wss_url = edge_tts.communicate.WSS_URL
+        edge_tts.communicate.WSS_URL = self.wss_url
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
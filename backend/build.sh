@@ -8,4 +8,8 @@ pip install -r requirements.txt
 # Instalar Tesseract y el paquete de idioma español
 # Esto es para sistemas basados en Debian/Ubuntu, que es lo que usa Render
 apt-get update
-apt-get install -y tesseract-ocr tesseract-ocr-spa
\ No newline at end of file
+apt-get install -y tesseract-ocr tesseract-ocr-spa
+
+# Opcional: binding persistente de Tesseract (tesserocr). Si no compila se usa pytesseract.
+apt-get install -y libtesseract-dev libleptonica-dev pkg-config
+pip install tesserocr || echo "tesserocr no disponible; se usará pytesseract"
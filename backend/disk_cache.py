@@ -0,0 +1,142 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from metrics import span
+
+
+def hash_key(*parts):
+    """Construye una clave estable (sha256 hex) a partir de varias partes."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        elif not isinstance(part, bytes):
+            part = str(part).encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.hexdigest()
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Calcula el sha256 de un archivo leyendo por bloques."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskLRUCache:
+    """
+    Caché en disco con límite de bytes y expulsión LRU.
+
+    Cada entrada es un archivo <clave><sufijo> dentro de `directory`. El índice LRU se mantiene
+    en memoria y se reconstruye al iniciar a partir de la fecha de modificación de los archivos,
+    que se actualiza en cada acierto.
+    """
+
+    def __init__(self, directory, max_bytes, suffix='.bin'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # clave -> tamaño en bytes
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_served = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _load_index(self):
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, filename[:-len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def get(self, key):
+        """Devuelve los bytes guardados para la clave o None si no existen."""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with span('cache_read'), open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path, None)
+            except OSError:
+                # El archivo desapareció por fuera de la caché
+                self._total_bytes -= self._index.pop(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            self.bytes_served += len(data)
+            return data
+
+    def set(self, key, data):
+        """Guarda los bytes de forma atómica y expulsa las entradas menos usadas si hace falta."""
+        if len(data) > self.max_bytes:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with span('cache_write'):
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, self._path(key))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._lock:
+            if key in self._index:
+                self._total_bytes -= self._index.pop(key)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._index
+
+    def stats(self):
+        """Contadores de uso para exponer en la API."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRatio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'bytesServed': self.bytes_served,
+            }
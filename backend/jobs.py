@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+ERROR = 'error'
+
+
+class JobStore:
+    """
+    Persistencia de trabajos en SQLite (sin broker externo).
+    Cada trabajo guarda tipo, estado, parámetros, progreso y resultado como JSON.
+    Un trabajo en ejecución pertenece al proceso que lo tomó (owner) mientras renueve su
+    lease; la base es compartida por todos los workers de gunicorn.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                '''
+            )
+            columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+            # Bases creadas antes de los leases: los trabajos 'running' sin lease se consideran vencidos
+            if 'owner' not in columns:
+                self._conn.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+            if 'lease_until' not in columns:
+                self._conn.execute('ALTER TABLE jobs ADD COLUMN lease_until REAL')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+
+    def create(self, kind, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, kind, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, kind, QUEUED, json.dumps(params), now, now),
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        """Actualiza columnas; progress y result se serializan a JSON."""
+        for name in ('progress', 'result'):
+            if name in fields and fields[name] is not None:
+                fields[name] = json.dumps(fields[name])
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+
+    def claim(self, job_id, owner, lease):
+        """Pasa un trabajo de 'queued' a 'running' a nombre de owner; devuelve False si otro ya lo tomó."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE jobs SET status = ?, owner = ?, lease_until = ?, updated_at = ? WHERE id = ? AND status = ?',
+                (RUNNING, owner, now + lease, now, job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, owner, lease):
+        """Extiende el lease de los trabajos en ejecución de owner (heartbeat)."""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?',
+                (time.time() + lease, owner, RUNNING),
+            )
+
+    def requeue_expired(self):
+        """
+        Devuelve a la cola los trabajos 'running' cuyo lease venció (su proceso murió o se
+        reinició) y retorna sus ids. Cada cambio es condicional, así que entre varios
+        procesos cada trabajo se reencola una sola vez.
+        """
+        now = time.time()
+        requeued = []
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id FROM jobs WHERE status = ? AND (lease_until IS NULL OR lease_until < ?) ORDER BY created_at',
+                (RUNNING, now),
+            ).fetchall()
+            for row in rows:
+                cursor = self._conn.execute(
+                    'UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL, updated_at = ? '
+                    'WHERE id = ? AND status = ? AND (lease_until IS NULL OR lease_until < ?)',
+                    (QUEUED, now, row['id'], RUNNING, now),
+                )
+                if cursor.rowcount == 1:
+                    requeued.append(row['id'])
+        return requeued
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def ids_with_status(self, *statuses):
+        placeholders = ', '.join('?' for _ in statuses)
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT id FROM jobs WHERE status IN ({placeholders}) ORDER BY created_at', statuses
+            ).fetchall()
+        return [row['id'] for row in rows]
+
+    @staticmethod
+    def _to_dict(row):
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'params': json.loads(row['params']),
+            'progress': json.loads(row['progress'] or '{}'),
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'createdAt': row['created_at'],
+            'updatedAt': row['updated_at'],
+        }
+
+
+class JobManager:
+    """
+    Ejecuta trabajos en un pool acotado de hilos.
+
+    Los manejadores se registran por tipo: handler(params, report) -> dict con el resultado,
+    donde report(**progreso) actualiza el progreso guardado.
+
+    Cada proceso renueva en segundo plano el lease (JOB_LEASE_SECONDS) de los trabajos que
+    ejecuta. Al iniciar, y luego en cada renovación, se retoman los trabajos en cola y solo
+    los 'running' cuyo lease venció: un worker de gunicorn que arranca no reencola lo que
+    otro worker vivo está ejecutando.
+    """
+
+    def __init__(self, store, max_workers=2, lease=None):
+        self.store = store
+        self.handlers = {}
+        self.lease = lease or get_job_lease()
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._recovered = False
+        self._recover_lock = threading.Lock()
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def recover(self):
+        """Retoma los trabajos pendientes de una ejecución anterior e inicia el heartbeat (una sola vez)."""
+        with self._recover_lock:
+            if self._recovered:
+                return
+            self._recovered = True
+        self.store.requeue_expired()
+        # claim() es atómico: si varios workers envían el mismo trabajo, solo uno lo ejecuta
+        for job_id in self.store.ids_with_status(QUEUED):
+            print(f"[jobs] Reanudando trabajo pendiente {job_id}")
+            self._executor.submit(self._run, job_id)
+        threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True).start()
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.lease / 3)
+            try:
+                self.store.renew(self.owner, self.lease)
+                for job_id in self.store.requeue_expired():
+                    print(f"[jobs] Lease vencido, reanudando trabajo {job_id}")
+                    self._executor.submit(self._run, job_id)
+            except Exception as e:
+                print(f"[jobs] Error renovando leases: {e}")
+
+    def submit(self, kind, params):
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        self.recover()
+        job_id = self.store.create(kind, params)
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _run(self, job_id):
+        if not self.store.claim(job_id, self.owner, self.lease):
+            return
+        job = self.store.get(job_id)
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            self.store.update(job_id, status=ERROR, error=f"Tipo de trabajo desconocido: {job['kind']}")
+            return
+
+        progress = dict(job['progress'])
+
+        def report(**values):
+            progress.update(values)
+            self.store.update(job_id, progress=progress)
+
+        try:
+            result = handler(job['params'], report)
+            self.store.update(job_id, status=DONE, result=result or {})
+        except Exception as e:
+            traceback.print_exc()
+            self.store.update(job_id, status=ERROR, error=str(e))
+
+
+def get_job_lease():
+    """Segundos sin heartbeat tras los que otro proceso retoma un trabajo (JOB_LEASE_SECONDS, por defecto 60)."""
+    try:
+        return max(3.0, float(os.getenv('JOB_LEASE_SECONDS', '60')))
+    except ValueError:
+        return 60.0
+
+def get_job_workers():
+    try:
+        return max(1, int(os.getenv('JOB_WORKERS', '2')))
+    except ValueError:
+        return 2
@@ -1,18 +1,33 @@
 
+import time
+# Inicio del arranque de la CLI (ver record_startup en main)
+_startup_started = time.perf_counter()
+
 import argparse
-import asyncio
 import os
-from ocr_pdf_to_text import ocr_pdf_to_text
-from text_to_speech import text_to_speech
+from metrics import record_startup
+from pipeline import pdf_to_audio
 
 def main():
     parser = argparse.ArgumentParser(description='Convierte un PDF a texto y luego a audio')
-    parser.add_argument('--pdf', required=True, help='Nombre del archivo PDF (solo el nombre, debe estar en la carpeta input)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--pdf', help='Nombre del archivo PDF (solo el nombre, debe estar en la carpeta input)')
+    source.add_argument('--dir', help='Modo lote: procesa todos los PDF de esta carpeta')
+    source.add_argument('--manifest', help='Modo lote: archivo con una ruta de PDF por línea')
     parser.add_argument('--out', help='Nombre del archivo de salida de texto (solo el nombre, irá a output)')
     parser.add_argument('--audio', help='Nombre del archivo de salida de audio (solo el nombre, irá a output)')
     parser.add_argument('--lang', default=None, help='Idioma para Tesseract (por defecto: spa)')
     parser.add_argument('--voice', default=None, help='Nombre exacto de la voz para la síntesis (por defecto: es-ES-ElviraNeural)')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos para el OCR de páginas escaneadas (por defecto: OCR_WORKERS o 1)')
+    parser.add_argument('--jobs', type=int, default=None, help='Modo lote: PDFs con OCR en paralelo (por defecto: núcleos disponibles)')
+    parser.add_argument('--tts-jobs', type=int, default=2, help='Modo lote: documentos sintetizándose a la vez (por defecto: 2)')
+    parser.add_argument('--force', action='store_true', help='Modo lote: reprocesa aunque las salidas estén al día')
+    parser.add_argument('--report', default=None, help='Modo lote: ruta del reporte JSON (por defecto: output/batch_report.json)')
     args = parser.parse_args()
+    record_startup('main', time.perf_counter() - _startup_started)
+
+    if args.dir or args.manifest:
+        return main_batch(args)
 
     # Definir carpetas
     input_dir = 'input'
@@ -47,18 +62,33 @@ def main():
     out_audio = os.path.join(output_dir, out_audio_name)
 
 
-    # Paso 1: PDF a texto con manejo de error si el archivo no existe
-    try:
-        ocr_pdf_to_text(pdf_path, out_txt, language=lang)
-    except FileNotFoundError as e:
+    # PDF a texto y texto a audio superpuestos: la síntesis empieza con las primeras páginas
+    if not os.path.isfile(pdf_path):
         print(f"[ERROR] No se encontró el archivo PDF: {pdf_path}")
         return
+    try:
+        pdf_to_audio(pdf_path, out_txt, out_audio, language=lang, voice=voice, workers=args.workers)
     except Exception as e:
         print(f"[ERROR] Ocurrió un error procesando el PDF: {e}")
         return
 
-    # Paso 2: Texto a audio
-    asyncio.run(text_to_speech(out_txt, out_audio, voice=voice))
+def main_batch(args):
+    """Modo lote: OCR en paralelo de una carpeta o manifiesto y síntesis con un pool aparte."""
+    from batch import list_pdfs, print_report, read_manifest, run_batch, write_report
+    output_dir = 'output'
+    pdfs = list_pdfs(args.dir) if args.dir else read_manifest(args.manifest)
+    if not pdfs:
+        print("[INFO] No hay PDFs para procesar")
+        return
+    print(f"[INFO] Procesando {len(pdfs)} PDFs en lote")
+    report = run_batch(
+        pdfs, output_dir, language=args.lang or 'spa', voice=args.voice or 'es-ES-ElviraNeural',
+        jobs=args.jobs, tts_jobs=args.tts_jobs, force=args.force,
+    )
+    print_report(report)
+    report_path = args.report or os.path.join(output_dir, 'batch_report.json')
+    write_report(report, report_path)
+    print(f"[INFO] Reporte guardado en: {report_path}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,231 @@
+"""
+Métricas en memoria del backend (contadores e histogramas) con exposición en el
+formato de texto de Prometheus, sin dependencias externas.
+
+Uso:
+    with span('page_ocr'):
+        ...
+    FRAGMENTS.inc(provider='azure', source='synth')
+
+Los valores son por proceso: con varios workers de gunicorn cada uno expone los suyos.
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = 'pdfaudio_'
+
+# Cubre desde operaciones de milisegundos (split, caché) hasta documentos de varios minutos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Contador monótono con etiquetas."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in sorted(items):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Histograma acumulativo (buckets + suma + cantidad) con etiquetas."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, dict(series, counts=list(series['counts']))) for key, series in self._series.items()]
+        for key, series in sorted(items):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['counts']):
+                cumulative += count
+                yield f'{self.name}_bucket', labels + [('le', _format_value(bound))], cumulative
+            yield f'{self.name}_sum', labels, series['sum']
+            yield f'{self.name}_count', labels, series['count']
+
+
+class Registry:
+    """Conjunto de métricas del proceso más colectores que se evalúan al exportar."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def register_collector(self, collector):
+        """
+        collector() -> iterable de (nombre, tipo, ayuda, [(etiquetas_dict, valor), ...]).
+        Sirve para publicar valores que ya se llevan en otro lugar (p. ej. las cachés).
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Texto en el formato de exposición de Prometheus (text/plain; version=0.0.4)."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                lines.append(f'# colector con error: {e}')
+                continue
+            for name, kind, help_text, samples in families:
+                name = PREFIX + name
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# --- Métricas del pipeline ---
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'stage_seconds', 'Duración de cada etapa del pipeline (render, OCR, síntesis, ffmpeg, disco).', ('stage',),
+)
+PAGES = REGISTRY.counter('pages_total', 'Páginas procesadas según la estrategia de extracción.', ('strategy',))
+TTS_FRAGMENT_SECONDS = REGISTRY.histogram(
+    'tts_fragment_seconds', 'Latencia de síntesis de un fragmento por proveedor (sin aciertos de caché).', ('provider',),
+)
+TTS_SYNTHESIS_SECONDS = REGISTRY.histogram(
+    'tts_synthesis_seconds', 'Duración de la síntesis de un texto completo por proveedor.', ('provider',),
+)
+FRAGMENTS = REGISTRY.counter('tts_fragments_total', 'Fragmentos de audio por proveedor y origen.', ('provider', 'source'))
+AUDIO_BYTES = REGISTRY.counter('tts_audio_bytes_total', 'Bytes de audio producidos por proveedor.', ('provider',))
+TTS_FAILOVERS = REGISTRY.counter(
+    'tts_failovers_total', 'Fragmentos sintetizados por un proveedor de respaldo.', ('from_provider', 'to_provider'),
+)
+HTTP_RETRIES = REGISTRY.counter('tts_http_retries_total', 'Reintentos HTTP hacia proveedores TTS.', ('reason',))
+GOOGLE_TOKENS = REGISTRY.counter(
+    'google_tokens_total', 'Tokens de Google Cloud entregados (cache, request = renovación bloqueante, background).', ('source',),
+)
+TTS_COALESCED = REGISTRY.counter(
+    'tts_coalesced_requests_total', 'Síntesis pedidas: ejecutadas (leader), unidas a una en curso (joined) o reutilizadas (recent).', ('outcome',),
+)
+BYTES = REGISTRY.counter('bytes_total', 'Bytes recibidos y escritos por tipo.', ('kind',))
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_seconds', 'Latencia de las rutas HTTP del backend.', ('route', 'method', 'status'),
+)
+
+@contextmanager
+def span(stage):
+    """Mide un bloque y lo registra en stage_seconds{stage=...}."""
+    with STAGE_SECONDS.time(stage=stage):
+        yield
+
+# --- Tiempos de arranque ---
+
+_startup_seconds = {}
+
+def record_startup(phase, seconds):
+    """
+    Registra cuánto tardó una fase de arranque (p. ej. 'app', 'main' o 'provider_azure',
+    la primera importación de un proveedor). Con STARTUP_LOG=1 también se imprime.
+    """
+    _startup_seconds[phase] = seconds
+    if os.getenv('STARTUP_LOG', '0') == '1':
+        print(f"[arranque] {phase}: {seconds * 1000:.1f} ms")
+
+def get_startup_seconds():
+    return dict(_startup_seconds)
+
+def collect_startup_metrics():
+    yield 'startup_seconds', 'gauge', 'Duración de cada fase de arranque del proceso.', [
+        ({'phase': phase}, seconds) for phase, seconds in sorted(get_startup_seconds().items())
+    ]
+
+REGISTRY.register_collector(collect_startup_metrics)
+
+def render_metrics():
+    return REGISTRY.render()
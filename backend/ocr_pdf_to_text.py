@@ -1,11 +1,13 @@
-import fitz  # PyMuPDF
 import re
 import os
-import io
 import platform
-from PIL import Image
-import pytesseract
+import time
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
+from disk_cache import DiskLRUCache, hash_file, hash_key
+from metrics import PAGES, STAGE_SECONDS, span
 
 # --- Configuración de Tesseract dependiente del sistema operativo ---
 
@@ -14,14 +16,16 @@ load_dotenv()
 
 # Por defecto, no se necesita configurar rutas (para Linux/Render)
 tessdata_dir = ''
+tesseract_cmd = None
+
+# PyMuPDF, PIL y pytesseract se importan dentro de las funciones que los usan: importar este
+# módulo (al arrancar la app o la CLI) no los carga hasta procesar el primer PDF.
 
 # Si estamos en Windows, usamos las rutas del .env
 if platform.system() == "Windows":
     print("Sistema Windows detectado. Usando rutas de Tesseract desde .env")
     tesseract_cmd = os.getenv('TESSERACT_CMD')
-    if tesseract_cmd:
-        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
-    else:
+    if not tesseract_cmd:
         print("Advertencia: TESSERACT_CMD no está configurado en .env para Windows.")
 
     tessdata_dir_win = os.getenv('TESSDATA_PREFIX')
@@ -32,69 +36,582 @@ if platform.system() == "Windows":
 else:
     print("Sistema no-Windows (Linux/Render) detectado. Tesseract debe estar en el PATH.")
 
-def extract_text_from_pdf(pdf_path, language='spa'):
-    """
-    Extrae texto de un PDF usando un método híbrido:
-    1. Intenta la extracción de texto directa (rápido y preciso para PDFs con texto).
-    2. Si falla o el texto es mínimo, usa OCR con Tesseract (potente para PDFs basados en imágenes).
-    """
-    doc = fitz.open(pdf_path)
-    all_text = ""
-    
-    for pg, page in enumerate(doc, start=1):
-        print(f"Procesando página {pg}/{len(doc)}...")
-        
-        # Intento 1: Extracción de texto directa
-        text = page.get_text("text")
-        
-        # Si el texto es mínimo, probablemente es una imagen. Usar OCR.
-        if len(text.strip()) < 20:
-            print(f"Página {pg} parece ser una imagen. Usando OCR con Tesseract...")
-            try:
-                pix = page.get_pixmap(dpi=300)
-                img_bytes = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_bytes))
-                
-                # Construir el argumento de configuración para Tesseract, SIN comillas
-                config = f'--tessdata-dir {tessdata_dir}' if tessdata_dir else ''
-                
-                # Usar Tesseract para el OCR, pasando la configuración directamente
-                text = pytesseract.image_to_string(img, lang=language, config=config)
-
-            except Exception as e:
-                print(f"Error durante el OCR con Tesseract en la página {pg}: {e}")
-                text = "" # Continuar con la siguiente página si hay un error
-
-        all_text += text + "\n"  # Usar \n para poder procesar guiones al final de línea
-    
-    # --- Limpieza final del texto completo ---
-    
+def get_ocr_workers(workers=None):
+    """
+    Resuelve cuántos procesos usar para el OCR.
+    Prioriza el argumento explícito, luego OCR_WORKERS del .env y por defecto 1 (modo secuencial).
+    """
+    if workers is None:
+        workers = os.getenv('OCR_WORKERS', '1')
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        workers = 1
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+# --- Caché de resultados de extracción ---
+
+# Subir esta versión cada vez que cambien las reglas de clean_text o el método de OCR,
+# así las entradas antiguas dejan de coincidir y terminan expulsadas por LRU.
+TEXT_CACHE_VERSION = 2
+
+_text_cache = None
+_page_cache = None
+
+def _cache_dir(name):
+    base = os.getenv('PDF_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+    return os.path.join(base, name)
+
+def _cache_max_bytes():
+    try:
+        return int(os.getenv('PDF_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+    except ValueError:
+        return 256 * 1024 * 1024
+
+def is_text_cache_enabled():
+    return os.getenv('PDF_CACHE_ENABLED', '1') != '0'
+
+def is_page_cache_enabled():
+    return os.getenv('PDF_CACHE_PAGES', '0') == '1'
+
+def get_text_cache():
+    """Caché del texto limpio de documentos completos."""
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = DiskLRUCache(_cache_dir('pdf_text'), _cache_max_bytes(), suffix='.txt')
+    return _text_cache
+
+def get_page_cache():
+    """Caché opcional del texto crudo por página (evita repetir el OCR de páginas ya vistas)."""
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = DiskLRUCache(_cache_dir('pdf_pages'), _cache_max_bytes(), suffix='.txt')
+    return _page_cache
+
+def text_cache_key(pdf_hash, language, page=None):
+    """Clave de caché: hash del PDF + idioma (+ página) + versión de las reglas de limpieza."""
+    return hash_key('pdf-text', TEXT_CACHE_VERSION, pdf_hash, language, '' if page is None else page)
+
+def get_cache_stats():
+    """Contadores de la caché de extracción para exponer en la API."""
+    stats = {'pdfText': get_text_cache().stats()}
+    if is_page_cache_enabled():
+        stats['pdfPages'] = get_page_cache().stats()
+    return stats
+
+def get_cached_text(pdf_hash, language='spa'):
+    """Devuelve el texto limpio guardado para este PDF e idioma, o None si no está en caché."""
+    if not is_text_cache_enabled():
+        return None
+    cached = get_text_cache().get(text_cache_key(pdf_hash, language))
+    return cached.decode('utf-8') if cached is not None else None
+
+# --- Clasificación de páginas y OCR adaptativo ---
+
+def get_ocr_dpi_levels():
+    """Resoluciones a probar en orden (OCR_DPI_LEVELS, por defecto "200,300")."""
+    levels = []
+    for value in os.getenv('OCR_DPI_LEVELS', '200,300').split(','):
+        try:
+            levels.append(int(value))
+        except ValueError:
+            continue
+    return levels or [300]
+
+def get_ocr_min_confidence():
+    """Confianza media mínima (0-100) para aceptar el OCR sin subir la resolución."""
+    try:
+        return float(os.getenv('OCR_MIN_CONFIDENCE', '75'))
+    except ValueError:
+        return 75.0
+
+def classify_page(page, text):
+    """
+    Decide cómo extraer una página a partir de la densidad de texto, la presencia de fuentes
+    y la superficie cubierta por imágenes:
+    - 'text': la capa de texto es suficiente (también si es corta y no hay imágenes).
+    - 'ocr': la página es (casi) una imagen y requiere Tesseract.
+    - 'blank': no hay texto, imágenes ni dibujos; no vale la pena renderizarla.
+    """
+    import fitz  # PyMuPDF
+    chars = len(text.strip())
+    page_area = abs(page.rect) or 1.0
+    image_area = 0.0
+    for info in page.get_image_info():
+        image_area += abs(fitz.Rect(info['bbox']) & page.rect)
+    coverage = min(1.0, image_area / page_area)
+
+    if chars >= 20:
+        # Escaneo a página completa con solo un encabezado o número en la capa de texto
+        density = chars / page_area * 1000
+        has_fonts = bool(page.get_fonts())
+        if coverage >= 0.8 and (density < 0.5 or not has_fonts):
+            return 'ocr'
+        return 'text'
+    if coverage == 0:
+        # Páginas cortas sin imágenes ("Capítulo Uno", "Fin"): la capa de texto basta
+        if chars > 0:
+            return 'text'
+        if not page.get_drawings():
+            return 'blank'
+    return 'ocr'
+
+def render_page_gray(page, dpi):
+    """Renderiza la página en escala de grises y la entrega a PIL sin pasar por PNG."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    samples = getattr(pix, 'samples_mv', None) or pix.samples
+    return Image.frombuffer('L', (pix.width, pix.height), samples, 'raw', 'L', pix.stride, 1)
+
+def _text_from_ocr_data(data):
+    """Reconstruye el texto (con saltos de línea) y la confianza media desde image_to_data."""
+    lines = []
+    current_key = None
+    confidences = []
+    for i, word in enumerate(data['text']):
+        conf = float(data['conf'][i])
+        if conf < 0 or not word.strip():
+            continue
+        confidences.append(conf)
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        if key != current_key:
+            if current_key is not None and key[:2] != current_key[:2]:
+                lines.append('')  # Separación de párrafo
+            lines.append(word)
+            current_key = key
+        else:
+            lines[-1] += ' ' + word
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return '\n'.join(lines) + '\n', confidence
+
+# --- Motores de OCR ---
+
+class PytesseractEngine:
+    """Motor de respaldo: pytesseract lanza un proceso tesseract por imagen."""
+
+    name = 'pytesseract'
+
+    def __init__(self):
+        import pytesseract
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self._pytesseract = pytesseract
+
+    def recognize(self, img, language):
+        """Devuelve (texto, confianza_media) de una imagen PIL."""
+        # Construir el argumento de configuración para Tesseract, SIN comillas
+        config = f'--tessdata-dir {tessdata_dir}' if tessdata_dir else ''
+        pytesseract = self._pytesseract
+        data = pytesseract.image_to_data(img, lang=language, config=config, output_type=pytesseract.Output.DICT)
+        return _text_from_ocr_data(data)
+
+
+class TesserocrEngine:
+    """
+    Motor persistente vía tesserocr (binding de la API C++ de Tesseract).
+    Mantiene un pool acotado de instancias por idioma (como mucho max_apis, por defecto
+    OCR_WORKERS; cada proceso del pool de OCR tiene el suyo): cada reconocimiento toma una
+    instancia libre y la devuelve al terminar. Así el traineddata se carga una sola vez por
+    instancia, las imágenes se pasan en memoria y los hilos por petición no acumulan instancias.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, max_apis=None):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.max_apis = max(1, max_apis or get_ocr_workers())
+        self._idle = {}  # idioma -> instancias libres
+        self._created = {}  # idioma -> instancias creadas
+        self._all_apis = []
+        self._available = threading.Condition()
+        atexit.register(self.close)
+
+    def _acquire(self, language):
+        """Toma una instancia libre del idioma, creándola si el pool no está lleno o esperando una."""
+        with self._available:
+            while True:
+                idle = self._idle.setdefault(language, [])
+                if idle:
+                    return idle.pop()
+                if self._created.get(language, 0) < self.max_apis:
+                    self._created[language] = self._created.get(language, 0) + 1
+                    break
+                self._available.wait()
+        try:
+            kwargs = {'lang': language}
+            if tessdata_dir:
+                kwargs['path'] = tessdata_dir
+            api = self._tesserocr.PyTessBaseAPI(**kwargs)
+        except Exception:
+            with self._available:
+                self._created[language] -= 1
+                self._available.notify()
+            raise
+        with self._available:
+            self._all_apis.append(api)
+        return api
+
+    def _release(self, language, api):
+        with self._available:
+            self._idle.setdefault(language, []).append(api)
+            self._available.notify()
+
+    def recognize(self, img, language):
+        """Devuelve (texto, confianza_media) de una imagen PIL."""
+        api = self._acquire(language)
+        try:
+            api.SetImage(img)
+            text = api.GetUTF8Text()
+            confidences = [c for c in api.AllWordConfidences() if c >= 0]
+        finally:
+            api.Clear()
+            self._release(language, api)
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return text, confidence
+
+    def close(self):
+        with self._available:
+            for api in self._all_apis:
+                try:
+                    api.End()
+                except Exception:
+                    pass
+            self._all_apis = []
+            self._idle = {}
+            self._created = {}
+
+
+_ocr_engine = None
+_ocr_engine_lock = threading.Lock()
+
+def get_ocr_engine():
+    """
+    Motor de OCR según OCR_ENGINE: 'auto' (tesserocr si está instalado), 'tesserocr' o 'pytesseract'.
+    Si tesserocr no puede iniciarse se usa pytesseract como respaldo.
+    """
+    global _ocr_engine
+    with _ocr_engine_lock:
+        if _ocr_engine is None:
+            choice = os.getenv('OCR_ENGINE', 'auto').lower()
+            if choice in ('auto', 'tesserocr'):
+                try:
+                    _ocr_engine = TesserocrEngine()
+                except Exception as e:
+                    if choice == 'tesserocr':
+                        print(f"Advertencia: no se pudo iniciar tesserocr ({e}). Usando pytesseract.")
+            if _ocr_engine is None:
+                _ocr_engine = PytesseractEngine()
+            print(f"Motor de OCR: {_ocr_engine.name}")
+        return _ocr_engine
+
+def ocr_page(page, language='spa'):
+    """
+    OCR adaptativo: renderiza primero a la resolución más barata de OCR_DPI_LEVELS y
+    sube de resolución solo si la confianza media de Tesseract queda bajo OCR_MIN_CONFIDENCE.
+    Devuelve (texto, info) con la resolución usada, la confianza obtenida y el motor.
+    info también trae render_seconds y recognize_seconds (sumados entre resoluciones), que
+    se devuelven en lugar de registrarse aquí porque esta función corre en los procesos del pool.
+    """
+    engine = get_ocr_engine()
+    levels = get_ocr_dpi_levels()
+    min_confidence = get_ocr_min_confidence()
+
+    best = None
+    render_seconds = recognize_seconds = 0.0
+    for dpi in levels:
+        start = time.perf_counter()
+        img = render_page_gray(page, dpi)
+        render_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        text, confidence = engine.recognize(img, language)
+        recognize_seconds += time.perf_counter() - start
+        if best is None or confidence >= best[1]['confidence']:
+            best = (text, {'dpi': dpi, 'confidence': round(confidence, 1), 'engine': engine.name})
+        if confidence >= min_confidence:
+            break
+    best[1]['render_seconds'] = render_seconds
+    best[1]['recognize_seconds'] = recognize_seconds
+    return best
+
+# Documento abierto por cada proceso del pool (uno por worker, no uno por página)
+_worker_doc = None
+
+def _init_ocr_worker(pdf_path):
+    import fitz  # PyMuPDF
+    global _worker_doc
+    _worker_doc = fitz.open(pdf_path)
+
+def _ocr_page_in_worker(page_index, language):
+    """Ejecuta el OCR de una página dentro de un proceso del pool. Nunca lanza excepciones."""
+    start = time.perf_counter()
+    try:
+        text, info = ocr_page(_worker_doc[page_index], language)
+        error = None
+    except Exception as e:
+        text, info, error = "", {}, str(e)
+    info['seconds'] = time.perf_counter() - start
+    return text, error, info
+
+def iter_page_texts(pdf_path, language='spa', workers=None, pdf_hash=None, on_page=None, page_stats=None, page_errors=None):
+    """
+    Genera el texto crudo de cada página, en orden, a medida que está disponible.
+    Cada página se clasifica (ver classify_page):
+    1. Extracción de texto directa si la capa de texto es suficiente (rápido y preciso).
+    2. OCR adaptativo con Tesseract para páginas escaneadas (ver ocr_page).
+    3. Las páginas en blanco se omiten sin renderizar.
+
+    Con workers > 1 (o OCR_WORKERS en el .env) las páginas que requieren OCR se envían
+    a un pool de procesos desde el inicio y se entregan en orden conforme terminan.
+
+    Si se entrega pdf_hash, el texto de cada página se lee y guarda en la caché por página.
+    on_page(pagina, total) se llama cada vez que una página queda lista (para reportar progreso).
+    Si se entrega la lista page_stats, se agrega por página la estrategia usada, la resolución,
+    la confianza del OCR y el tiempo empleado. En la lista page_errors se agrega el número
+    de cada página cuyo OCR falló (se entrega vacía y no se guarda en la caché por página).
+    """
+    import fitz  # PyMuPDF
+    workers = get_ocr_workers(workers)
+    page_cache = get_page_cache() if pdf_hash else None
+    with span('pdf_open'):
+        doc = fitz.open(pdf_path)
+    executor = None
+    futures = {}
+    try:
+        total = len(doc)
+
+        def emit(idx, text, strategy, started, **info):
+            PAGES.inc(strategy=strategy)
+            if strategy == 'ocr-error' and page_errors is not None:
+                page_errors.append(idx + 1)
+            if 'render_seconds' in info:
+                STAGE_SECONDS.observe(info.pop('render_seconds'), stage='page_render')
+                STAGE_SECONDS.observe(info.pop('recognize_seconds'), stage='page_ocr')
+            if page_stats is not None:
+                page_stats.append({
+                    'page': idx + 1,
+                    'strategy': strategy,
+                    'seconds': round(info.pop('seconds', time.perf_counter() - started), 4),
+                    **info,
+                })
+            if on_page is not None:
+                on_page(idx + 1, total)
+            return text
+
+        if workers > 1:
+            with span('pdf_classify'):
+                ocr_indexes = [
+                    idx for idx, page in enumerate(doc)
+                    if not (page_cache and text_cache_key(pdf_hash, language, idx) in page_cache)
+                    and classify_page(page, page.get_text("text")) == 'ocr'
+                ]
+            if ocr_indexes:
+                print(f"Ejecutando OCR de {len(ocr_indexes)} páginas con {workers} procesos...")
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker, initargs=(pdf_path,))
+                futures = {idx: executor.submit(_ocr_page_in_worker, idx, language) for idx in ocr_indexes}
+
+        for idx, page in enumerate(doc):
+            pg = idx + 1
+            started = time.perf_counter()
+            print(f"Procesando página {pg}/{total}...")
+
+            if page_cache is not None:
+                cached = page_cache.get(text_cache_key(pdf_hash, language, idx))
+                if cached is not None:
+                    yield emit(idx, cached.decode('utf-8'), 'cache', started)
+                    continue
+
+            if idx in futures:
+                print(f"Página {pg} parece ser una imagen. Esperando OCR del pool...")
+                try:
+                    text, error, info = futures.pop(idx).result()
+                except Exception as e:
+                    text, error, info = "", str(e), {}
+                if error:
+                    print(f"Error durante el OCR con Tesseract en la página {pg}: {error}")
+                    yield emit(idx, text, 'ocr-error', started, **info)
+                    continue
+                if page_cache is not None:
+                    page_cache.set(text_cache_key(pdf_hash, language, idx), text.encode('utf-8'))
+                yield emit(idx, text, 'ocr', started, **info)
+                continue
+
+            # Intento 1: Extracción de texto directa
+            with span('page_text'):
+                text = page.get_text("text")
+                strategy = classify_page(page, text)
+            info = {}
+
+            if strategy == 'blank':
+                text = ""
+            elif strategy == 'ocr':
+                print(f"Página {pg} parece ser una imagen. Usando OCR con Tesseract...")
+                try:
+                    text, info = ocr_page(page, language)
+                except Exception as e:
+                    print(f"Error durante el OCR con Tesseract en la página {pg}: {e}")
+                    text = "" # Continuar con la siguiente página si hay un error
+                    yield emit(idx, text, 'ocr-error', started)
+                    continue
+
+            if page_cache is not None:
+                page_cache.set(text_cache_key(pdf_hash, language, idx), text.encode('utf-8'))
+            yield emit(idx, text, strategy, started, **info)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        doc.close()
+
+# Página que termina con una palabra cortada por guion: "palab-\n"
+_TRAILING_HYPHEN_RE = re.compile(r'-\s*\n\s*\Z')
+
+def clean_text(text):
+    """Aplica las reglas de limpieza del texto extraído a un bloque (página o documento)."""
     # 1. Unir palabras separadas por guion al final de la línea. Ej: "palab-\nra" -> "palabra"
-    all_text = re.sub(r'-\s*\n\s*', '', all_text)
-    
+    text = re.sub(r'-\s*\n\s*', '', text)
+
     # 2. Eliminar números sueltos (como paginación) que no forman parte de una oración
-    all_text = re.sub(r'\b\d+\b', '', all_text)
-    
+    text = re.sub(r'\b\d+\b', '', text)
+
     # 3. Corregir errores comunes de OCR (se puede expandir si aparecen más)
-    all_text = all_text.replace('â', 'á')
-    
+    text = text.replace('â', 'á')
+
     # 4. Normalizar todos los espacios en blanco (incluidos saltos de línea restantes) a un solo espacio
-    all_text = re.sub(r'\s+', ' ', all_text).strip()
-    
-    return all_text
+    return re.sub(r'\s+', ' ', text).strip()
+
+def iter_clean_pages(raw_pages):
+    """
+    Limpia el texto página por página.
+    Si una página termina en una palabra cortada por guion, ese fragmento se arrastra
+    y se antepone a la página siguiente, igual que la limpieza sobre el documento completo.
+    """
+    carry = ""
+    for raw in raw_pages:
+        if carry:
+            if not raw.strip():
+                continue
+            raw = carry + raw.lstrip()
+            carry = ""
+
+        # Usar \n para poder procesar guiones al final de línea
+        text = raw + "\n"
+        if _TRAILING_HYPHEN_RE.search(text):
+            # La palabra se completa en la página siguiente: se guarda su inicio (ya unido)
+            text = re.sub(r'-\s*\n\s*', '', text)
+            match = re.search(r'\S*\Z', text)
+            carry = match.group(0)
+            text = text[:match.start()]
+
+        cleaned = clean_text(text)
+        if cleaned:
+            yield cleaned
+
+    if carry:
+        cleaned = clean_text(carry)
+        if cleaned:
+            yield cleaned
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+def iter_sentences(blocks):
+    """
+    Reagrupa bloques de texto limpio en oraciones completas, aunque crucen páginas.
+    Solo se divide cada bloque nuevo: la oración inconclusa se arrastra como lista de partes
+    y se une al completarse, así un texto sin puntos no se vuelve a recorrer en cada página.
+    """
+    tail = []  # partes de la oración inconclusa
+    for block in blocks:
+        parts = _SENTENCE_END_RE.split(block)
+        if tail and tail[-1].endswith(('.', '!', '?')):
+            # El bloque anterior terminó una oración: el espacio entre bloques la separa
+            sentence = " ".join(tail).strip()
+            if sentence:
+                yield sentence
+            tail = []
+        tail.append(parts[0])
+        if len(parts) == 1:
+            continue
+        for sentence in [" ".join(tail)] + parts[1:-1]:
+            if sentence.strip():
+                yield sentence.strip()
+        tail = [parts[-1]]
+    pending = " ".join(tail)
+    if pending.strip():
+        yield pending.strip()
+
+def _iter_clean_pages_cached(pdf_path, language, workers, pdf_hash, on_page=None, page_stats=None):
+    """Genera las páginas limpias usando la caché de documento completo cuando hay pdf_hash."""
+    if pdf_hash is None:
+        yield from iter_clean_pages(iter_page_texts(pdf_path, language, workers=workers, on_page=on_page, page_stats=page_stats))
+        return
+
+    cache = get_text_cache()
+    key = text_cache_key(pdf_hash, language)
+    cached = cache.get(key)
+    if cached is not None:
+        # Acierto: no se abre ni se renderiza ninguna página
+        print("Texto del PDF obtenido desde la caché.")
+        text = cached.decode('utf-8')
+        if text:
+            yield text
+        return
+
+    page_hash = pdf_hash if is_page_cache_enabled() else None
+    blocks = []
+    page_errors = []
+    pages = iter_page_texts(
+        pdf_path, language, workers=workers, pdf_hash=page_hash, on_page=on_page, page_stats=page_stats, page_errors=page_errors,
+    )
+    for block in iter_clean_pages(pages):
+        blocks.append(block)
+        yield block
+    # Solo se guarda si el documento se recorrió completo y sin páginas fallidas:
+    # la próxima vez se reintenta el OCR de esas páginas (las demás salen de la caché por página)
+    if page_errors:
+        print(f"Texto del PDF no guardado en la caché: falló el OCR de las páginas {', '.join(map(str, page_errors))}")
+        return
+    cache.set(key, " ".join(blocks).encode('utf-8'))
+
+def iter_text_from_pdf(pdf_path, language='spa', workers=None, unit='page', pdf_hash=None, on_page=None, page_stats=None):
+    """
+    Versión incremental de extract_text_from_pdf.
+    Genera el texto ya limpio por página (unit='page') o por oración (unit='sentence'),
+    de modo que el primer texto está disponible antes de procesar la última página.
+
+    Los resultados se guardan en una caché en disco indexada por el hash del PDF y el idioma
+    (se desactiva con PDF_CACHE_ENABLED=0). Si ya se conoce el hash se puede pasar en pdf_hash.
+    on_page y page_stats se pasan a iter_page_texts (progreso y estrategia/tiempo por página).
+    """
+    if unit not in ('page', 'sentence'):
+        raise ValueError(f"Unidad de texto no soportada: {unit}")
+    if not is_text_cache_enabled():
+        pdf_hash = None
+    elif pdf_hash is None:
+        pdf_hash = hash_file(pdf_path)
+
+    pages = _iter_clean_pages_cached(pdf_path, language, workers, pdf_hash, on_page=on_page, page_stats=page_stats)
+    if unit == 'sentence':
+        return iter_sentences(pages)
+    return pages
+
+def extract_text_from_pdf(pdf_path, language='spa', workers=None, pdf_hash=None, on_page=None, page_stats=None):
+    """
+    Extrae todo el texto limpio de un PDF como un único string.
+    Ver iter_text_from_pdf para el detalle del método híbrido (texto directo + OCR) y la caché.
+    """
+    return " ".join(iter_text_from_pdf(pdf_path, language, workers=workers, pdf_hash=pdf_hash, on_page=on_page, page_stats=page_stats))
 
-def ocr_pdf_to_text(pdf_path, output_txt, language='spa'):
+def ocr_pdf_to_text(pdf_path, output_txt, language='spa', workers=None, on_page=None, page_stats=None, pdf_hash=None):
     """
     Extrae texto de un PDF y lo guarda en un archivo de texto.
     Mantenido por retrocompatibilidad con el endpoint /procesar.
     """
-    all_text = extract_text_from_pdf(pdf_path, language)
-    
-    # Dividir en oraciones completas para una mejor estructura en el archivo de salida
-    sentences = re.split(r'(?<=[.!?])\s+', all_text)
+    # Escribir oración por oración a medida que se procesan las páginas
     with open(output_txt, 'w', encoding='utf-8') as out:
-        for s in sentences:
-            if s.strip(): # Asegurarse de no escribir líneas vacías
-                out.write(s.strip() + "\n")
+        for s in iter_text_from_pdf(pdf_path, language, workers=workers, unit='sentence', pdf_hash=pdf_hash, on_page=on_page, page_stats=page_stats):
+            out.write(s + "\n")
 
     print(f"\n✅ Texto procesado con Tesseract y guardado en: {output_txt}")
@@ -0,0 +1,118 @@
+"""
+Pipeline PDF -> audio con las etapas superpuestas.
+
+En lugar de terminar el OCR, escribir el .txt y volver a leerlo para sintetizar, las
+oraciones extraídas pasan por una cola acotada directamente al fragmentador y a la
+síntesis: mientras se sintetizan los primeros fragmentos, las páginas siguientes todavía
+se están procesando. Para un libro escaneado el tiempo total se acerca a
+max(OCR, síntesis) en vez de OCR + síntesis.
+
+    productor (hilo): iter_text_from_pdf(unit='sentence') -> .txt de salida + cola
+    consumidor: cola -> iter_stream_chunks -> iter_synthesized_fragments -> MP3
+"""
+import os
+import queue
+import threading
+
+from metrics import span
+
+_DONE = object()
+
+
+def get_pipeline_queue_size():
+    """Oraciones que el OCR puede adelantarse a la síntesis (PIPELINE_QUEUE_SIZE, por defecto 1000)."""
+    try:
+        return max(1, int(os.getenv('PIPELINE_QUEUE_SIZE', '1000')))
+    except ValueError:
+        return 1000
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def iter_prefetched(iterable, maxsize):
+    """
+    Recorre iterable en un hilo aparte y entrega sus elementos a través de una cola de a lo
+    sumo maxsize elementos: el productor avanza mientras el consumidor trabaja, y se detiene
+    si la cola se llena. Los errores del productor se relanzan en el consumidor; si el
+    consumidor se detiene antes de terminar, el productor también se detiene.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name='pipeline-producer', daemon=True)
+    thread.start()
+    try:
+        while True:
+            with span('pipeline_wait'):
+                item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def pdf_to_audio(pdf_path, out_txt, out_audio, language='spa', voice='es-ES-ElviraNeural', speed=1.0,
+                 workers=None, pdf_hash=None, on_page=None, on_fragment=None):
+    """
+    OCR de pdf_path y síntesis a out_audio con las etapas superpuestas. El texto también se
+    escribe en out_txt a medida que se extrae (como ocr_pdf_to_text), pero la síntesis no lo
+    vuelve a leer. on_page(pagina, total) y on_fragment(listos, total) reportan el progreso;
+    el total de fragmentos es None porque no se conoce hasta terminar el OCR.
+    Devuelve el resultado de la síntesis (ver synthesize_text_to_file), o provider None si
+    el PDF no tiene texto.
+    """
+    from ocr_pdf_to_text import iter_text_from_pdf
+    from text_to_speech import synthesize_blocks_to_file
+
+    extracted = {'sentences': 0, 'finished': False}
+
+    def sentences():
+        with open(out_txt, 'w', encoding='utf-8') as out:
+            for sentence in iter_text_from_pdf(pdf_path, language, workers=workers, unit='sentence',
+                                               pdf_hash=pdf_hash, on_page=on_page):
+                out.write(sentence + "\n")
+                extracted['sentences'] += 1
+                yield sentence
+        extracted['finished'] = True
+        print(f"\n✅ Texto procesado con Tesseract y guardado en: {out_txt}")
+
+    try:
+        return synthesize_blocks_to_file(
+            iter_prefetched(sentences(), get_pipeline_queue_size()), out_audio, voice, speed, on_fragment,
+        )
+    except RuntimeError:
+        # Sin oraciones no hay fragmentos que unir; cualquier otro error se propaga
+        if not extracted['finished'] or extracted['sentences']:
+            raise
+        print("El PDF no tiene texto. No se generará audio.")
+        return {'provider': None, 'voice_requested': voice, 'voice_used': None}
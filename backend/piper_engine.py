@@ -0,0 +1,93 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class PiperEngine:
+    """
+    Motor Piper en proceso: carga cada modelo ONNX una sola vez y lo mantiene en memoria.
+
+    Los modelos cargados se limitan con un LRU (max_voices) para no acumular en RAM todas las
+    voces de map_voice_to_piper. La síntesis devuelve PCM int16 mono directamente en memoria.
+    """
+
+    def __init__(self, max_voices=3):
+        self.max_voices = max(1, max_voices)
+        self._voices = OrderedDict()  # ruta del modelo -> PiperVoice
+        self._lock = threading.Lock()  # solo para el diccionario y el LRU, nunca durante una carga
+        self._load_locks = {}  # ruta del modelo -> Lock de su carga en curso
+        self.loads = 0
+
+    def get_voice(self, model_path, config_path=None):
+        """
+        Devuelve la voz cargada, leyendo el modelo desde disco solo la primera vez. Los hilos
+        que piden el mismo modelo esperan esa carga; los que usan otras voces no se bloquean.
+        """
+        key = str(model_path)
+        with self._lock:
+            voice = self._voices.get(key)
+            if voice is not None:
+                self._voices.move_to_end(key)
+                return voice
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                voice = self._voices.get(key)
+                if voice is not None:
+                    # Otro hilo terminó la carga mientras esperábamos
+                    self._voices.move_to_end(key)
+                    return voice
+            try:
+                from piper import PiperVoice
+                print(f"[piper] Cargando modelo en memoria: {os.path.basename(key)}")
+                voice = PiperVoice.load(key, config_path=str(config_path) if config_path else None)
+                with self._lock:
+                    self.loads += 1
+                    self._voices[key] = voice
+                    while len(self._voices) > self.max_voices:
+                        evicted, _ = self._voices.popitem(last=False)
+                        print(f"[piper] Liberando modelo de memoria: {os.path.basename(evicted)}")
+            finally:
+                with self._lock:
+                    self._load_locks.pop(key, None)
+            return voice
+
+    def synthesize_pcm(self, model_path, text, speaker=0, length_scale=1.0, config_path=None):
+        """Sintetiza el texto y devuelve (pcm_int16_bytes, sample_rate)."""
+        from piper import SynthesisConfig
+
+        voice = self.get_voice(model_path, config_path)
+        syn_config = SynthesisConfig(speaker_id=int(speaker), length_scale=float(length_scale))
+        pcm = bytearray()
+        for chunk in voice.synthesize(text, syn_config=syn_config):
+            pcm.extend(chunk.audio_int16_bytes)
+        return bytes(pcm), voice.config.sample_rate
+
+    def loaded_voices(self):
+        with self._lock:
+            return [os.path.basename(key) for key in self._voices]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def is_piper_engine_available():
+    """Indica si la API en proceso de piper está instalada (piper-tts >= 1.3)."""
+    try:
+        from piper import PiperVoice, SynthesisConfig  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def get_piper_engine():
+    """Motor Piper compartido por todo el proceso (PIPER_MAX_VOICES modelos en memoria)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            try:
+                max_voices = int(os.getenv('PIPER_MAX_VOICES', '3'))
+            except ValueError:
+                max_voices = 3
+            _engine = PiperEngine(max_voices=max_voices)
+        return _engine
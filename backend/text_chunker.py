@@ -0,0 +1,157 @@
+import re
+
+# Largo máximo de fragmento por proveedor (caracteres)
+PROVIDER_MAX_LENGTH = {
+    'edge': 3000,
+    'azure': 2500,
+    'google': 2500,
+    'piper': 1800,
+}
+
+# Fin de oración: . ! ? … (repetidos) más comillas o paréntesis de cierre, seguido de espacio
+_SENTENCE_END_RE = re.compile(r'[.!?…]+["\'»”’)\]]*(?=\s)')
+# Fin de cláusula: ; : , rayas y paréntesis de cierre, seguido de espacio
+_CLAUSE_END_RE = re.compile(r'[;:,—–)\]]+(?=\s)')
+_NON_SPACE_RE = re.compile(r'\S')
+
+# Los mismos límites buscados sobre la ventana invertida: el primer match es el último
+# corte posible, así cada búsqueda se detiene cerca del final de la ventana en vez de
+# recorrerla entera creando un objeto match por cada oración. El match empieza en el
+# espacio que sigue al fin de oración o de cláusula.
+_REVERSED_SENTENCE_END_RE = re.compile(r'\s["\'»”’)\]]*[.!?…]')
+_REVERSED_CLAUSE_END_RE = re.compile(r'\s[;:,—–)\]]')
+_REVERSED_SPACE_RE = re.compile(r'\s+')
+
+def _last_cut(window, pattern, hi, lo):
+    """
+    Último límite de pattern que termina en [lo, hi], o -1. window es text[start:hi + 1]
+    invertido; el límite es la posición del espacio que sigue al match original.
+    """
+    match = pattern.search(window)
+    if match is None:
+        return -1
+    end = hi - match.start()
+    return end if end >= lo else -1
+
+def _last_space_cut(window, hi, lo):
+    """Último punto de corte en espacios dentro de [lo, hi] (inicio del último tramo de espacios), o -1."""
+    match = _REVERSED_SPACE_RE.search(window)
+    if match is None or hi - match.start() < lo:
+        return -1
+    return max(hi - match.end() + 1, lo)
+
+def iter_text_chunks(text, max_length=3000):
+    """
+    Genera fragmentos de hasta max_length caracteres en una sola pasada sobre offsets.
+    No copia el resto del texto en cada corte: solo se extrae cada fragmento al entregarlo.
+
+    Cada corte busca, dentro de la segunda mitad de la ventana, en este orden:
+    1. El último fin de oración (. ! ? …).
+    2. El último fin de cláusula (; : , rayas).
+    3. El último espacio (nunca corta una palabra si hay espacios).
+    4. Si no hay ninguno, corta en max_length.
+    Como cada corte (salvo el último) avanza al menos max_length // 2 caracteres y cada
+    búsqueda recorre a lo sumo max_length (desde el final de la ventana), el costo total es
+    lineal en el largo del texto.
+    """
+    if max_length < 1:
+        raise ValueError('max_length debe ser al menos 1')
+    n = len(text)
+    min_length = max(1, max_length // 2)
+
+    match = _NON_SPACE_RE.search(text, 0)
+    start = match.start() if match else n
+    while n - start > max_length:
+        lo = start + min_length
+        hi = start + max_length
+        # hi < n: la ventana incluye el carácter que sigue al límite (el espacio del lookahead)
+        window = text[start:hi + 1][::-1]
+        end = _last_cut(window, _REVERSED_SENTENCE_END_RE, hi, lo)
+        if end == -1:
+            end = _last_cut(window, _REVERSED_CLAUSE_END_RE, hi, lo)
+        if end == -1:
+            end = _last_space_cut(window, hi, lo)
+        if end == -1:
+            end = hi
+
+        fragment = text[start:end].strip()
+        if fragment:
+            yield fragment
+        match = _NON_SPACE_RE.search(text, end)
+        start = match.start() if match else n
+
+    if start < n:
+        fragment = text[start:].strip()
+        if fragment:
+            yield fragment
+
+def iter_stream_chunks(blocks, max_length=3000):
+    """
+    Como iter_text_chunks sobre " ".join(blocks), pero consumiendo los bloques a medida que
+    llegan (p. ej. oraciones del OCR): cada fragmento se entrega apenas hay texto suficiente
+    para decidir su corte, sin esperar el documento completo.
+
+    Un corte solo mira la ventana de max_length + 1 caracteres desde el inicio del fragmento,
+    así que mientras el búfer supere max_length los fragmentos (salvo el último, que puede
+    crecer con el bloque siguiente) son idénticos a los de split_text sobre el texto completo.
+    El búfer queda acotado a max_length más el último bloque recibido.
+    """
+    buffer = ''
+    for block in blocks:
+        buffer = f"{buffer} {block}" if buffer else block
+        if len(buffer) <= max_length:
+            continue
+        chunks = iter_text_chunks(buffer, max_length)
+        previous = next(chunks, None)
+        for chunk in chunks:
+            yield previous
+            previous = chunk
+        buffer = previous or ''
+    if buffer.strip():
+        yield from iter_text_chunks(buffer, max_length)
+
+def _find_fragment(text, fragment, start):
+    """Posición de fragment en text desde start, entre espacios o bordes del texto; -1 si no está."""
+    idx = text.find(fragment, start)
+    while idx != -1:
+        end = idx + len(fragment)
+        if (idx == 0 or text[idx - 1].isspace()) and (end == len(text) or text[end].isspace()):
+            return idx
+        idx = text.find(fragment, idx + 1)
+    return -1
+
+def resplit_text(previous, text, max_length=3000):
+    """
+    Fragmenta una versión editada de un texto reutilizando los fragmentos anteriores que
+    siguen presentes tal cual y en el mismo orden: solo el texto nuevo entre ellos se corta
+    con iter_text_chunks. Con split_text sobre el texto completo, una edición corre todos los
+    cortes siguientes y cambia cada fragmento posterior; así, una edición pequeña cambia solo
+    los fragmentos que la contienen.
+    Devuelve una lista de (fragmento, reutilizado).
+    """
+    result = []
+    pos = 0
+
+    def add_gap(end):
+        for fragment in iter_text_chunks(text[pos:end], max_length):
+            result.append((fragment, False))
+
+    for fragment in previous:
+        if len(fragment) > max_length:
+            continue
+        idx = _find_fragment(text, fragment, pos)
+        if idx == -1:
+            continue  # editado o eliminado: su texto nuevo queda en el hueco
+        add_gap(idx)
+        result.append((fragment, True))
+        pos = idx + len(fragment)
+    add_gap(len(text))
+    return result
+
+def split_text(text, max_length=3000):
+    """Versión en lista de iter_text_chunks."""
+    return list(iter_text_chunks(text, max_length))
+
+def provider_max_length(provider):
+    """Largo de fragmento para un proveedor ('edge', 'azure', 'google' o 'piper')."""
+    return PROVIDER_MAX_LENGTH[provider]
@@ -1,40 +1,35 @@
 
 import asyncio
-import base64
-import edge_tts
-import json
+import math
 import os
+import platform
+import re
 import shutil
 import tempfile
 import subprocess
-from html import escape
-from pathlib import Path
+import threading
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
 from dotenv import load_dotenv
-from piper.download_voices import download_voice
+from disk_cache import DiskLRUCache, hash_key
+from audio_sink import Mp3EncoderSink, iter_encoded_mp3, read_wav_format
+from text_chunker import iter_stream_chunks, provider_max_length, split_text
+from tts_providers import ProviderSpec, UnsupportedVoiceError, rank_providers, register_provider
+from metrics import AUDIO_BYTES, FRAGMENTS, TTS_FAILOVERS, TTS_FRAGMENT_SECONDS, TTS_SYNTHESIS_SECONDS, span
+# Los proveedores (tts_azure, tts_google, tts_edge, tts_piper) y sus librerías se importan en el primer
+# uso a través de tts_providers, no al importar este módulo
 load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
 
 def split_text_by_dot(text, max_length=3000):
     """
-    Divide el texto en fragmentos de hasta max_length caracteres, cortando siempre en el punto final más cercano.
+    Divide el texto en fragmentos de hasta max_length caracteres.
+    Se mantiene por compatibilidad: delega en text_chunker.split_text, que corta en fin de
+    oración (. ! ? …), luego en cláusulas y espacios, en tiempo lineal.
     """
-    fragments = []
-    while len(text) > max_length:
-        # Buscar el último punto antes del límite
-        split_pos = text.rfind('.', 0, max_length)
-        if split_pos == -1:
-            # Si no hay punto, cortar en el límite
-            split_pos = max_length
-        else:
-            split_pos += 1  # Incluir el punto
-        fragments.append(text[:split_pos].strip())
-        text = text[split_pos:].lstrip()
-    if text:
-        fragments.append(text.strip())
-    return fragments
+    return split_text(text, max_length)
 
 def clamp_speed(speed: float | None) -> float:
     """Normaliza la velocidad pedida por la UI."""
@@ -42,13 +37,17 @@ def clamp_speed(speed: float | None) -> float:
         return 1.0
     return max(0.6, min(1.6, float(speed)))
 
-def speed_to_piper_length(base_length_scale: str | float, speed: float) -> str:
-    """
-    Piper usa length_scale inverso a la intuición del usuario:
-    mayor length_scale = habla más lenta.
-    """
-    adjusted = float(base_length_scale) / clamp_speed(speed)
-    return f"{adjusted:.2f}"
+def parse_speed(value) -> float:
+    """Velocidad recibida en una petición; ValueError (con el mensaje para el cliente) si no es un número."""
+    if value is None:
+        return 1.0
+    try:
+        speed = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'La velocidad debe ser un número: {value!r}') from None
+    if not math.isfinite(speed):
+        raise ValueError(f'La velocidad debe ser un número: {value!r}')
+    return speed
 
 def get_ffmpeg_bin():
     """Resuelve la ruta de ffmpeg desde .env, una copia local o el PATH."""
@@ -64,121 +63,30 @@ def is_azure_tts_configured():
     """Indica si Azure Speech está configurado para síntesis."""
     return bool(os.getenv('AZURE_SPEECH_KEY') and os.getenv('AZURE_SPEECH_REGION'))
 
-def get_google_tts_credentials():
-    """Carga credenciales de Google Cloud desde archivo o variable inline."""
-    credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-    credentials_json = os.getenv('GOOGLE_CLOUD_TTS_CREDENTIALS_JSON')
-    scopes = ['https://www.googleapis.com/auth/cloud-platform']
-
-    if credentials_path and os.path.isfile(credentials_path):
-        return service_account.Credentials.from_service_account_file(credentials_path, scopes=scopes)
-
-    if credentials_json:
-        info = json.loads(credentials_json)
-        return service_account.Credentials.from_service_account_info(info, scopes=scopes)
-
-    return None
-
 def is_google_tts_configured():
-    """Indica si Google Cloud Text-to-Speech está configurado."""
-    return get_google_tts_credentials() is not None
+    """
+    Indica si Google Cloud Text-to-Speech está configurado. Solo revisa el entorno
+    para no cargar google-auth: las credenciales se leen al preparar la síntesis.
+    """
+    credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+    return bool((credentials_path and os.path.isfile(credentials_path)) or os.getenv('GOOGLE_CLOUD_TTS_CREDENTIALS_JSON'))
 
-def get_tts_capabilities():
-    """Expone capacidades de proveedores para que el frontend tome decisiones."""
+def get_tts_capabilities(local_voices=None):
+    """
+    Expone capacidades de proveedores para que el frontend tome decisiones.
+    local_voices permite reutilizar una lista de voces locales ya obtenida (ver voice_catalog).
+    """
     return {
         'azureConfigured': is_azure_tts_configured(),
         'googleConfigured': is_google_tts_configured(),
+        'edgeConfigured': is_edge_tts_enabled(),
         'piperConfigured': True,
-        'localVoices': list_windows_voices(),
+        'localVoices': list_windows_voices() if local_voices is None else local_voices,
     }
 
-def ensure_piper_voice(voice_code: str):
-    """Descarga la voz Piper si no existe en backend/models."""
-    models_dir = Path(os.path.join(os.path.dirname(__file__), 'models'))
-    models_dir.mkdir(parents=True, exist_ok=True)
-    model_path = models_dir / f'{voice_code}.onnx'
-    config_path = models_dir / f'{voice_code}.onnx.json'
-    if not model_path.exists() or not config_path.exists():
-        download_voice(voice_code, models_dir)
-    return model_path, config_path
-
-def map_voice_to_piper(voice: str):
-    """
-    Mapea opciones de UI a voces offline reales de Piper.
-    """
-    mapping = {
-        'piper:es_MX-claude-high': {
-            'voice_code': 'es_MX-claude-high',
-            'speaker': '0',
-            'display_voice': 'es_MX-claude-high',
-            'length_scale': '1.24',
-        },
-        'piper:es_MX-ald-medium': {
-            'voice_code': 'es_MX-ald-medium',
-            'speaker': '0',
-            'display_voice': 'es_MX-ald-medium',
-            'length_scale': '1.22',
-        },
-        'piper:es_AR-daniela-high': {
-            'voice_code': 'es_AR-daniela-high',
-            'speaker': '0',
-            'display_voice': 'es_AR-daniela-high',
-            'length_scale': '1.20',
-        },
-        'piper:es_ES-carlfm-x_low': {
-            'voice_code': 'es_ES-carlfm-x_low',
-            'speaker': '0',
-            'display_voice': 'es_ES-carlfm-x_low',
-            'length_scale': '1.18',
-        },
-        'piper:es_ES-davefx-medium': {
-            'voice_code': 'es_ES-davefx-medium',
-            'speaker': '0',
-            'display_voice': 'es_ES-davefx-medium',
-            'length_scale': '1.18',
-        },
-        'piper:es_ES-mls_10246-low': {
-            'voice_code': 'es_ES-mls_10246-low',
-            'speaker': '0',
-            'display_voice': 'es_ES-mls_10246-low',
-            'length_scale': '1.18',
-        },
-        'piper:es_ES-mls_9972-low': {
-            'voice_code': 'es_ES-mls_9972-low',
-            'speaker': '0',
-            'display_voice': 'es_ES-mls_9972-low',
-            'length_scale': '1.18',
-        },
-        'piper:es_ES-sharvard-medium:M': {
-            'voice_code': 'es_ES-sharvard-medium',
-            'speaker': '0',
-            'display_voice': 'es_ES-sharvard-medium speaker M',
-            'length_scale': '1.22',
-        },
-        'piper:es_ES-sharvard-medium:F': {
-            'voice_code': 'es_ES-sharvard-medium',
-            'speaker': '1',
-            'display_voice': 'es_ES-sharvard-medium speaker F',
-            'length_scale': '1.20',
-        },
-    }
-    return mapping.get(voice)
-
-def map_voice_to_google_tts(voice: str):
-    """Mapea voces chilenas a equivalentes disponibles en Google Cloud TTS."""
-    mapping = {
-        'es-CL-CatalinaNeural': {
-            'languageCode': 'es-US',
-            'name': 'es-US-Neural2-A',
-            'ssmlGender': 'FEMALE',
-        },
-        'es-CL-LorenzoNeural': {
-            'languageCode': 'es-US',
-            'name': 'es-US-Neural2-B',
-            'ssmlGender': 'MALE',
-        },
-    }
-    return mapping.get(voice)
+def get_audio_cache_stats():
+    """Contadores globales de la caché de audio por fragmento."""
+    return get_audio_cache().stats()
 
 def merge_mp3_files(temp_files, output_file):
     """Une varios MP3 sin recodificarlos usando ffmpeg concat."""
@@ -200,230 +108,403 @@ def merge_mp3_files(temp_files, output_file):
             get_ffmpeg_bin(), '-y', '-f', 'concat', '-safe', '0',
             '-i', concat_file, '-c', 'copy', output_file
         ]
-        subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with span('ffmpeg_merge'):
+            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     except Exception as e:
         raise RuntimeError(f"No se pudo unir el audio final con ffmpeg: {e}") from e
     finally:
         if os.path.exists(concat_file):
             os.remove(concat_file)
 
-def text_to_speech_azure(full_text: str, output_file: str, voice: str, speed: float = 1.0):
-    """Proveedor de producción via Azure Speech REST API."""
-    speech_key = os.getenv('AZURE_SPEECH_KEY')
-    speech_region = os.getenv('AZURE_SPEECH_REGION')
-    if not speech_key or not speech_region:
-        raise RuntimeError('Azure Speech no está configurado. Faltan AZURE_SPEECH_KEY o AZURE_SPEECH_REGION')
-
-    fragments = split_text_by_dot(full_text, max_length=2500)
-    temp_files = []
-    endpoint = f"https://{speech_region}.tts.speech.microsoft.com/cognitiveservices/v1"
-
-    try:
-        print(f"[azure] Generando audio con Azure Speech usando la voz: {voice}")
-        for idx, fragment in enumerate(fragments):
-            fragment = fragment.strip()
-            if not fragment:
-                continue
+# --- Caché de audio por fragmento (compartida por todos los proveedores) ---
 
-            ssml = (
-                "<speak version='1.0' xml:lang='es-CL'>"
-                f"<voice name='{voice}'>"
-                f"<prosody rate='{((clamp_speed(speed) - 1.0) * 100):+.0f}%'>{escape(fragment)}</prosody>"
-                "</voice></speak>"
-            )
+_audio_cache = None
 
-            response = requests.post(
-                endpoint,
-                headers={
-                    'Ocp-Apim-Subscription-Key': speech_key,
-                    'Content-Type': 'application/ssml+xml',
-                    'X-Microsoft-OutputFormat': 'audio-24khz-96kbitrate-mono-mp3',
-                    'User-Agent': 'pdf-a-audio',
-                },
-                data=ssml.encode('utf-8'),
-                timeout=60,
-            )
-            response.raise_for_status()
+def is_audio_cache_enabled():
+    return os.getenv('AUDIO_CACHE_ENABLED', '1') != '0'
 
-            temp_fd, temp_path = tempfile.mkstemp(suffix=f"_azure_{idx}.mp3")
-            os.close(temp_fd)
-            with open(temp_path, 'wb') as f:
-                f.write(response.content)
-            temp_files.append(temp_path)
-            print(f"  Fragmento Azure {idx+1}/{len(fragments)} generado.")
+def get_audio_cache():
+    """Caché en disco de MP3 por fragmento, con presupuesto de bytes y expulsión LRU."""
+    global _audio_cache
+    if _audio_cache is None:
+        directory = os.getenv('AUDIO_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'audio_fragments')
+        try:
+            max_bytes = int(os.getenv('AUDIO_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+        except ValueError:
+            max_bytes = 1024 * 1024 * 1024
+        _audio_cache = DiskLRUCache(directory, max_bytes, suffix='.mp3')
+    return _audio_cache
+
+def normalize_fragment_text(fragment: str) -> str:
+    """Normaliza espacios para que el mismo texto comparta entrada de caché."""
+    return re.sub(r'\s+', ' ', fragment).strip()
+
+def audio_cache_key(provider: str, voice: str, speed: float, fragment: str) -> str:
+    """Clave de caché: (proveedor, voz, velocidad, texto normalizado del fragmento)."""
+    return hash_key('tts-fragment', provider, voice, f"{clamp_speed(speed):.2f}", normalize_fragment_text(fragment))
+
+def finish_cache_stats(stats: dict) -> dict:
+    stats['hitRatio'] = round(stats['hits'] / stats['fragments'], 4) if stats['fragments'] else 0.0
+    if stats['hits']:
+        print(f"[cache] {stats['hits']}/{stats['fragments']} fragmentos reutilizados ({stats['bytesSaved']} bytes).")
+    return stats
+
+def account_fragment(provider, label, position, audio, from_cache, stats, total, on_fragment):
+    """Registra un fragmento entregado (métricas, contadores de caché y progreso)."""
+    FRAGMENTS.inc(provider=provider, source='cache' if from_cache else 'synth')
+    AUDIO_BYTES.inc(len(audio), provider=provider)
+    stats['fragments'] += 1
+    if from_cache:
+        stats['hits'] += 1
+        stats['bytesSaved'] += len(audio)
+    else:
+        stats['misses'] += 1
+    print(f"  Fragmento {label} {position} {'obtenido desde caché' if from_cache else 'generado'}.")
+    if on_fragment is not None:
+        on_fragment(stats['fragments'], total)
+
+def iter_synthesized_fragments(provider: str, label: str, fragments, voice: str, speed: float, synthesize_fragment, stats: dict, max_in_flight: int = 1, on_fragment=None):
+    """
+    Genera (idx, audio) en el orden de los fragmentos, consultando antes la caché de audio.
+    `synthesize_fragment(idx, fragment)` debe devolver los bytes de audio del fragmento
+    (MP3 para proveedores en la nube, PCM para Piper); `provider` es el espacio de claves de caché.
+    Con max_in_flight > 1 se mantiene una ventana de hasta max_in_flight fragmentos en curso,
+    así la memoria queda acotada aunque las respuestas lleguen desordenadas.
+    Los contadores de caché se acumulan en `stats`; on_fragment(listos, total) reporta el progreso.
+    Cada fragmento sintetizado se registra en las métricas del proveedor (latencia, origen y bytes).
+    `fragments` también puede ser un iterador (ver pipeline.pdf_to_audio): se consume a medida
+    que se libera lugar en la ventana y el total se informa como None.
+    """
+    started = time.perf_counter()
+    cache = get_audio_cache() if is_audio_cache_enabled() else None
+    stats.update({'fragments': 0, 'hits': 0, 'misses': 0, 'bytesSaved': 0})
+    if isinstance(fragments, (list, tuple)):
+        items = [(idx, fragment.strip()) for idx, fragment in enumerate(fragments) if fragment.strip()]
+        total, of_total = len(items), f"/{len(fragments)}"
+    else:
+        items = ((idx, fragment.strip()) for idx, fragment in enumerate(fragments) if fragment.strip())
+        total, of_total = None, ''
+
+    def load(idx, fragment):
+        key = audio_cache_key(provider, voice, speed, fragment)
+        audio = cache.get(key) if cache is not None else None
+        if audio is not None:
+            return audio, True
+        start = time.perf_counter()
+        try:
+            audio = synthesize_fragment(idx, fragment)
+        except Exception:
+            FRAGMENTS.inc(provider=provider, source='error')
+            raise
+        TTS_FRAGMENT_SECONDS.observe(time.perf_counter() - start, provider=provider)
+        # El audio de un respaldo ya quedó en la caché con la clave de su proveedor
+        if cache is not None and not isinstance(audio, FallbackAudio):
+            cache.set(key, audio)
+        return audio, False
+
+    def account(idx, audio, from_cache):
+        account_fragment(provider, label, f"{idx+1}{of_total}", audio, from_cache, stats, total, on_fragment)
+
+    if max_in_flight <= 1 or (total is not None and total <= 1):
+        for idx, fragment in items:
+            audio, from_cache = load(idx, fragment)
+            account(idx, audio, from_cache)
+            yield idx, audio
+        TTS_SYNTHESIS_SECONDS.observe(time.perf_counter() - started, provider=provider)
+        finish_cache_stats(stats)
+        return
 
-        merge_mp3_files(temp_files, output_file)
-        print(f"\nAudio completo guardado en: {output_file}")
-        return {
-            'provider': 'azure-speech',
-            'voice_requested': voice,
-            'voice_used': voice,
-        }
-    except requests.HTTPError as e:
-        body = ''
-        if e.response is not None:
-            try:
-                body = e.response.text.strip()
-            except Exception:
-                body = ''
-        detail = body or str(e)
-        raise RuntimeError(f'Azure Speech devolvió error HTTP: {detail}') from e
-    except Exception as e:
-        raise RuntimeError(f'Fallo Azure Speech: {e}') from e
+    executor = ThreadPoolExecutor(max_workers=max_in_flight if total is None else min(max_in_flight, total))
+    pending_items = iter(items)
+    window = deque()
+    try:
+        for idx, fragment in itertools.islice(pending_items, max_in_flight):
+            window.append((idx, executor.submit(load, idx, fragment)))
+        while window:
+            idx, future = window.popleft()
+            audio, from_cache = future.result()
+            next_item = next(pending_items, None)
+            if next_item is not None:
+                window.append((next_item[0], executor.submit(load, *next_item)))
+            account(idx, audio, from_cache)
+            yield idx, audio
     finally:
-        for temp_path in temp_files:
-            try:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except Exception:
-                pass
+        # Ante un error (o si el consumidor se detiene) no se lanzan más fragmentos
+        executor.shutdown(wait=True, cancel_futures=True)
+    TTS_SYNTHESIS_SECONDS.observe(time.perf_counter() - started, provider=provider)
+    finish_cache_stats(stats)
 
-def text_to_speech_google_cloud(full_text: str, output_file: str, voice: str, speed: float = 1.0):
-    """Proveedor oficial Google Cloud Text-to-Speech via REST."""
-    credentials = get_google_tts_credentials()
-    if credentials is None:
-        raise RuntimeError('Google Cloud TTS no está configurado. Falta GOOGLE_APPLICATION_CREDENTIALS o GOOGLE_CLOUD_TTS_CREDENTIALS_JSON')
-
-    google_voice = map_voice_to_google_tts(voice)
-    if google_voice is None:
-        raise RuntimeError(f'No existe mapeo de Google Cloud TTS para la voz solicitada: {voice}')
-
-    fragments = split_text_by_dot(full_text, max_length=2500)
-    temp_files = []
-    credentials.refresh(Request())
-    access_token = credentials.token
+def synthesize_fragments(provider: str, label: str, fragments, voice: str, speed: float, synthesize_fragment, temp_files: list, max_in_flight: int = 1, on_fragment=None):
+    """
+    Sintetiza los fragmentos (ver iter_synthesized_fragments) y escribe cada MP3 en un archivo
+    temporal. Las rutas se agregan a `temp_files` en orden (el llamador las elimina).
+    Devuelve los contadores de caché de esta síntesis.
+    """
+    stats = {}
+    for idx, audio in iter_synthesized_fragments(provider, label, fragments, voice, speed, synthesize_fragment, stats, max_in_flight, on_fragment):
+        temp_fd, temp_path = tempfile.mkstemp(suffix=f"_{provider}_{idx}.mp3")
+        temp_files.append(temp_path)
+        with os.fdopen(temp_fd, 'wb') as f:
+            f.write(audio)
+    return stats
+
+# --- Proveedores registrados (en orden de prioridad) ---
+
+def is_edge_tts_enabled():
+    """edge-tts no requiere credenciales; EDGE_TTS_ENABLED=0 lo deshabilita (p. ej. sin internet)."""
+    return os.getenv('EDGE_TTS_ENABLED', '1') != '0'
+
+# expected_latency: segundos por 1000 caracteres supuestos antes de tener mediciones
+register_provider(ProviderSpec(
+    'azure', 'tts_azure', 'prepare_azure_synthesis',
+    is_configured=is_azure_tts_configured, audio_format='mp3', label='Azure', expected_latency=0.4,
+))
+register_provider(ProviderSpec(
+    'google', 'tts_google', 'prepare_google_cloud_synthesis',
+    is_configured=is_google_tts_configured, audio_format='mp3', label='Google Cloud', expected_latency=0.5,
+))
+register_provider(ProviderSpec(
+    'edge', 'tts_edge', 'prepare_edge_synthesis',
+    is_configured=is_edge_tts_enabled, audio_format='mp3', label='edge-tts', expected_latency=0.8,
+))
+# Piper es offline: siempre disponible como último recurso
+register_provider(ProviderSpec(
+    'piper', 'tts_piper', 'prepare_piper_synthesis',
+    is_configured=lambda: True, audio_format='pcm', label='Piper', expected_latency=1.5,
+))
+
+class FallbackAudio(bytes):
+    """
+    Audio de un fragmento sintetizado por un proveedor de respaldo. Se guarda en la caché
+    con la clave de ese proveedor, no con la del principal (ver iter_synthesized_fragments).
+    """
 
-    try:
-        print(f"[google-cloud] Generando audio con Google Cloud TTS para la voz solicitada: {voice}")
-        for idx, fragment in enumerate(fragments):
-            fragment = fragment.strip()
-            if not fragment:
+def _prepare_failover_plan(primary, plan, fallbacks, voice, speed):
+    """
+    Envuelve el plan del proveedor principal con failover por fragmento: si el circuito
+    del principal está abierto o el fragmento falla, se prueba con cada respaldo (del mismo
+    formato de audio) en orden. Los planes de respaldo se preparan recién al necesitarlos.
+    Cada intento actualiza la salud del proveedor (latencia o fallo).
+    """
+    chain = [primary] + fallbacks
+    cache = get_audio_cache() if is_audio_cache_enabled() else None
+    prepared = {primary.name: plan}
+    prepare_lock = threading.Lock()
+    failover_counts = {}
+
+    def plan_for(spec):
+        with prepare_lock:
+            if spec.name not in prepared:
+                try:
+                    prepared[spec.name] = spec.prepare(voice, speed)
+                except UnsupportedVoiceError:
+                    prepared[spec.name] = None
+                except Exception as e:
+                    spec.health.record_failure()
+                    print(f"[failover] No se pudo preparar {spec.label}: {e}")
+                    prepared[spec.name] = None
+            return prepared[spec.name]
+
+    def count_failover(spec):
+        TTS_FAILOVERS.inc(from_provider=primary.name, to_provider=spec.name)
+        with prepare_lock:
+            failover_counts[spec.name] = failover_counts.get(spec.name, 0) + 1
+
+    def synthesize_fragment(idx, fragment):
+        errors = []
+        for spec in chain:
+            current = plan_for(spec)
+            if current is None:
                 continue
-
-            response = requests.post(
-                'https://texttospeech.googleapis.com/v1/text:synthesize',
-                headers={
-                    'Authorization': f'Bearer {access_token}',
-                    'Content-Type': 'application/json; charset=utf-8',
-                },
-                json={
-                    'input': {'text': fragment},
-                    'voice': google_voice,
-                    'audioConfig': {
-                        'audioEncoding': 'MP3',
-                        'speakingRate': clamp_speed(speed),
-                    },
-                },
-                timeout=60,
-            )
-            response.raise_for_status()
-            payload = response.json()
-            audio_content = payload.get('audioContent')
-            if not audio_content:
-                raise RuntimeError('Google Cloud TTS no devolvió audioContent')
-
-            temp_fd, temp_path = tempfile.mkstemp(suffix=f"_google_{idx}.mp3")
-            os.close(temp_fd)
-            with open(temp_path, 'wb') as f:
-                f.write(base64.b64decode(audio_content))
-            temp_files.append(temp_path)
-            print(f"  Fragmento Google Cloud {idx+1}/{len(fragments)} generado.")
-
-        merge_mp3_files(temp_files, output_file)
-        print(f"\nAudio completo guardado en: {output_file}")
-        return {
-            'provider': 'google-cloud-tts',
-            'voice_requested': voice,
-            'voice_used': google_voice['name'],
-        }
-    except requests.HTTPError as e:
-        body = ''
-        if e.response is not None:
+            if spec is not primary and cache is not None:
+                key = audio_cache_key(current['cache_namespace'], voice, speed, fragment)
+                cached = cache.get(key)
+                if cached is not None:
+                    return FallbackAudio(cached)
+            if not spec.health.allow():
+                errors.append(f"{spec.label}: circuito abierto")
+                continue
+            start = time.perf_counter()
             try:
-                body = e.response.text.strip()
-            except Exception:
-                body = ''
-        detail = body or str(e)
-        raise RuntimeError(f'Google Cloud TTS devolvió error HTTP: {detail}') from e
-    except Exception as e:
-        raise RuntimeError(f'Fallo Google Cloud TTS: {e}') from e
-    finally:
-        for temp_path in temp_files:
+                audio = current['synthesize_fragment'](idx, fragment)
+            except Exception as e:
+                spec.health.record_failure()
+                FRAGMENTS.inc(provider=current['cache_namespace'], source='error')
+                errors.append(f"{spec.label}: {e}")
+                print(f"  [failover] Fragmento {idx+1}: {spec.label} falló ({e})")
+                continue
+            spec.health.record_success(time.perf_counter() - start, len(fragment))
+            if spec is primary:
+                return audio
+            count_failover(spec)
+            if cache is not None:
+                cache.set(key, audio)
+            return FallbackAudio(audio)
+        raise RuntimeError(f"Ningún proveedor pudo sintetizar el fragmento {idx+1}: {'; '.join(errors)}")
+
+    async def synthesize_fragment_async(idx, fragment):
+        """
+        Igual que synthesize_fragment para el camino asíncrono (tts_async): usa la versión
+        async del proveedor si la tiene y lleva a hilos la preparación y la caché en disco.
+        """
+        errors = []
+        for spec in chain:
+            current = prepared[spec.name] if spec.name in prepared else await asyncio.to_thread(plan_for, spec)
+            if current is None:
+                continue
+            if spec is not primary and cache is not None:
+                key = audio_cache_key(current['cache_namespace'], voice, speed, fragment)
+                cached = await asyncio.to_thread(cache.get, key)
+                if cached is not None:
+                    return FallbackAudio(cached)
+            if not spec.health.allow():
+                errors.append(f"{spec.label}: circuito abierto")
+                continue
+            start = time.perf_counter()
             try:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except Exception:
-                pass
-
-def text_to_speech_piper(full_text: str, output_file: str, voice: str, speed: float = 1.0):
-    """Proveedor offline usando Piper TTS y ffmpeg para MP3."""
-    piper_voice = map_voice_to_piper(voice)
-    if piper_voice is None:
-        raise RuntimeError(f'No existe mapeo Piper para la voz solicitada: {voice}')
+                if current.get('synthesize_fragment_async'):
+                    audio = await current['synthesize_fragment_async'](idx, fragment)
+                else:
+                    audio = await asyncio.to_thread(current['synthesize_fragment'], idx, fragment)
+            except Exception as e:
+                spec.health.record_failure()
+                FRAGMENTS.inc(provider=current['cache_namespace'], source='error')
+                errors.append(f"{spec.label}: {e}")
+                print(f"  [failover] Fragmento {idx+1}: {spec.label} falló ({e})")
+                continue
+            spec.health.record_success(time.perf_counter() - start, len(fragment))
+            if spec is primary:
+                return audio
+            count_failover(spec)
+            if cache is not None:
+                await asyncio.to_thread(cache.set, key, audio)
+            return FallbackAudio(audio)
+        raise RuntimeError(f"Ningún proveedor pudo sintetizar el fragmento {idx+1}: {'; '.join(errors)}")
+
+    return dict(
+        plan,
+        # Fragmentos que entren en cualquier proveedor de la cadena
+        max_length=min(provider_max_length(spec.name) for spec in chain),
+        synthesize_fragment=synthesize_fragment,
+        synthesize_fragment_async=synthesize_fragment_async,
+        fallbacks=[spec.name for spec in fallbacks],
+        failover=failover_counts,
+    )
+
+def prepare_synthesis(voice: str, speed: float = 1.0):
+    """
+    Plan de síntesis con el mejor proveedor según la salud observada (ver
+    tts_providers.rank_providers) y failover por fragmento hacia los siguientes del mismo
+    formato de audio. Si la preparación del principal falla (credenciales, descarga de la
+    voz...) se pasa al siguiente; los que no tienen la voz pedida se omiten.
+    """
+    ranked = rank_providers()
+    errors = []
+    for i, spec in enumerate(ranked):
+        try:
+            plan = spec.prepare(voice, speed)
+        except UnsupportedVoiceError as e:
+            errors.append(str(e))
+            continue
+        except Exception as e:
+            spec.health.record_failure()
+            errors.append(f"{spec.label}: {e}")
+            print(f"[failover] No se pudo preparar {spec.label}: {e}")
+            continue
+        fallbacks = [other for other in ranked[i + 1:] if other.audio_format == spec.audio_format]
+        return _prepare_failover_plan(spec, plan, fallbacks, voice, speed)
+    raise RuntimeError(f"Ningún proveedor de síntesis disponible para la voz {voice}: {'; '.join(errors)}")
 
-    model_path, _ = ensure_piper_voice(piper_voice['voice_code'])
-    fragments = split_text_by_dot(full_text, max_length=1800)
-    temp_files = []
+def synthesize_text_to_file(full_text: str, output_file: str, voice: str, speed: float = 1.0, on_fragment=None):
+    """
+    Sintetiza un texto completo a un MP3 con el plan de prepare_synthesis.
+    Los proveedores MP3 escriben un archivo por fragmento y se unen con ffmpeg concat;
+    el PCM de Piper va a un único codificador MP3 (Mp3EncoderSink).
+    """
+    plan = prepare_synthesis(voice, speed)
+    return _synthesize_plan_to_file(plan, split_text(full_text, plan['max_length']), output_file, voice, speed, on_fragment)
 
-    try:
-        print(f"[piper] Generando audio offline con Piper para la voz solicitada: {voice}")
-        for idx, fragment in enumerate(fragments):
-            fragment = fragment.strip()
-            if not fragment:
-                continue
+def synthesize_blocks_to_file(blocks, output_file: str, voice: str, speed: float = 1.0, on_fragment=None):
+    """
+    Como synthesize_text_to_file, pero el texto llega por partes (p. ej. oraciones del OCR):
+    cada fragmento se sintetiza apenas se completa (ver text_chunker.iter_stream_chunks),
+    mientras las partes siguientes todavía se están generando.
+    """
+    plan = prepare_synthesis(voice, speed)
+    return _synthesize_plan_to_file(plan, iter_stream_chunks(blocks, plan['max_length']), output_file, voice, speed, on_fragment)
 
-            temp_txt = tempfile.mktemp(suffix=f'_piper_{idx}.txt')
-            temp_wav = tempfile.mktemp(suffix=f'_piper_{idx}.wav')
-            temp_mp3 = tempfile.mktemp(suffix=f'_piper_{idx}.mp3')
-
-            with open(temp_txt, 'w', encoding='utf-8') as f:
-                f.write(fragment)
-
-            piper_cmd = [
-                os.path.join(os.path.dirname(__file__), 'env', 'Scripts', 'piper.exe')
-                if os.path.exists(os.path.join(os.path.dirname(__file__), 'env', 'Scripts', 'piper.exe'))
-                else 'piper',
-                '--model', str(model_path),
-                '--input_file', temp_txt,
-                '--output_file', temp_wav,
-                '--speaker', piper_voice['speaker'],
-                '--length_scale', speed_to_piper_length(piper_voice['length_scale'], speed),
-                '--data-dir', str(model_path.parent),
-            ]
-            subprocess.run(piper_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-            ffmpeg_cmd = [
-                get_ffmpeg_bin(), '-y', '-i', temp_wav,
-                '-codec:a', 'libmp3lame', '-q:a', '2', temp_mp3
-            ]
-            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            temp_files.append(temp_mp3)
+def _synthesize_plan_to_file(plan, fragments, output_file, voice, speed, on_fragment):
+    cache_stats = {}
+    print(f"[{plan['cache_namespace']}] Generando audio con {plan['label']} para la voz solicitada: {voice}")
 
-            for temp_path in [temp_txt, temp_wav]:
+    if plan['audio_format'] == 'pcm':
+        try:
+            with Mp3EncoderSink(get_ffmpeg_bin(), output_file, plan['sample_rate']) as sink:
+                for _, pcm in iter_synthesized_fragments(
+                    plan['cache_namespace'], plan['label'], fragments, voice, speed,
+                    plan['synthesize_fragment'], cache_stats, on_fragment=on_fragment,
+                ):
+                    sink.write(pcm)
+                if sink.bytes_written == 0:
+                    raise RuntimeError('No hay fragmentos de audio para codificar')
+        except Exception:
+            if os.path.exists(output_file):
+                try:
+                    os.remove(output_file)
+                except OSError:
+                    pass
+            raise
+    else:
+        temp_files = []
+        try:
+            cache_stats = synthesize_fragments(
+                plan['cache_namespace'], plan['label'], fragments, voice, speed, plan['synthesize_fragment'], temp_files,
+                max_in_flight=plan['max_in_flight'], on_fragment=on_fragment,
+            )
+            merge_mp3_files(temp_files, output_file)
+        finally:
+            for temp_path in temp_files:
                 try:
                     if os.path.exists(temp_path):
                         os.remove(temp_path)
                 except Exception:
                     pass
 
-            print(f"  Fragmento Piper {idx+1}/{len(fragments)} generado.")
+    print(f"\nAudio completo guardado en: {output_file}")
+    if plan['failover']:
+        print(f"[failover] Fragmentos sintetizados por respaldo: {plan['failover']}")
+    return {
+        'provider': plan['provider'],
+        'voice_requested': voice,
+        'voice_used': plan['voice_used'],
+        'cache': cache_stats,
+        'failover': plan['failover'],
+    }
 
-        merge_mp3_files(temp_files, output_file)
-        print(f"\nAudio completo guardado en: {output_file}")
-        return {
-            'provider': 'piper-offline',
-            'voice_requested': voice,
-            'voice_used': piper_voice['display_voice'],
-        }
-    except Exception as e:
-        raise RuntimeError(f'Fallo Piper offline: {e}') from e
-    finally:
-        for temp_path in temp_files:
-            try:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except Exception:
-                pass
+def iter_text_to_speech_mp3(full_text: str, voice: str, speed: float = 1.0, on_fragment=None):
+    """
+    Síntesis progresiva: devuelve (info, chunks), donde chunks genera bytes MP3 a medida que
+    cada fragmento queda sintetizado, para empezar a reproducir antes de terminar el documento.
+    info['cache'] se completa cuando el generador termina.
+    """
+    plan = prepare_synthesis(voice, speed)
+    fragments = split_text(full_text, plan['max_length'])
+    cache_stats = {}
+    info = {
+        'provider': plan['provider'],
+        'voice_requested': voice,
+        'voice_used': plan['voice_used'],
+        'cache': cache_stats,
+        'failover': plan['failover'],
+    }
+    audio = (chunk for _, chunk in iter_synthesized_fragments(
+        plan['cache_namespace'], plan['label'], fragments, voice, speed,
+        plan['synthesize_fragment'], cache_stats, plan['max_in_flight'], on_fragment,
+    ))
+    if plan['audio_format'] == 'pcm':
+        # Piper entrega PCM: se codifica en streaming con un único ffmpeg
+        audio = iter_encoded_mp3(get_ffmpeg_bin(), audio, plan['sample_rate'])
+    return info, audio
 
 
 def voice_to_locale_prefix(voice: str) -> str:
@@ -435,7 +516,9 @@ def voice_to_locale_prefix(voice: str) -> str:
     return 'es-ES'
 
 def list_windows_voices():
-    """Lista voces locales disponibles via System.Speech."""
+    """Lista voces locales disponibles via System.Speech (lista vacía fuera de Windows)."""
+    if platform.system() != 'Windows':
+        return []
     script = r"""
 Add-Type -AssemblyName System.Speech
 $synth = New-Object System.Speech.Synthesis.SpeechSynthesizer
@@ -466,8 +549,8 @@ $synth.Dispose()
         })
     return voices
 
-def text_to_speech_windows(full_text: str, output_file: str, voice: str, speed: float = 1.0):
-    """Fallback local usando System.Speech en Windows y ffmpeg para MP3."""
+def text_to_speech_windows(full_text: str, output_file: str, voice: str, speed: float = 1.0, on_fragment=None):
+    """Fallback local usando System.Speech en Windows y el mismo codificador MP3 que Piper."""
     locale = voice_to_locale_prefix(voice)
     lang_prefix = locale.split('-')[0]
     temp_text_path = tempfile.mktemp(suffix="_tts_input.txt")
@@ -527,11 +610,11 @@ Write-Output ("VOICE_CULTURE=" + $selectedVoice.Culture.Name)
         if not os.path.exists(temp_wav_path) or os.path.getsize(temp_wav_path) == 0:
             raise RuntimeError('System.Speech no generó un WAV válido')
 
-        ffmpeg_cmd = [
-            get_ffmpeg_bin(), '-y', '-i', temp_wav_path,
-            '-codec:a', 'libmp3lame', '-q:a', '2', output_file
-        ]
-        subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        sample_rate, channels = read_wav_format(temp_wav_path)
+        with Mp3EncoderSink(get_ffmpeg_bin(), output_file, sample_rate, channels=channels) as sink:
+            sink.write_wav(temp_wav_path)
+        if on_fragment is not None:
+            on_fragment(1, 1)
 
         voice_name = None
         voice_culture = None
@@ -562,14 +645,18 @@ Write-Output ("VOICE_CULTURE=" + $selectedVoice.Culture.Name)
             except Exception:
                 pass
 
-async def text_to_speech(text_file: str, output_file: str, voice: str, speed: float = 1.0):
+def _read_text_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+async def text_to_speech(text_file: str, output_file: str, voice: str, speed: float = 1.0, on_fragment=None):
     """
-    Convierte un archivo de texto a MP3 usando Azure Speech si está configurado,
-    luego edge-tts y finalmente fallback local de Windows si existe voz compatible.
+    Convierte un archivo de texto a MP3 con el proveedor más sano entre los configurados
+    (Azure, Google Cloud, edge-tts y Piper offline), con failover por fragmento.
+    on_fragment(listos, total) se llama cada vez que un fragmento queda sintetizado.
     """
     # 1. Leer el texto completo del archivo
-    with open(text_file, 'r', encoding='utf-8') as f:
-        full_text = f.read()
+    full_text = await asyncio.to_thread(_read_text_file, text_file)
 
     if not full_text.strip():
         print("El archivo de texto está vacío. No se generará audio.")
@@ -579,69 +666,9 @@ async def text_to_speech(text_file: str, output_file: str, voice: str, speed: fl
             'voice_used': None,
         }
 
-    fragments = split_text_by_dot(full_text, max_length=3000)
-    temp_files = []
-
-    def limpiar_texto(texto):
-        # Elimina caracteres no imprimibles y espacios redundantes
-        import re
-        texto = re.sub(r'[^\x20-\x7E\n\ráéíóúÁÉÍÓÚñÑüÜ.,;:!\?"\'\-\(\)\[\]{}]', '', texto)
-        texto = re.sub(r'\s+', ' ', texto)
-        return texto.strip()
-
-    async def procesar_fragmento(fragment, idx, total, profundidad=0):
-        if not fragment.strip():
-            print(f"  Fragmento {idx+1}/{total} vacío tras limpieza. Deteniendo proceso.")
-            raise RuntimeError(f"Fragmento {idx+1} vacío tras limpieza.")
-        print(f"\nProcesando fragmento {idx+1}/{total} (longitud: {len(fragment)}):\n{fragment[:200]}{'...' if len(fragment) > 200 else ''}")
-        temp_fd, temp_path = tempfile.mkstemp(suffix=f"_{idx}_d{profundidad}.mp3")
-        os.close(temp_fd)
-        try:
-            communicate = edge_tts.Communicate(fragment, voice)
-            await asyncio.wait_for(communicate.save(temp_path), timeout=60)
-            print(f"  Fragmento {idx+1}/{total} generado.")
-            return [temp_path]
-        except Exception as e:
-            print(f"[error] Error en fragmento {idx+1} (profundidad {profundidad}): {e}\nIntentando limpiar y reintentar...")
-            fragment_limpio = limpiar_texto(fragment)
-            if fragment_limpio != fragment:
-                try:
-                    communicate = edge_tts.Communicate(fragment_limpio, voice)
-                    await asyncio.wait_for(communicate.save(temp_path), timeout=60)
-                    print(f"  Fragmento {idx+1} generado tras limpieza.")
-                    return [temp_path]
-                except Exception as e2:
-                    print(f"[error] Error tras limpieza: {e2}")
-            # Si sigue fallando, subdividir si es suficientemente largo
-            if len(fragment) > 500 and profundidad < 2:
-                print(f"  Subdividiendo fragmento {idx+1} en partes más pequeñas...")
-                subfrags = []
-                sublen = max(200, len(fragment)//3)
-                for i in range(0, len(fragment), sublen):
-                    sub = fragment[i:i+sublen]
-                    try:
-                        subfrags.extend(await procesar_fragmento(sub, idx, total, profundidad+1))
-                    except Exception as sub_e:
-                        print(f"[error] Error en subfragmento de {idx+1}: {sub_e}")
-                        try: os.remove(temp_path)
-                        except: pass
-                        raise
-                # Eliminar archivo temporal fallido
-                try: os.remove(temp_path)
-                except: pass
-                return subfrags
-            print(f"  Fragmento {idx+1} no se pudo procesar tras todos los intentos. Deteniendo proceso.")
-            try: os.remove(temp_path)
-            except: pass
-            raise RuntimeError(f"Fragmento {idx+1} no se pudo procesar tras todos los intentos.")
-
-    if is_azure_tts_configured():
-        return text_to_speech_azure(full_text, output_file, voice, speed=speed)
-
-    if is_google_tts_configured():
-        return text_to_speech_google_cloud(full_text, output_file, voice, speed=speed)
-
-    return text_to_speech_piper(full_text, output_file, voice, speed=speed)
+    # Camino async nativo: los fragmentos se esperan en este event loop, sin un hilo por petición
+    from tts_async import synthesize_text_to_file_async
+    return await synthesize_text_to_file_async(full_text, output_file, voice, speed, on_fragment)
 
 # --- Ejecución Directa (para pruebas) ---
 if __name__ == "__main__":
@@ -653,4 +680,5 @@ if __name__ == "__main__":
     input_text_file = sys.argv[1]
     output_audio_file = sys.argv[2]
     selected_voice = sys.argv[3]
-    asyncio.run(text_to_speech(input_text_file, output_audio_file, selected_voice))
+    from tts_http import run_async
+    run_async(text_to_speech(input_text_file, output_audio_file, selected_voice))
@@ -0,0 +1,198 @@
+"""
+Camino asíncrono de síntesis: un documento completo sin ocupar un hilo por petición.
+
+Cada fragmento se pide con la versión async del proveedor (synthesize_fragment_async:
+aiohttp para Azure y Google, edge-tts nativo, subprocesos de asyncio para piper), con el
+mismo failover, caché y métricas que el camino con hilos. La caché en disco y los archivos
+temporales se leen y escriben en hilos (asyncio.to_thread) y ffmpeg corre como subproceso
+de asyncio. Lo usan async_app (servidor aiohttp) y text_to_speech.text_to_speech.
+"""
+import asyncio
+import itertools
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import deque
+from contextlib import aclosing
+
+from audio_sink import mp3_encoder_command
+from metrics import FRAGMENTS, TTS_FRAGMENT_SECONDS, TTS_SYNTHESIS_SECONDS, span
+from text_chunker import split_text
+from text_to_speech import (
+    FallbackAudio, account_fragment, audio_cache_key, finish_cache_stats, get_audio_cache, get_ffmpeg_bin,
+    is_audio_cache_enabled, prepare_synthesis,
+)
+
+
+async def iter_synthesized_fragments_async(provider, label, fragments, voice, speed, synthesize_fragment_async, stats, max_in_flight=1, on_fragment=None):
+    """
+    Versión async de text_to_speech.iter_synthesized_fragments: genera (idx, audio) en orden,
+    con hasta max_in_flight fragmentos en curso como tareas del loop.
+    """
+    started = time.perf_counter()
+    cache = get_audio_cache() if is_audio_cache_enabled() else None
+    stats.update({'fragments': 0, 'hits': 0, 'misses': 0, 'bytesSaved': 0})
+    items = [(idx, fragment.strip()) for idx, fragment in enumerate(fragments) if fragment.strip()]
+
+    async def load(idx, fragment):
+        key = audio_cache_key(provider, voice, speed, fragment)
+        audio = await asyncio.to_thread(cache.get, key) if cache is not None else None
+        if audio is not None:
+            return audio, True
+        start = time.perf_counter()
+        try:
+            audio = await synthesize_fragment_async(idx, fragment)
+        except Exception:
+            FRAGMENTS.inc(provider=provider, source='error')
+            raise
+        TTS_FRAGMENT_SECONDS.observe(time.perf_counter() - start, provider=provider)
+        if cache is not None and not isinstance(audio, FallbackAudio):
+            await asyncio.to_thread(cache.set, key, audio)
+        return audio, False
+
+    pending_items = iter(items)
+    window = deque()
+    try:
+        for idx, fragment in itertools.islice(pending_items, max(1, max_in_flight)):
+            window.append((idx, asyncio.ensure_future(load(idx, fragment))))
+        while window:
+            idx, task = window.popleft()
+            audio, from_cache = await task
+            next_item = next(pending_items, None)
+            if next_item is not None:
+                window.append((next_item[0], asyncio.ensure_future(load(*next_item))))
+            account_fragment(provider, label, f"{idx+1}/{len(fragments)}", audio, from_cache, stats, len(items), on_fragment)
+            yield idx, audio
+    finally:
+        # Ante un error (o si el consumidor se detiene) se cancelan los fragmentos en curso
+        for _, task in window:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in window), return_exceptions=True)
+    TTS_SYNTHESIS_SECONDS.observe(time.perf_counter() - started, provider=provider)
+    finish_cache_stats(stats)
+
+async def run_ffmpeg_async(cmd, stage='ffmpeg_merge'):
+    """Ejecuta ffmpeg como subproceso de asyncio; lanza RuntimeError con su stderr si falla."""
+    with span(stage):
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        _, stderr = await process.communicate()
+    if process.returncode != 0:
+        detail = stderr.decode('utf-8', errors='replace').strip() or 'sin detalle'
+        raise RuntimeError(f"ffmpeg devolvió código {process.returncode}: {detail}")
+
+def _write_concat_list(temp_files):
+    fd, concat_file = tempfile.mkstemp(suffix="_concat.txt")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        for temp_path in temp_files:
+            escaped_path = temp_path.replace('\\', '/').replace("'", "'\\''")
+            f.write(f"file '{escaped_path}'\n")
+    return concat_file
+
+async def merge_mp3_files_async(temp_files, output_file):
+    """Versión async de text_to_speech.merge_mp3_files (ffmpeg concat sin recodificar)."""
+    if not temp_files:
+        raise RuntimeError('No hay fragmentos de audio para unir')
+    if len(temp_files) == 1:
+        await asyncio.to_thread(shutil.move, temp_files[0], output_file)
+        return
+    concat_file = await asyncio.to_thread(_write_concat_list, temp_files)
+    try:
+        await run_ffmpeg_async([
+            get_ffmpeg_bin(), '-y', '-f', 'concat', '-safe', '0',
+            '-i', concat_file, '-c', 'copy', output_file,
+        ])
+    except Exception as e:
+        raise RuntimeError(f"No se pudo unir el audio final con ffmpeg: {e}") from e
+    finally:
+        await asyncio.to_thread(_remove_files, [concat_file])
+
+async def encode_pcm_async(chunks, output_file, sample_rate):
+    """
+    Versión async de audio_sink.Mp3EncoderSink: un único ffmpeg (subproceso de asyncio)
+    recibe el PCM de cada (idx, pcm) de chunks por stdin y escribe el MP3.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *mp3_encoder_command(get_ffmpeg_bin(), output_file, sample_rate),
+        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    # Se lee stderr en paralelo para que ffmpeg nunca se bloquee escribiendo logs
+    stderr = asyncio.ensure_future(process.stderr.read())
+    written = 0
+    try:
+        async for _, pcm in chunks:
+            process.stdin.write(pcm)
+            await process.stdin.drain()
+            written += len(pcm)
+        process.stdin.close()
+        with span('ffmpeg_finish'):
+            returncode = await process.wait()
+    except BaseException:
+        process.kill()
+        await process.wait()
+        raise
+    detail = (await stderr).decode('utf-8', errors='replace').strip() or 'sin detalle'
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg devolvió código {returncode}: {detail}")
+    if written == 0:
+        raise RuntimeError('No hay fragmentos de audio para codificar')
+
+def _write_temp_fragment(namespace, idx, audio):
+    fd, path = tempfile.mkstemp(suffix=f"_{namespace}_{idx}.mp3")
+    with os.fdopen(fd, 'wb') as f:
+        f.write(audio)
+    return path
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+async def synthesize_text_to_file_async(full_text, output_file, voice, speed=1.0, on_fragment=None):
+    """
+    Versión async de text_to_speech.synthesize_text_to_file (mismo plan, failover y
+    resultado). Solo la preparación del plan (importar el proveedor, credenciales, descarga
+    de la voz Piper) y el disco usan hilos; la espera de cada fragmento no ocupa ninguno.
+    """
+    plan = await asyncio.to_thread(prepare_synthesis, voice, speed)
+    fragments = split_text(full_text, plan['max_length'])
+    cache_stats = {}
+    print(f"[{plan['cache_namespace']}] Generando audio con {plan['label']} para la voz solicitada: {voice}")
+    chunks = iter_synthesized_fragments_async(
+        plan['cache_namespace'], plan['label'], fragments, voice, speed,
+        plan['synthesize_fragment_async'], cache_stats, plan['max_in_flight'], on_fragment,
+    )
+
+    if plan['audio_format'] == 'pcm':
+        try:
+            async with aclosing(chunks):
+                await encode_pcm_async(chunks, output_file, plan['sample_rate'])
+        except BaseException:
+            await asyncio.to_thread(_remove_files, [output_file])
+            raise
+    else:
+        temp_files = []
+        try:
+            async with aclosing(chunks):
+                async for idx, audio in chunks:
+                    temp_files.append(await asyncio.to_thread(_write_temp_fragment, plan['cache_namespace'], idx, audio))
+            await merge_mp3_files_async(temp_files, output_file)
+        finally:
+            await asyncio.to_thread(_remove_files, temp_files)
+
+    print(f"\nAudio completo guardado en: {output_file}")
+    if plan['failover']:
+        print(f"[failover] Fragmentos sintetizados por respaldo: {plan['failover']}")
+    return {
+        'provider': plan['provider'],
+        'voice_requested': voice,
+        'voice_used': plan['voice_used'],
+        'cache': cache_stats,
+        'failover': plan['failover'],
+    }
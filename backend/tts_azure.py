@@ -0,0 +1,95 @@
+import os
+from html import escape
+
+import requests
+
+from text_chunker import provider_max_length, split_text
+from text_to_speech import clamp_speed, merge_mp3_files, synthesize_fragments
+from tts_providers import UnsupportedVoiceError
+from tts_http import get_tts_max_in_flight, post, post_async
+
+def prepare_azure_synthesis(voice: str, speed: float = 1.0):
+    """Plan de síntesis de Azure Speech: función por fragmento y parámetros del proveedor."""
+    speech_key = os.getenv('AZURE_SPEECH_KEY')
+    speech_region = os.getenv('AZURE_SPEECH_REGION')
+    if not speech_key or not speech_region:
+        raise RuntimeError('Azure Speech no está configurado. Faltan AZURE_SPEECH_KEY o AZURE_SPEECH_REGION')
+    if not voice or voice.startswith('piper:'):
+        raise UnsupportedVoiceError(f'Azure Speech no tiene la voz solicitada: {voice}')
+
+    endpoint = os.getenv('AZURE_SPEECH_ENDPOINT') or f"https://{speech_region}.tts.speech.microsoft.com/cognitiveservices/v1"
+    headers = {
+        'Ocp-Apim-Subscription-Key': speech_key,
+        'Content-Type': 'application/ssml+xml',
+        'X-Microsoft-OutputFormat': 'audio-24khz-96kbitrate-mono-mp3',
+        'User-Agent': 'pdf-a-audio',
+    }
+
+    def ssml(fragment):
+        return (
+            "<speak version='1.0' xml:lang='es-CL'>"
+            f"<voice name='{voice}'>"
+            f"<prosody rate='{((clamp_speed(speed) - 1.0) * 100):+.0f}%'>{escape(fragment)}</prosody>"
+            "</voice></speak>"
+        ).encode('utf-8')
+
+    def synthesize_fragment(idx, fragment):
+        response = post(endpoint, headers=headers, data=ssml(fragment))
+        response.raise_for_status()
+        return response.content
+
+    async def synthesize_fragment_async(idx, fragment):
+        _, audio = await post_async(endpoint, headers=headers, data=ssml(fragment))
+        return audio
+
+    return {
+        'provider': 'azure-speech',
+        'cache_namespace': 'azure',
+        'label': 'Azure',
+        'max_length': provider_max_length('azure'),
+        'audio_format': 'mp3',
+        'max_in_flight': get_tts_max_in_flight(),
+        'voice_used': voice,
+        'synthesize_fragment': synthesize_fragment,
+        'synthesize_fragment_async': synthesize_fragment_async,
+    }
+
+def text_to_speech_azure(full_text: str, output_file: str, voice: str, speed: float = 1.0, on_fragment=None):
+    """Proveedor de producción via Azure Speech REST API."""
+    plan = prepare_azure_synthesis(voice, speed)
+    fragments = split_text(full_text, plan['max_length'])
+    temp_files = []
+
+    try:
+        print(f"[azure] Generando audio con Azure Speech usando la voz: {voice}")
+        cache_stats = synthesize_fragments(
+            plan['cache_namespace'], plan['label'], fragments, voice, speed, plan['synthesize_fragment'], temp_files,
+            max_in_flight=plan['max_in_flight'], on_fragment=on_fragment,
+        )
+
+        merge_mp3_files(temp_files, output_file)
+        print(f"\nAudio completo guardado en: {output_file}")
+        return {
+            'provider': 'azure-speech',
+            'voice_requested': voice,
+            'voice_used': voice,
+            'cache': cache_stats,
+        }
+    except requests.HTTPError as e:
+        body = ''
+        if e.response is not None:
+            try:
+                body = e.response.text.strip()
+            except Exception:
+                body = ''
+        detail = body or str(e)
+        raise RuntimeError(f'Azure Speech devolvió error HTTP: {detail}') from e
+    except Exception as e:
+        raise RuntimeError(f'Fallo Azure Speech: {e}') from e
+    finally:
+        for temp_path in temp_files:
+            try:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            except Exception:
+                pass
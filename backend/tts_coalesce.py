@@ -0,0 +1,151 @@
+"""
+Deduplicación (single-flight) de síntesis idénticas en /api/text-to-audio.
+
+Cuando muchos usuarios piden a la vez el mismo texto con la misma voz (un documento
+compartido con un curso), solo la primera petición sintetiza: las demás se unen a esa
+síntesis en curso y reciben el mismo MP3. Durante TTS_COALESCE_TTL segundos después de
+terminar, una petición idéntica recibe el resultado guardado sin sintetizar de nuevo.
+
+La clave es (texto normalizado, voz, velocidad, proveedores configurados): el proveedor
+concreto se elige por salud al preparar la síntesis, así que la clave usa los proveedores
+que podrían atenderla; si cambia la configuración, cambia la clave. Los errores no se
+guardan: las peticiones unidas reciben el mismo error y la siguiente vuelve a intentar.
+"""
+import asyncio
+import os
+import threading
+import time
+
+from disk_cache import hash_key
+from metrics import TTS_COALESCED
+from text_to_speech import clamp_speed, normalize_fragment_text
+from tts_providers import rank_providers
+
+LEADER = 'leader'
+JOINED = 'joined'
+RECENT = 'recent'
+
+
+def get_coalesce_ttl():
+    """Segundos que se reutiliza un resultado terminado (TTS_COALESCE_TTL, por defecto 600; 0 lo desactiva)."""
+    try:
+        return max(0, int(os.getenv('TTS_COALESCE_TTL', '600')))
+    except ValueError:
+        return 600
+
+def synthesis_key(text, voice, speed, *extra):
+    """Clave de una síntesis completa; extra distingue modos con resultados distintos (p. ej. sesiones)."""
+    providers = ','.join(sorted(spec.name for spec in rank_providers()))
+    return hash_key('tts-output', providers, voice, f"{clamp_speed(speed):.2f}", *extra, normalize_fragment_text(text))
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SynthesisCoalescer:
+    """
+    Síntesis en curso y resultados recientes por clave. run() es para los hilos de Flask y
+    run_async() para el event loop de async_app; cada uno devuelve (resultado, origen), con
+    origen LEADER (sintetizó esta petición), JOINED (se unió a una en curso) o RECENT.
+    is_valid(resultado) descarta un resultado reciente cuyo archivo ya no existe.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._tasks = {}
+        self._recent = {}
+
+    def _get_recent(self, key, is_valid):
+        entry = self._recent.get(key)
+        if entry is None:
+            return None
+        result, finished_at = entry
+        if finished_at < time.monotonic() - self.ttl or (is_valid is not None and not is_valid(result)):
+            self._recent.pop(key, None)
+            return None
+        return result
+
+    def _remember(self, key, result):
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        for old_key in [k for k, (_, at) in self._recent.items() if at < now - self.ttl]:
+            del self._recent[old_key]
+        self._recent[key] = (result, now)
+
+    def forget(self, key):
+        with self._lock:
+            self._recent.pop(key, None)
+
+    def run(self, key, produce, is_valid=None):
+        with self._lock:
+            recent = self._get_recent(key, is_valid)
+            if recent is not None:
+                TTS_COALESCED.inc(outcome=RECENT)
+                return recent, RECENT
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            TTS_COALESCED.inc(outcome=JOINED)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, JOINED
+
+        TTS_COALESCED.inc(outcome=LEADER)
+        try:
+            flight.result = produce()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None:
+                    self._remember(key, flight.result)
+            flight.done.set()
+        return flight.result, LEADER
+
+    async def run_async(self, key, produce, is_valid=None):
+        """
+        Como run, con produce una corrutina. La síntesis corre en su propia tarea: si la
+        petición que la inició se cancela (el cliente se desconecta), las unidas no se pierden.
+        """
+        with self._lock:
+            recent = self._get_recent(key, is_valid)
+            if recent is not None:
+                TTS_COALESCED.inc(outcome=RECENT)
+                return recent, RECENT
+            task = self._tasks.get(key)
+            outcome = LEADER if task is None else JOINED
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(produce())
+
+                def finished(task):
+                    with self._lock:
+                        self._tasks.pop(key, None)
+                        if not task.cancelled() and task.exception() is None:
+                            self._remember(key, task.result())
+
+                task.add_done_callback(finished)
+        TTS_COALESCED.inc(outcome=outcome)
+        return await asyncio.shield(task), outcome
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+def get_coalescer():
+    global _coalescer
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = SynthesisCoalescer(get_coalesce_ttl())
+        return _coalescer
@@ -0,0 +1,84 @@
+import asyncio
+import re
+
+import edge_tts
+from edge_tts.exceptions import NoAudioReceived
+
+from text_chunker import provider_max_length, split_text
+from text_to_speech import clamp_speed
+from tts_providers import UnsupportedVoiceError, get_fragment_timeout
+
+def clean_fragment_text(text: str) -> str:
+    """Elimina caracteres no imprimibles y espacios redundantes (edge-tts rechaza algunos textos)."""
+    text = re.sub(r'[^\x20-\x7E\n\ráéíóúÁÉÍÓÚñÑüÜ¿¡.,;:!\?"\'\-\(\)\[\]{}]', '', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+async def _stream_audio(text: str, voice: str, rate: str) -> bytes:
+    communicate = edge_tts.Communicate(text, voice, rate=rate)
+    chunks = []
+    async for chunk in communicate.stream():
+        if chunk['type'] == 'audio':
+            chunks.append(chunk['data'])
+    return b''.join(chunks)
+
+async def synthesize_edge_text_async(text: str, voice: str, rate: str, timeout: float, depth: int = 0) -> bytes:
+    """
+    Sintetiza un texto con edge-tts. Si el servicio no devuelve audio para ese texto
+    (NoAudioReceived), reintenta con el texto limpio y después lo subdivide en oraciones
+    (hasta dos niveles), uniendo el MP3 de cada parte.
+    Los errores de red o de tiempo de espera se propagan para que actúe el failover.
+    """
+    try:
+        return await asyncio.wait_for(_stream_audio(text, voice, rate), timeout)
+    except NoAudioReceived:
+        cleaned = clean_fragment_text(text)
+        if cleaned and cleaned != text:
+            print("  [edge-tts] Sin audio para el fragmento; reintentando con el texto limpio...")
+            try:
+                return await asyncio.wait_for(_stream_audio(cleaned, voice, rate), timeout)
+            except NoAudioReceived:
+                pass
+        if len(text) > 500 and depth < 2:
+            print("  [edge-tts] Subdividiendo el fragmento en partes más pequeñas...")
+            parts = split_text(cleaned or text, max(200, len(text) // 3))
+            audio = [await synthesize_edge_text_async(part, voice, rate, timeout, depth + 1) for part in parts]
+            return b''.join(audio)
+        raise
+
+def synthesize_edge_text(text: str, voice: str, rate: str, timeout: float) -> bytes:
+    """Versión bloqueante para los hilos de síntesis: cada llamada usa su propio event loop."""
+    return asyncio.run(synthesize_edge_text_async(text, voice, rate, timeout))
+
+def prepare_edge_synthesis(voice: str, speed: float = 1.0):
+    """Plan de síntesis de edge-tts (voces neuronales de Microsoft Edge, sin credenciales)."""
+    if not voice or voice.startswith('piper:'):
+        raise UnsupportedVoiceError(f'edge-tts no tiene la voz solicitada: {voice}')
+
+    rate = f"{(clamp_speed(speed) - 1.0) * 100:+.0f}%"
+    timeout = get_fragment_timeout()
+
+    def synthesize_fragment(idx, fragment):
+        audio = synthesize_edge_text(fragment, voice, rate, timeout)
+        if not audio:
+            raise RuntimeError('edge-tts no devolvió audio')
+        return audio
+
+    async def synthesize_fragment_async(idx, fragment):
+        # edge-tts ya es asíncrono: en el camino async corre en el loop del servidor
+        audio = await synthesize_edge_text_async(fragment, voice, rate, timeout)
+        if not audio:
+            raise RuntimeError('edge-tts no devolvió audio')
+        return audio
+
+    return {
+        'provider': 'edge-tts',
+        'cache_namespace': 'edge',
+        'label': 'edge-tts',
+        'max_length': provider_max_length('edge'),
+        'audio_format': 'mp3',
+        # El servicio gratuito limita conexiones simultáneas: pocas a la vez
+        'max_in_flight': 2,
+        'voice_used': voice,
+        'synthesize_fragment': synthesize_fragment,
+        'synthesize_fragment_async': synthesize_fragment_async,
+    }
@@ -0,0 +1,293 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import timezone
+
+import requests
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+
+from metrics import GOOGLE_TOKENS, span
+from text_chunker import provider_max_length, split_text
+from text_to_speech import clamp_speed, merge_mp3_files, synthesize_fragments
+from tts_providers import UnsupportedVoiceError
+from tts_http import get_fragment_deadline, get_http_session, get_tts_max_in_flight, post, post_async
+
+GOOGLE_SCOPES = ['https://www.googleapis.com/auth/cloud-platform']
+
+def _credentials_source():
+    """(tipo, valor, firma) de las credenciales configuradas; la firma cambia si cambia el origen."""
+    credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+    credentials_json = os.getenv('GOOGLE_CLOUD_TTS_CREDENTIALS_JSON')
+    if credentials_path and os.path.isfile(credentials_path):
+        stat = os.stat(credentials_path)
+        return 'file', credentials_path, (credentials_path, stat.st_mtime_ns, stat.st_size)
+    if credentials_json:
+        return 'json', credentials_json, hashlib.sha256(credentials_json.encode('utf-8')).hexdigest()
+    return None, None, None
+
+def get_google_tts_credentials():
+    """Carga credenciales de Google Cloud desde archivo o variable inline (sin caché)."""
+    kind, value, _ = _credentials_source()
+    if kind == 'file':
+        return service_account.Credentials.from_service_account_file(value, scopes=GOOGLE_SCOPES)
+    if kind == 'json':
+        return service_account.Credentials.from_service_account_info(json.loads(value), scopes=GOOGLE_SCOPES)
+    return None
+
+def _get_refresh_margin():
+    """Segundos antes del vencimiento en que se renueva el token (GOOGLE_TOKEN_REFRESH_MARGIN, por defecto 300)."""
+    try:
+        return max(0.0, float(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN', '300')))
+    except ValueError:
+        return 300.0
+
+
+class GoogleTokenManager:
+    """
+    Credenciales de la cuenta de servicio y access token compartidos por todas las peticiones:
+    - El JSON se lee y se parsea una sola vez (se recarga al renovar si cambió el archivo o la variable).
+    - El token se reutiliza hasta `margin` segundos antes de vencer.
+    - Dentro de ese margen se sigue entregando el token vigente y se renueva en segundo plano;
+      además queda programada la renovación anticipada, así un servidor inactivo no arranca
+      la siguiente petición con un token vencido.
+    - Solo un hilo renueva a la vez; el resto espera ese mismo resultado.
+    La renovación usa la sesión HTTP compartida (tts_http), con keep-alive hacia el token_uri.
+    """
+
+    def __init__(self, margin=None):
+        self.margin = _get_refresh_margin() if margin is None else margin
+        self._credentials = None
+        self._signature = None
+        self._token = None
+        self._expires_at = 0.0  # time.time() del vencimiento
+        self._refresh_at = 0.0  # desde cuándo conviene renovar (vencimiento - margen)
+        self._lock = threading.Lock()  # renovación (una a la vez)
+        self._flag_lock = threading.Lock()
+        self._refreshing = False
+        self._timer = None
+
+    def _load_credentials(self):
+        kind, _, signature = _credentials_source()
+        if kind is None:
+            raise RuntimeError('Google Cloud TTS no está configurado. Falta GOOGLE_APPLICATION_CREDENTIALS o GOOGLE_CLOUD_TTS_CREDENTIALS_JSON')
+        if signature != self._signature:
+            self._credentials = get_google_tts_credentials()
+            self._signature = signature
+            self._token = None
+            self._expires_at = self._refresh_at = 0.0
+        return self._credentials
+
+    def _refresh(self, source):
+        """Pide un token nuevo (con el lock tomado)."""
+        credentials = self._load_credentials()
+        with span('google_token_refresh'):
+            credentials.refresh(Request(session=get_http_session()))
+        GOOGLE_TOKENS.inc(source=source)
+        if credentials.expiry is not None:
+            # google-auth entrega expiry como datetime UTC sin zona horaria
+            expires_at = credentials.expiry.replace(tzinfo=timezone.utc).timestamp()
+        else:
+            expires_at = time.time() + 3600
+        now = time.time()
+        # Con tokens de vida corta el margen se limita a la mitad de su duración
+        self._refresh_at = expires_at - min(self.margin, max(0.0, expires_at - now) / 2)
+        self._token, self._expires_at = credentials.token, expires_at
+        self._schedule_refresh()
+        return self._token
+
+    def _schedule_refresh(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = max(1.0, self._refresh_at - time.time())
+        self._timer = threading.Timer(delay, self._start_background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _start_background_refresh(self):
+        with self._flag_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name='google-token', daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            with self._lock:
+                if self._token is not None and time.time() < self._refresh_at:
+                    return  # otro hilo ya lo renovó
+                self._refresh('background')
+        except Exception as e:
+            # El token vigente sigue sirviendo; la próxima petición reintentará
+            print(f"[google-cloud] No se pudo renovar el token en segundo plano: {e}")
+        finally:
+            self._refreshing = False
+
+    def get_token(self):
+        """Access token vigente; solo bloquea si no hay token o ya venció."""
+        now = time.time()
+        token, expires_at, refresh_at = self._token, self._expires_at, self._refresh_at
+        if token is not None and now < refresh_at:
+            GOOGLE_TOKENS.inc(source='cache')
+            return token
+        if token is not None and now < expires_at - 10:
+            # Por vencer pero aún válido: se usa y se renueva en paralelo
+            self._start_background_refresh()
+            GOOGLE_TOKENS.inc(source='cache')
+            return token
+        with self._lock:
+            if self._token is not None and time.time() < self._refresh_at:
+                GOOGLE_TOKENS.inc(source='cache')
+                return self._token
+            return self._refresh('request')
+
+    def invalidate(self, token):
+        """Descarta un token rechazado por la API (401) para que la siguiente llamada pida otro."""
+        with self._lock:
+            if self._token == token:
+                self._token = None
+                self._expires_at = self._refresh_at = 0.0
+
+    def status(self):
+        return {
+            'hasToken': self._token is not None,
+            'expiresIn': round(max(0.0, self._expires_at - time.time()), 1) if self._token else 0.0,
+        }
+
+
+_token_manager = None
+_token_manager_lock = threading.Lock()
+
+def get_google_token_manager():
+    global _token_manager
+    with _token_manager_lock:
+        if _token_manager is None:
+            _token_manager = GoogleTokenManager()
+        return _token_manager
+
+def map_voice_to_google_tts(voice: str):
+    """Mapea voces chilenas a equivalentes disponibles en Google Cloud TTS."""
+    mapping = {
+        'es-CL-CatalinaNeural': {
+            'languageCode': 'es-US',
+            'name': 'es-US-Neural2-A',
+            'ssmlGender': 'FEMALE',
+        },
+        'es-CL-LorenzoNeural': {
+            'languageCode': 'es-US',
+            'name': 'es-US-Neural2-B',
+            'ssmlGender': 'MALE',
+        },
+    }
+    return mapping.get(voice)
+
+def prepare_google_cloud_synthesis(voice: str, speed: float = 1.0):
+    """Plan de síntesis de Google Cloud TTS: función por fragmento y parámetros del proveedor."""
+    google_voice = map_voice_to_google_tts(voice)
+    if google_voice is None:
+        raise UnsupportedVoiceError(f'No existe mapeo de Google Cloud TTS para la voz solicitada: {voice}')
+
+    tokens = get_google_token_manager()
+    tokens.get_token()  # Falla aquí (y no en el primer fragmento) si las credenciales no sirven
+    endpoint = os.getenv('GOOGLE_TTS_ENDPOINT') or 'https://texttospeech.googleapis.com/v1/text:synthesize'
+
+    def request_kwargs(fragment, access_token):
+        return {
+            'headers': {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'application/json; charset=utf-8',
+            },
+            'json': {
+                'input': {'text': fragment},
+                'voice': google_voice,
+                'audioConfig': {
+                    'audioEncoding': 'MP3',
+                    'speakingRate': clamp_speed(speed),
+                },
+            },
+        }
+
+    def decode(payload):
+        audio_content = payload.get('audioContent')
+        if not audio_content:
+            raise RuntimeError('Google Cloud TTS no devolvió audioContent')
+        return base64.b64decode(audio_content)
+
+    def synthesize_fragment(idx, fragment):
+        # El token se pide por fragmento: en documentos largos se renueva sin cortar la síntesis
+        # Un solo plazo para el fragmento, incluido el reintento tras un 401
+        deadline = get_fragment_deadline()
+        access_token = tokens.get_token()
+        response = post(endpoint, deadline=deadline, **request_kwargs(fragment, access_token))
+        if response.status_code == 401:
+            tokens.invalidate(access_token)
+            response = post(endpoint, deadline=deadline, **request_kwargs(fragment, tokens.get_token()))
+        response.raise_for_status()
+        return decode(response.json())
+
+    async def synthesize_fragment_async(idx, fragment):
+        # get_token solo bloquea si el token venció: se ejecuta en un hilo para no frenar el loop
+        deadline = get_fragment_deadline()
+        access_token = await asyncio.to_thread(tokens.get_token)
+        status, body = await post_async(endpoint, allow_statuses=(401,), deadline=deadline, **request_kwargs(fragment, access_token))
+        if status == 401:
+            tokens.invalidate(access_token)
+            access_token = await asyncio.to_thread(tokens.get_token)
+            status, body = await post_async(endpoint, deadline=deadline, **request_kwargs(fragment, access_token))
+        return decode(json.loads(body))
+
+    return {
+        'provider': 'google-cloud-tts',
+        'cache_namespace': 'google',
+        'label': 'Google Cloud',
+        'max_length': provider_max_length('google'),
+        'audio_format': 'mp3',
+        'max_in_flight': get_tts_max_in_flight(),
+        'voice_used': google_voice['name'],
+        'synthesize_fragment': synthesize_fragment,
+        'synthesize_fragment_async': synthesize_fragment_async,
+    }
+
+def text_to_speech_google_cloud(full_text: str, output_file: str, voice: str, speed: float = 1.0, on_fragment=None):
+    """Proveedor oficial Google Cloud Text-to-Speech via REST."""
+    plan = prepare_google_cloud_synthesis(voice, speed)
+    fragments = split_text(full_text, plan['max_length'])
+    temp_files = []
+
+    try:
+        print(f"[google-cloud] Generando audio con Google Cloud TTS para la voz solicitada: {voice}")
+        cache_stats = synthesize_fragments(
+            plan['cache_namespace'], plan['label'], fragments, voice, speed, plan['synthesize_fragment'], temp_files,
+            max_in_flight=plan['max_in_flight'], on_fragment=on_fragment,
+        )
+
+        merge_mp3_files(temp_files, output_file)
+        print(f"\nAudio completo guardado en: {output_file}")
+        return {
+            'provider': 'google-cloud-tts',
+            'voice_requested': voice,
+            'voice_used': plan['voice_used'],
+            'cache': cache_stats,
+        }
+    except requests.HTTPError as e:
+        body = ''
+        if e.response is not None:
+            try:
+                body = e.response.text.strip()
+            except Exception:
+                body = ''
+        detail = body or str(e)
+        raise RuntimeError(f'Google Cloud TTS devolvió error HTTP: {detail}') from e
+    except Exception as e:
+        raise RuntimeError(f'Fallo Google Cloud TTS: {e}') from e
+    finally:
+        for temp_path in temp_files:
+            try:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            except Exception:
+                pass
@@ -0,0 +1,238 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import HTTP_RETRIES
+from tts_providers import get_fragment_timeout
+
+# --- Configuración y reintentos comunes a los clientes síncrono y asíncrono ---
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class HTTPStatusError(RuntimeError):
+    """Respuesta HTTP de error de un proveedor (camino async), con el código y el cuerpo."""
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+        detail = body.decode('utf-8', 'replace').strip()[:500] if body else ''
+        super().__init__(f"HTTP {status}{': ' + detail if detail else ''}")
+
+
+def get_tts_max_in_flight():
+    """Número máximo de fragmentos pedidos en paralelo a Azure/Google (TTS_MAX_IN_FLIGHT)."""
+    try:
+        return max(1, int(os.getenv('TTS_MAX_IN_FLIGHT', '4')))
+    except ValueError:
+        return 4
+
+def get_tts_request_timeout():
+    """Timeout (conexión, lectura) de cada petición de síntesis."""
+    return (min(5.0, get_fragment_timeout()), get_fragment_timeout())
+
+def get_http_retries():
+    try:
+        return int(os.getenv('TTS_HTTP_RETRIES', '3'))
+    except ValueError:
+        return 3
+
+def get_fragment_deadline():
+    """Plazo (time.monotonic) de un intento de fragmento: todos sus reintentos caben en TTS_REQUEST_TIMEOUT."""
+    return time.monotonic() + get_fragment_timeout()
+
+def _remaining(deadline, timeout):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError(f"sin respuesta en {timeout:.0f} s")
+    return remaining
+
+def _retry_delay(attempt, retry_after):
+    """Espera antes del reintento: Retry-After si viene, si no backoff exponencial (como urllib3)."""
+    try:
+        if retry_after is not None:
+            return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    return 0.5 * (2 ** attempt)
+
+# --- Cliente HTTP síncrono: sesión requests compartida por Azure y Google Cloud ---
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+class CountingRetry(Retry):
+    """Retry de urllib3 que cuenta cada reintento en las métricas (por código o tipo de error)."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        reason = str(response.status) if response is not None else type(error).__name__ if error else 'unknown'
+        HTTP_RETRIES.inc(reason=reason)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+def get_http_session():
+    """
+    Sesión requests compartida con keep-alive. urllib3 solo reintenta errores al conectar
+    (la petición todavía no se envió); los 429/5xx los reintenta post() dentro del plazo
+    del fragmento. Un timeout de lectura nunca se reintenta: el proveedor pudo haber
+    sintetizado (y cobrado) el texto, y el failover pasa al siguiente proveedor.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            retries = get_http_retries()
+            retry = CountingRetry(
+                total=retries,
+                connect=retries,
+                read=False,  # relanza el timeout de lectura tal cual, sin reintentar
+                status=0,
+                other=0,
+                backoff_factor=0.5,
+                allowed_methods=None,  # POST incluido: un error al conectar no llegó al proveedor
+                raise_on_status=False,
+            )
+            pool_size = max(10, get_tts_max_in_flight())
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+def _read_body(response, deadline, timeout):
+    """
+    Lee el cuerpo completo antes de deadline. El timeout de lectura de requests vale por
+    cada recv, así que un servidor que entrega el audio de a pocos bytes podría retener el
+    fragmento indefinidamente; aquí se lee lo que va llegando (read1) y se corta con
+    TimeoutError en cuanto se pasa el plazo.
+    """
+    chunks = []
+    try:
+        while True:
+            chunk = response.raw.read1(64 * 1024, decode_content=True)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"sin respuesta completa en {timeout:.0f} s")
+    except urllib3.exceptions.ReadTimeoutError as e:
+        raise requests.exceptions.ReadTimeout(e, request=response.request) from None
+    finally:
+        response.close()
+    # Queda disponible para .content, .text y .json() como en una petición sin stream
+    response._content = b''.join(chunks)
+    return response
+
+def post(url, deadline=None, **kwargs):
+    """
+    POST con la sesión compartida, reintentando ante 429 y 5xx (TTS_HTTP_RETRIES, con
+    backoff exponencial y Retry-After) solo mientras quede plazo: el intento completo,
+    incluida la lectura del cuerpo, termina antes de deadline (por defecto,
+    TTS_REQUEST_TIMEOUT desde ahora). Devuelve la última respuesta ya leída; el llamador
+    decide con raise_for_status().
+    """
+    session = get_http_session()
+    deadline = deadline or get_fragment_deadline()
+    connect, read = get_tts_request_timeout()
+    retries = get_http_retries()
+    attempt = 0
+    while True:
+        remaining = _remaining(deadline, read)
+        # Los reintentos de conexión de urllib3 también deben caber en lo que queda
+        timeout = (min(connect, remaining / (retries + 1)), min(read, remaining))
+        response = session.post(url, timeout=timeout, stream=True, **kwargs)
+        if response.status_code not in RETRY_STATUSES or attempt >= retries:
+            return _read_body(response, deadline, read)
+        delay = _retry_delay(attempt, response.headers.get('Retry-After'))
+        if time.monotonic() + delay >= deadline:
+            return _read_body(response, deadline, read)
+        HTTP_RETRIES.inc(reason=str(response.status_code))
+        _read_body(response, deadline, read)  # el cuerpo (corto) se descarta y la conexión vuelve al pool
+        time.sleep(delay)
+        attempt += 1
+
+# --- Cliente HTTP asíncrono (camino async: async_app y text_to_speech) ---
+
+_async_sessions = weakref.WeakKeyDictionary()  # event loop -> aiohttp.ClientSession
+
+def get_async_http_session():
+    """
+    Sesión aiohttp del event loop actual, con keep-alive (las sesiones aiohttp no se
+    comparten entre loops). Equivale a get_http_session para el camino asíncrono: muchas
+    síntesis concurrentes comparten las conexiones sin ocupar un hilo cada una.
+    """
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connect, read = get_tts_request_timeout()
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0, limit_per_host=max(100, get_tts_max_in_flight())),
+            timeout=aiohttp.ClientTimeout(connect=connect, sock_read=read),
+        )
+        _async_sessions[loop] = session
+    return session
+
+async def close_async_http_session():
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+async def _closing_session(coro):
+    try:
+        return await coro
+    finally:
+        await close_async_http_session()
+
+def run_async(coro):
+    """asyncio.run(coro) cerrando al final la sesión aiohttp de ese loop (para scripts y la CLI)."""
+    return asyncio.run(_closing_session(coro))
+
+async def post_async(url, allow_statuses=(), deadline=None, **kwargs):
+    """
+    Versión async de post(): mismos reintentos ante 429 y 5xx dentro del plazo, y ante
+    errores al conectar (la petición no llegó al proveedor). Un timeout no se reintenta.
+    Devuelve (status, cuerpo). Un status >= 400 que no esté en allow_statuses lanza
+    HTTPStatusError.
+    """
+    import aiohttp
+
+    session = get_async_http_session()
+    deadline = deadline or get_fragment_deadline()
+    connect, read = get_tts_request_timeout()
+    retries = get_http_retries()
+    attempt = 0
+    while True:
+        remaining = _remaining(deadline, read)
+        timeout = aiohttp.ClientTimeout(total=remaining, connect=min(connect, remaining))
+        try:
+            async with session.post(url, timeout=timeout, **kwargs) as response:
+                status = response.status
+                body = await response.read()
+                retry_after = response.headers.get('Retry-After')
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"sin respuesta en {read:.0f} s") from None
+        except aiohttp.ClientConnectorError as e:
+            delay = _retry_delay(attempt, None)
+            if attempt >= retries or time.monotonic() + delay >= deadline:
+                raise
+            HTTP_RETRIES.inc(reason=type(e).__name__)
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        if status in RETRY_STATUSES and attempt < retries:
+            delay = _retry_delay(attempt, retry_after)
+            if time.monotonic() + delay < deadline:
+                HTTP_RETRIES.inc(reason=str(status))
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+        if status >= 400 and status not in allow_statuses:
+            raise HTTPStatusError(status, body)
+        return status, body
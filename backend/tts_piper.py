@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import subprocess
+from pathlib import Path
+
+from piper.download_voices import download_voice
+
+from audio_sink import Mp3EncoderSink
+from piper_engine import get_piper_engine, is_piper_engine_available
+from text_chunker import provider_max_length, split_text
+from text_to_speech import clamp_speed, get_ffmpeg_bin, iter_synthesized_fragments
+from tts_providers import UnsupportedVoiceError
+
+def speed_to_piper_length(base_length_scale: str | float, speed: float) -> str:
+    """
+    Piper usa length_scale inverso a la intuición del usuario:
+    mayor length_scale = habla más lenta.
+    """
+    adjusted = float(base_length_scale) / clamp_speed(speed)
+    return f"{adjusted:.2f}"
+
+def ensure_piper_voice(voice_code: str):
+    """Descarga la voz Piper si no existe en backend/models."""
+    models_dir = Path(os.path.join(os.path.dirname(__file__), 'models'))
+    models_dir.mkdir(parents=True, exist_ok=True)
+    model_path = models_dir / f'{voice_code}.onnx'
+    config_path = models_dir / f'{voice_code}.onnx.json'
+    if not model_path.exists() or not config_path.exists():
+        download_voice(voice_code, models_dir)
+    return model_path, config_path
+
+def map_voice_to_piper(voice: str):
+    """
+    Mapea opciones de UI a voces offline reales de Piper.
+    """
+    mapping = {
+        'piper:es_MX-claude-high': {
+            'voice_code': 'es_MX-claude-high',
+            'speaker': '0',
+            'display_voice': 'es_MX-claude-high',
+            'length_scale': '1.24',
+        },
+        'piper:es_MX-ald-medium': {
+            'voice_code': 'es_MX-ald-medium',
+            'speaker': '0',
+            'display_voice': 'es_MX-ald-medium',
+            'length_scale': '1.22',
+        },
+        'piper:es_AR-daniela-high': {
+            'voice_code': 'es_AR-daniela-high',
+            'speaker': '0',
+            'display_voice': 'es_AR-daniela-high',
+            'length_scale': '1.20',
+        },
+        'piper:es_ES-carlfm-x_low': {
+            'voice_code': 'es_ES-carlfm-x_low',
+            'speaker': '0',
+            'display_voice': 'es_ES-carlfm-x_low',
+            'length_scale': '1.18',
+        },
+        'piper:es_ES-davefx-medium': {
+            'voice_code': 'es_ES-davefx-medium',
+            'speaker': '0',
+            'display_voice': 'es_ES-davefx-medium',
+            'length_scale': '1.18',
+        },
+        'piper:es_ES-mls_10246-low': {
+            'voice_code': 'es_ES-mls_10246-low',
+            'speaker': '0',
+            'display_voice': 'es_ES-mls_10246-low',
+            'length_scale': '1.18',
+        },
+        'piper:es_ES-mls_9972-low': {
+            'voice_code': 'es_ES-mls_9972-low',
+            'speaker': '0',
+            'display_voice': 'es_ES-mls_9972-low',
+            'length_scale': '1.18',
+        },
+        'piper:es_ES-sharvard-medium:M': {
+            'voice_code': 'es_ES-sharvard-medium',
+            'speaker': '0',
+            'display_voice': 'es_ES-sharvard-medium speaker M',
+            'length_scale': '1.22',
+        },
+        'piper:es_ES-sharvard-medium:F': {
+            'voice_code': 'es_ES-sharvard-medium',
+            'speaker': '1',
+            'display_voice': 'es_ES-sharvard-medium speaker F',
+            'length_scale': '1.20',
+        },
+    }
+    return mapping.get(voice)
+
+def get_piper_bin():
+    """Resuelve el ejecutable de piper desde el entorno virtual local o el PATH."""
+    piper_local = os.path.join(os.path.dirname(__file__), 'env', 'Scripts', 'piper.exe')
+    return piper_local if os.path.exists(piper_local) else 'piper'
+
+def _piper_command(model_path, speaker: str, length_scale: str):
+    return [
+        get_piper_bin(),
+        '--model', str(model_path),
+        '--output-raw',
+        '--speaker', speaker,
+        '--length_scale', length_scale,
+        '--data-dir', str(model_path.parent),
+    ]
+
+def synthesize_piper_subprocess(model_path, fragment: str, speaker: str, length_scale: str) -> bytes:
+    """Camino alternativo: un proceso piper por fragmento (recarga el modelo) con PCM crudo por stdout."""
+    piper_cmd = _piper_command(model_path, speaker, length_scale)
+    result = subprocess.run(piper_cmd, input=fragment.encode('utf-8'), check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return result.stdout
+
+async def synthesize_piper_subprocess_async(model_path, fragment: str, speaker: str, length_scale: str) -> bytes:
+    """Como synthesize_piper_subprocess, con un subproceso de asyncio (no ocupa un hilo mientras espera)."""
+    piper_cmd = _piper_command(model_path, speaker, length_scale)
+    process = await asyncio.create_subprocess_exec(
+        *piper_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate(fragment.encode('utf-8'))
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, piper_cmd, stdout, stderr)
+    return stdout
+
+def use_piper_engine() -> bool:
+    """Usa el motor en proceso salvo que PIPER_ENGINE=subprocess o no esté disponible."""
+    if os.getenv('PIPER_ENGINE', 'inprocess').lower() == 'subprocess':
+        return False
+    return is_piper_engine_available()
+
+def get_piper_sample_rate(config_path) -> int:
+    """Lee la frecuencia de muestreo del .onnx.json de la voz."""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return int(json.load(f)['audio']['sample_rate'])
+
+def prepare_piper_synthesis(voice: str, speed: float = 1.0):
+    """Plan de síntesis de Piper offline: produce PCM por fragmento."""
+    piper_voice = map_voice_to_piper(voice)
+    if piper_voice is None:
+        raise UnsupportedVoiceError(f'No existe mapeo Piper para la voz solicitada: {voice}')
+
+    model_path, config_path = ensure_piper_voice(piper_voice['voice_code'])
+    length_scale = speed_to_piper_length(piper_voice['length_scale'], speed)
+    in_process = use_piper_engine()
+
+    def synthesize_fragment(idx, fragment):
+        if in_process:
+            # El modelo queda cargado en memoria entre fragmentos y entre peticiones
+            pcm, _ = get_piper_engine().synthesize_pcm(
+                model_path, fragment, speaker=piper_voice['speaker'],
+                length_scale=length_scale, config_path=config_path,
+            )
+            return pcm
+        return synthesize_piper_subprocess(model_path, fragment, piper_voice['speaker'], length_scale)
+
+    async def synthesize_fragment_async(idx, fragment):
+        if in_process:
+            # Inferencia en CPU: se ejecuta en un hilo para no bloquear el loop
+            return await asyncio.to_thread(synthesize_fragment, idx, fragment)
+        return await synthesize_piper_subprocess_async(model_path, fragment, piper_voice['speaker'], length_scale)
+
+    return {
+        'provider': 'piper-offline',
+        # La caché de Piper guarda PCM (espacio de claves propio) para alimentar un único codificador
+        'cache_namespace': 'piper-pcm',
+        'label': 'Piper',
+        'max_length': provider_max_length('piper'),
+        'audio_format': 'pcm',
+        'sample_rate': get_piper_sample_rate(config_path),
+        'max_in_flight': 1,
+        'voice_used': piper_voice['display_voice'],
+        'synthesize_fragment': synthesize_fragment,
+        'synthesize_fragment_async': synthesize_fragment_async,
+    }
+
+def text_to_speech_piper(full_text: str, output_file: str, voice: str, speed: float = 1.0, on_fragment=None):
+    """
+    Proveedor offline usando Piper TTS.
+    El PCM de todos los fragmentos se envía a un único codificador MP3 (Mp3EncoderSink),
+    sin archivos intermedios por fragmento ni concatenación final.
+    """
+    plan = prepare_piper_synthesis(voice, speed)
+    fragments = split_text(full_text, plan['max_length'])
+
+    try:
+        print(f"[piper] Generando audio offline con Piper para la voz solicitada: {voice}")
+        cache_stats = {}
+        with Mp3EncoderSink(get_ffmpeg_bin(), output_file, plan['sample_rate']) as sink:
+            for _, pcm in iter_synthesized_fragments(
+                plan['cache_namespace'], plan['label'], fragments, voice, speed,
+                plan['synthesize_fragment'], cache_stats, on_fragment=on_fragment,
+            ):
+                sink.write(pcm)
+            if sink.bytes_written == 0:
+                raise RuntimeError('No hay fragmentos de audio para codificar')
+
+        print(f"\nAudio completo guardado en: {output_file}")
+        return {
+            'provider': 'piper-offline',
+            'voice_requested': voice,
+            'voice_used': plan['voice_used'],
+            'cache': cache_stats,
+        }
+    except Exception as e:
+        if os.path.exists(output_file):
+            try:
+                os.remove(output_file)
+            except OSError:
+                pass
+        raise RuntimeError(f'Fallo Piper offline: {e}') from e
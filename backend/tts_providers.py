@@ -0,0 +1,239 @@
+"""
+Registro de proveedores de síntesis de voz con salud observada y circuit breakers.
+
+Cada proveedor vive en su propio módulo (tts_azure, tts_google, tts_edge, tts_piper) y se
+importa recién la primera vez que se usa: arrancar el backend o la CLI no carga requests,
+google-auth, edge-tts ni piper si ese proveedor no se va a usar.
+
+    register_provider(ProviderSpec('azure', 'tts_azure', 'prepare_azure_synthesis',
+                                   is_configured=is_azure_tts_configured, audio_format='mp3'))
+    for spec in rank_providers():
+        plan = spec.prepare(voice, speed)
+
+Cada proveedor lleva un ProviderHealth: latencia por fragmento (promedio exponencial, en
+segundos por 1000 caracteres), tasa de error y un circuit breaker que deja de enviarle
+fragmentos tras varios fallos seguidos y lo vuelve a probar con un único fragmento al
+terminar la pausa. rank_providers ordena los proveedores por esa salud observada.
+"""
+import importlib
+import os
+import threading
+import time
+
+from metrics import REGISTRY, record_startup
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Peso de cada observación nueva en los promedios exponenciales
+EWMA_ALPHA = 0.2
+
+
+class UnsupportedVoiceError(ValueError):
+    """El proveedor no tiene la voz pedida. No cuenta como fallo para su salud."""
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return float(default)
+
+
+def get_fragment_timeout():
+    """
+    Segundos máximos de espera por la respuesta de un fragmento (TTS_REQUEST_TIMEOUT, por
+    defecto 30). Acota cuánto se tarda en pasar al siguiente proveedor si uno no responde.
+    """
+    return max(1.0, _env_float('TTS_REQUEST_TIMEOUT', 30))
+
+
+class ProviderHealth:
+    """
+    Salud observada de un proveedor. expected_latency (segundos por 1000 caracteres) es el
+    valor inicial antes de tener mediciones, y define el orden entre proveedores sin uso.
+
+    Circuit breaker:
+    - closed: se usa normalmente; failure_threshold fallos seguidos lo abren.
+    - open: no recibe fragmentos durante cooldown segundos (la pausa se duplica en cada
+      apertura consecutiva, hasta max_cooldown).
+    - half_open: pasada la pausa, un único fragmento de prueba decide si se cierra o reabre.
+    """
+
+    def __init__(self, expected_latency, failure_threshold=None, cooldown=None, max_cooldown=None):
+        self.failure_threshold = failure_threshold or max(1, int(_env_float('TTS_BREAKER_FAILURES', 3)))
+        self.base_cooldown = cooldown or _env_float('TTS_BREAKER_COOLDOWN', 30)
+        self.max_cooldown = max_cooldown or _env_float('TTS_BREAKER_MAX_COOLDOWN', 600)
+        self.latency = float(expected_latency)
+        self.error_rate = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.cooldown = self.base_cooldown
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Indica si se le puede enviar un fragmento ahora (reserva la prueba en half_open)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.time() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def is_available(self):
+        """Como allow() pero sin reservar la prueba: para ordenar proveedores."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.time() - self.opened_at >= self.cooldown
+            return not (self.state == HALF_OPEN and self._probe_in_flight)
+
+    def record_success(self, seconds, chars):
+        with self._lock:
+            per_1k = seconds / max(chars, 1) * 1000
+            self.latency += EWMA_ALPHA * (per_1k - self.latency)
+            self.error_rate += EWMA_ALPHA * (0.0 - self.error_rate)
+            self.successes += 1
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                print("[salud] Circuito cerrado: el proveedor volvió a responder")
+            self.state = CLOSED
+            self.cooldown = self.base_cooldown
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.error_rate += EWMA_ALPHA * (1.0 - self.error_rate)
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                # La prueba falló: se reabre con una pausa más larga
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.time()
+        self._probe_in_flight = False
+
+    def score(self):
+        """Costo esperado por 1000 caracteres (menor es mejor): la latencia penalizada por los errores."""
+        with self._lock:
+            return self.latency / max(0.05, 1.0 - self.error_rate)
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = max(0.0, self.cooldown - (time.time() - self.opened_at)) if self.state == OPEN else 0.0
+            return {
+                'state': self.state,
+                'latencyPer1kChars': round(self.latency, 3),
+                'errorRate': round(self.error_rate, 3),
+                'successes': self.successes,
+                'failures': self.failures,
+                'retryIn': round(retry_in, 1),
+            }
+
+
+class ProviderSpec:
+    """
+    Proveedor registrado: módulo que lo implementa y nombre de su función
+    prepare(voice, speed) -> plan (ver text_to_speech.prepare_synthesis).
+    is_configured() debe resolverse sin importar el módulo (solo variables de entorno).
+    audio_format ('mp3' o 'pcm') indica con qué proveedores puede alternar fragmentos.
+    """
+
+    def __init__(self, name, module, prepare_attr, is_configured, audio_format='mp3', label=None, expected_latency=1.0):
+        self.name = name
+        self.module = module
+        self.prepare_attr = prepare_attr
+        self.is_configured = is_configured
+        self.audio_format = audio_format
+        self.label = label or name
+        self.expected_latency = expected_latency
+        self.reset_health()
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def reset_health(self):
+        self.health = ProviderHealth(self.expected_latency)
+
+    @property
+    def loaded(self):
+        return self._loaded is not None
+
+    def load(self):
+        """Importa el módulo del proveedor (una sola vez) y registra cuánto tardó."""
+        if self._loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.module)
+                    record_startup(f'provider_{self.name}', time.perf_counter() - start)
+                    self._loaded = module
+        return self._loaded
+
+    def prepare(self, voice, speed=1.0):
+        return getattr(self.load(), self.prepare_attr)(voice, speed)
+
+
+_providers = {}  # nombre -> ProviderSpec, en orden de prioridad
+
+def register_provider(spec):
+    """Agrega (o reemplaza) un proveedor. El orden de registro desempata entre puntajes iguales."""
+    _providers[spec.name] = spec
+    return spec
+
+def get_provider(name):
+    try:
+        return _providers[name]
+    except KeyError:
+        raise ValueError(f'Proveedor TTS desconocido: {name}') from None
+
+def iter_providers():
+    return list(_providers.values())
+
+def rank_providers():
+    """
+    Proveedores configurados, del mejor al peor según su salud: primero los que aceptan
+    fragmentos (circuito cerrado o listo para la prueba), ordenados por score(); al final
+    los de circuito abierto, como último recurso si no queda otro.
+    """
+    configured = [spec for spec in _providers.values() if spec.is_configured()]
+    priority = {spec.name: i for i, spec in enumerate(configured)}
+    return sorted(configured, key=lambda spec: (not spec.health.is_available(), spec.health.score(), priority[spec.name]))
+
+def get_provider_status():
+    """Estado de cada proveedor registrado, en el orden en que se elegirían."""
+    ranked = rank_providers()
+    order = {spec.name: i for i, spec in enumerate(ranked)}
+    return [
+        dict(spec.health.snapshot(), name=spec.name, label=spec.label, configured=spec.name in order,
+             loaded=spec.loaded, rank=order.get(spec.name))
+        for spec in sorted(_providers.values(), key=lambda spec: order.get(spec.name, len(order)))
+    ]
+
+def collect_provider_metrics():
+    """Publica la salud de cada proveedor (ver metrics.Registry.register_collector)."""
+    providers = iter_providers()
+    states = {CLOSED: 0, HALF_OPEN: 0.5, OPEN: 1}
+    yield 'tts_provider_latency_per_1k_chars_seconds', 'gauge', 'Latencia promedio (EWMA) por 1000 caracteres.', [
+        ({'provider': spec.name}, spec.health.latency) for spec in providers
+    ]
+    yield 'tts_provider_error_rate', 'gauge', 'Tasa de error promedio (EWMA) por proveedor.', [
+        ({'provider': spec.name}, spec.health.error_rate) for spec in providers
+    ]
+    yield 'tts_provider_circuit_open', 'gauge', 'Circuito del proveedor: 0 cerrado, 0.5 en prueba, 1 abierto.', [
+        ({'provider': spec.name}, states[spec.health.state]) for spec in providers
+    ]
+
+REGISTRY.register_collector(collect_provider_metrics)
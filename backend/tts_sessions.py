@@ -0,0 +1,226 @@
+"""
+Sesiones de documento para re-sintetizar solo lo editado en /api/text-to-audio.
+
+Una sesión recuerda la fragmentación de la última versión del texto y guarda el audio de
+cada fragmento en su propio directorio (cache/sessions/<id>/). Al recibir una versión
+editada, text_chunker.resplit_text conserva los fragmentos que siguen presentes, solo se
+sintetizan los fragmentos nuevos y el MP3 final se arma uniendo el audio guardado con el
+nuevo. Para ediciones pequeñas en documentos largos, el tiempo depende del tamaño de la
+edición y no del documento.
+
+A diferencia de la caché de audio compartida (LRU, se puede desactivar), el audio de una
+sesión se conserva hasta que la sesión expira (TTS_SESSION_TTL).
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from audio_sink import Mp3EncoderSink
+from disk_cache import hash_key
+from text_chunker import resplit_text, split_text
+from text_to_speech import clamp_speed, get_ffmpeg_bin, iter_synthesized_fragments, merge_mp3_files, prepare_synthesis
+
+SESSION_FILE = 'session.json'
+
+# Como mucho un recorrido del directorio de sesiones cada tanto, no uno por sesión creada
+CLEANUP_INTERVAL = 300
+
+
+def get_session_dir():
+    return os.getenv('TTS_SESSION_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'sessions')
+
+def get_session_ttl():
+    """Segundos sin uso tras los que se elimina una sesión (TTS_SESSION_TTL, por defecto 24 h)."""
+    try:
+        return max(60, int(os.getenv('TTS_SESSION_TTL', str(24 * 60 * 60))))
+    except ValueError:
+        return 24 * 60 * 60
+
+
+class SessionStore:
+    """Sesiones en disco: un directorio por sesión con session.json y un archivo de audio por fragmento."""
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._next_cleanup = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def lock(self, session_id):
+        """Lock de la sesión: dos ediciones simultáneas del mismo documento se atienden en orden."""
+        with self._locks_lock:
+            return self._locks.setdefault(session_id, threading.Lock())
+
+    def path(self, session_id):
+        return os.path.join(self.directory, session_id)
+
+    def create(self):
+        self._maybe_cleanup()
+        session_id = uuid.uuid4().hex
+        os.makedirs(self.path(session_id))
+        return session_id
+
+    def load(self, session_id):
+        """Estado guardado de la sesión, o None si no existe, expiró o el id no es válido."""
+        try:
+            session_id = uuid.UUID(session_id).hex
+        except (TypeError, ValueError, AttributeError):
+            return None
+        try:
+            with open(os.path.join(self.path(session_id), SESSION_FILE), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('updated_at', 0) < time.time() - self.ttl:
+            shutil.rmtree(self.path(session_id), ignore_errors=True)
+            return None
+        return state
+
+    def save(self, session_id, state):
+        state['updated_at'] = time.time()
+        path = os.path.join(self.path(session_id), SESSION_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    def fork(self, session_id):
+        """
+        Copia de una sesión con un id nuevo (el audio se enlaza en disco si se puede), para
+        quien recibe un resultado compartido (ver tts_coalesce). None si la sesión ya no existe.
+        """
+        with self.lock(session_id):
+            state = self.load(session_id)
+            if state is None:
+                return None
+            new_id = self.create()
+            source = self.path(session_id)
+            for name in os.listdir(source):
+                if name == SESSION_FILE:
+                    continue
+                try:
+                    os.link(os.path.join(source, name), os.path.join(self.path(new_id), name))
+                except OSError:
+                    shutil.copyfile(os.path.join(source, name), os.path.join(self.path(new_id), name))
+            self.save(new_id, state)
+        return new_id
+
+    def _maybe_cleanup(self):
+        now = time.monotonic()
+        with self._locks_lock:
+            if now < self._next_cleanup:
+                return
+            self._next_cleanup = now + min(CLEANUP_INTERVAL, self.ttl)
+        self.cleanup_expired()
+
+    def cleanup_expired(self):
+        limit = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.isdir(path) and os.path.getmtime(path) < limit:
+                    shutil.rmtree(path, ignore_errors=True)
+                    with self._locks_lock:
+                        self._locks.pop(name, None)
+            except OSError:
+                pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_session_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(get_session_dir(), get_session_ttl())
+        return _store
+
+def _fragment_file(plan, voice, speed, fragment):
+    # El proveedor y el formato forman parte de la clave: no se mezcla audio de otra voz o formato
+    ext = 'pcm' if plan['audio_format'] == 'pcm' else 'mp3'
+    return hash_key('session-fragment', plan['cache_namespace'], voice, f"{clamp_speed(speed):.2f}", fragment) + '.' + ext
+
+def _splice(plan, paths, output_file):
+    """Une el audio de los fragmentos (guardados en la sesión, que no se modifican) en output_file."""
+    if plan['audio_format'] == 'pcm':
+        with Mp3EncoderSink(get_ffmpeg_bin(), output_file, plan['sample_rate']) as sink:
+            for path in paths:
+                with open(path, 'rb') as f:
+                    sink.write(f.read())
+    elif len(paths) == 1:
+        # merge_mp3_files movería el único archivo fuera de la sesión
+        shutil.copyfile(paths[0], output_file)
+    else:
+        merge_mp3_files(paths, output_file)
+
+def synthesize_session_to_file(session_id, text, output_file, voice, speed=1.0, on_fragment=None):
+    """
+    Sintetiza text a output_file dentro de una sesión de documento. Si session_id no existe
+    (o expiró) se crea una sesión nueva. Devuelve el resultado de la síntesis con 'session'
+    (id a usar en la próxima edición), 'fragments', 'reused' y 'synthesized'.
+    """
+    store = get_session_store()
+    state = store.load(session_id) if session_id else None
+    if state is None:
+        session_id = store.create()
+    else:
+        session_id = uuid.UUID(session_id).hex
+
+    with store.lock(session_id):
+        state = store.load(session_id) or {}
+        plan = prepare_synthesis(voice, speed)
+        max_length = plan['max_length']
+        if state.get('max_length') == max_length:
+            fragments = [fragment for fragment, _ in resplit_text(state.get('fragments', []), text, max_length)]
+        else:
+            fragments = split_text(text, max_length)
+        if not fragments:
+            raise RuntimeError('El texto está vacío')
+
+        directory = store.path(session_id)
+        files = [_fragment_file(plan, voice, speed, fragment) for fragment in fragments]
+        missing = {}
+        for fragment, name in zip(fragments, files):
+            if name not in missing and not os.path.exists(os.path.join(directory, name)):
+                missing[name] = fragment
+        print(f"[sesión {session_id[:8]}] {len(fragments) - len(missing)} fragmentos reutilizados, {len(missing)} por sintetizar")
+
+        cache_stats = {}
+        names = list(missing)
+        for idx, audio in iter_synthesized_fragments(
+            plan['cache_namespace'], plan['label'], [missing[name] for name in names], voice, speed,
+            plan['synthesize_fragment'], cache_stats, plan['max_in_flight'], on_fragment,
+        ):
+            path = os.path.join(directory, names[idx])
+            with open(path + '.part', 'wb') as f:
+                f.write(audio)
+            os.replace(path + '.part', path)
+
+        _splice(plan, [os.path.join(directory, name) for name in files], output_file)
+
+        # Solo se conserva el audio de la versión actual
+        current = set(files) | {SESSION_FILE}
+        for name in os.listdir(directory):
+            if name not in current:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+        store.save(session_id, {'voice': voice, 'speed': speed, 'max_length': max_length, 'fragments': fragments})
+
+    return {
+        'provider': plan['provider'],
+        'voice_requested': voice,
+        'voice_used': plan['voice_used'],
+        'cache': cache_stats,
+        'failover': plan['failover'],
+        'session': session_id,
+        'fragments': len(fragments),
+        'reused': len(fragments) - len(missing),
+        'synthesized': len(missing),
+    }
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from metrics import BYTES, STAGE_SECONDS
+
+def get_max_upload_bytes():
+    """Tamaño máximo de una subida (MAX_UPLOAD_MB, por defecto 256 MB)."""
+    try:
+        return int(float(os.getenv('MAX_UPLOAD_MB', '256')) * 1024 * 1024)
+    except ValueError:
+        return 256 * 1024 * 1024
+
+
+class HashingUploadFile:
+    """
+    Destino de un archivo subido: werkzeug escribe aquí cada bloque del multipart a medida
+    que llega, y el archivo queda directamente en el directorio de trabajo de la petición.
+    Calcula el sha256 durante la escritura (sin releer el archivo para la caché) y corta
+    la subida si supera max_bytes.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.write_seconds = 0.0
+        self._digest = hashlib.sha256()
+        self._file = open(path, 'w+b')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise RequestEntityTooLarge()
+        start = time.perf_counter()
+        self._digest.update(data)
+        written = self._file.write(data)
+        self.write_seconds += time.perf_counter() - start
+        return written
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def __getattr__(self, name):
+        # read, seek, tell, close... se delegan al archivo real (FileStorage los usa)
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    """
+    Petición que guarda los archivos del multipart en un directorio único por petición
+    (dentro de UPLOAD_DIR) en lugar del archivo temporal de werkzeug más una copia con save().
+    El directorio se crea al llegar el primer archivo y se elimina al terminar la petición
+    (en respuestas con stream_with_context, al terminar de enviar el cuerpo).
+    """
+
+    work_dir = None
+    keep_work_dir = False
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.work_dir is None:
+            base = current_app.config.get('UPLOAD_DIR') or tempfile.gettempdir()
+            self.work_dir = tempfile.mkdtemp(prefix='req_', dir=base)
+        fd, path = tempfile.mkstemp(dir=self.work_dir, suffix='_upload')
+        os.close(fd)
+        return HashingUploadFile(path, get_max_upload_bytes())
+
+    def cleanup_work_dir(self):
+        if self.work_dir and not self.keep_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
+
+
+def finish_upload(file_storage):
+    """
+    Cierra el archivo subido y devuelve (ruta, sha256). El PDF se abre luego por ruta:
+    MuPDF lo lee bajo demanda desde disco, sin cargar una copia completa en memoria.
+    """
+    upload = file_storage.stream
+    if not isinstance(upload, HashingUploadFile):
+        raise RuntimeError('La petición no usa UploadRequest')
+    upload.flush()
+    upload.close()
+    STAGE_SECONDS.observe(upload.write_seconds, stage='upload_write')
+    BYTES.inc(upload.size, kind='pdf_upload')
+    return upload.path, upload.sha256
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from text_to_speech import get_tts_capabilities, list_windows_voices
+
+
+class CachedSource:
+    """
+    Valor costoso de obtener (lista de voces, capacidades) con caché en memoria:
+    - Dentro del TTL se sirve sin tocar la fuente.
+    - Vencido, se sirve el valor anterior y se refresca en segundo plano (un solo hilo a la vez).
+    - Si la fuente falla se siguen sirviendo los datos vencidos y se reintenta más tarde.
+    - Con snapshot_path, el último valor bueno se guarda en disco y se usa en arranques en frío.
+    Cada valor lleva un ETag (sha256 del JSON) para responder 304 a los clientes.
+    """
+
+    def __init__(self, name, loader, ttl, snapshot_path=None, retry_after=60):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # una sola carga síncrona en arranques en frío
+        self._value = None
+        self._etag = None
+        self._fetched_at = 0.0
+        self._next_attempt = 0.0
+        self._refreshing = False
+        self._last_error = None
+        self._snapshot_loaded = False
+
+    def _set(self, value, fetched_at):
+        data = json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        self._value = value
+        self._etag = hashlib.sha256(data).hexdigest()[:32]
+        self._fetched_at = fetched_at
+
+    def _load_snapshot(self):
+        self._snapshot_loaded = True
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._set(snapshot['value'], float(snapshot['fetchedAt']))
+            print(f"[voces] {self.name}: usando snapshot en disco del {time.ctime(self._fetched_at)}")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[voces] {self.name}: snapshot ilegible ({e})")
+
+    def _save_snapshot(self, value, fetched_at):
+        if not self.snapshot_path:
+            return
+        directory = os.path.dirname(self.snapshot_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'fetchedAt': fetched_at, 'value': value}, f, ensure_ascii=False)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"[voces] {self.name}: no se pudo guardar el snapshot ({e})")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def refresh(self):
+        """Consulta la fuente y actualiza el valor; ante un error conserva el anterior y lo relanza."""
+        try:
+            value = self.loader()
+        except Exception as e:
+            with self._lock:
+                self._last_error = str(e)
+                self._next_attempt = time.time() + self.retry_after
+            print(f"[voces] {self.name}: la fuente falló ({e}); se mantienen los datos anteriores")
+            raise
+        fetched_at = time.time()
+        with self._lock:
+            self._set(value, fetched_at)
+            self._last_error = None
+            self._next_attempt = 0.0
+        self._save_snapshot(value, fetched_at)
+        return value
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def is_stale(self):
+        return time.time() - self._fetched_at >= self.ttl
+
+    def _claim_refresh(self):
+        """Con el lock tomado: marca un refresco en curso si no hay otro y ya pasó retry_after tras un error."""
+        if self._refreshing or time.time() < self._next_attempt:
+            return False
+        self._refreshing = True
+        return True
+
+    def refresh_if_stale(self):
+        """
+        Refresca en este hilo si el valor venció, con las mismas reglas que get(): un solo
+        refresco a la vez y sin reintentar antes de retry_after tras un error. Para el hilo
+        de start_background_refresh.
+        """
+        with self._lock:
+            if not self._snapshot_loaded:
+                self._load_snapshot()
+            if not self.is_stale() or not self._claim_refresh():
+                return False
+        self._refresh_in_background()
+        return True
+
+    def get(self):
+        """Devuelve (valor, etag, vencido). Solo bloquea si nunca hubo datos (ni snapshot)."""
+        with self._lock:
+            if not self._snapshot_loaded:
+                self._load_snapshot()
+            value, etag = self._value, self._etag
+            stale = value is not None and self.is_stale()
+            start_refresh = stale and self._claim_refresh()
+        if value is None:
+            with self._load_lock:
+                if self._value is None:
+                    self.refresh()
+            with self._lock:
+                return self._value, self._etag, False
+        if start_refresh:
+            threading.Thread(target=self._refresh_in_background, name=f"refresh-{self.name}", daemon=True).start()
+        return value, etag, stale
+
+    def status(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'fetchedAt': self._fetched_at or None,
+                'stale': self._value is not None and self.is_stale(),
+                'lastError': self._last_error,
+            }
+
+
+def _cache_dir():
+    return os.getenv('VOICES_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'voices')
+
+def _ttl(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return float(default)
+
+def _load_edge_voices():
+    import edge_tts  # solo al consultar el catálogo (no al arrancar)
+    return asyncio.run(edge_tts.list_voices())
+
+edge_voices = CachedSource(
+    'edge', _load_edge_voices, ttl=_ttl('VOICES_CACHE_TTL', 24 * 3600),
+    snapshot_path=os.path.join(_cache_dir(), 'edge_voices.json'),
+)
+# Voces instaladas en esta máquina: no se guardan en disco (dependen del equipo)
+local_voices = CachedSource('local', list_windows_voices, ttl=_ttl('LOCAL_VOICES_CACHE_TTL', 3600))
+
+def _load_capabilities():
+    local, _, _ = local_voices.get()
+    return get_tts_capabilities(local_voices=local)
+
+tts_capabilities = CachedSource('capabilities', _load_capabilities, ttl=_ttl('CAPABILITIES_CACHE_TTL', 300))
+
+def start_background_refresh(interval=None):
+    """Hilo que mantiene el catálogo caliente: refresca cada fuente al vencer su TTL."""
+    sources = (edge_voices, local_voices, tts_capabilities)
+    interval = interval or max(30.0, min(source.ttl for source in sources) / 2)
+
+    def loop():
+        while True:
+            for source in sources:
+                # Mismo camino que get(): no se solapa con un refresco en curso y respeta retry_after
+                source.refresh_if_stale()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name='voice-catalog', daemon=True)
+    thread.start()
+    return thread
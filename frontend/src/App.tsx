@@ -32,6 +32,7 @@ interface TextToAudioResponse {
   voiceRequested?: string | null;
   voiceUsed?: string | null;
   speedUsed?: number | null;
+  session?: string;
 }
 
 interface ApiErrorResponse {
@@ -132,6 +133,8 @@ function App() {
   const [extractedText, setExtractedText] = useState<string>('');
   const [speechSpeed, setSpeechSpeed] = useState<number>(1.0);
   const [audioFileName, setAudioFileName] = useState<string | null>(null);
+  // Sesión del documento en el backend: tras editar el texto solo se sintetizan los fragmentos cambiados
+  const [synthesisSession, setSynthesisSession] = useState<string | null>(null);
   const [loading, setLoading] = useState<boolean>(false);
   const [loadingAudio, setLoadingAudio] = useState<boolean>(false);
   const [error, setError] = useState<string | null>(null);
@@ -273,6 +276,7 @@ function App() {
     if (event.target.files) {
       setPdfFile(event.target.files[0]);
       setExtractedText('');
+      setSynthesisSession(null);
       setAudioFileName(null);
       setError(null);
       setAudioProviderInfo(null);
@@ -293,6 +297,7 @@ function App() {
     setLoading(true);
     setError(null);
     setExtractedText('');
+    setSynthesisSession(null);
     setAudioFileName(null);
     setAudioProviderInfo(null);
     setSpeechSpeed(1.0);
@@ -332,12 +337,14 @@ function App() {
         text: extractedText,
         voice: selectedVoice,
         speed: speechSpeed,
+        session: synthesisSession ?? true,
       }, {
         headers: { 'Content-Type': 'application/json' }
       });
       
       if (response.data.audio) {
         setAudioFileName(response.data.audio);
+        setSynthesisSession(response.data.session ?? null);
         if (response.data.provider === 'edge-tts') {
           setAudioProviderInfo(`Audio generado con edge-tts usando la voz ${response.data.voiceUsed}.`);
         } else if (response.data.provider === 'azure-speech') {